@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 from utils.pdf_generator import criar_pdf_relatorio # Assumindo a correção do path
+from utils.relatorio_cache import cache_relatorios, iniciar_exportacao_metricas, ARQUIVO_METRICAS
+from utils.fila_relatorios import fila_relatorios
+from app_views.relatorios_view import exibir_trabalho_relatorio
+from app_utils.orcamento_class import SnapshotOrcamento
 
 # --- Classes (Mantidas) ---
 
@@ -25,15 +29,17 @@ class Orcamento:
 
 # --- Funções de Cache (CORRIGIDA) ---
 
-@st.cache_data(show_spinner=False)
-# AQUI: Mudança de 'orcamento_obj' para '_orcamento_obj'
-def get_pdf_bytes_report(_orcamento_obj, limites, totais_reais, saldo, user_name, frequencia_pagamento):
+def enviar_pdf_report(snapshot, orcamento_obj, limites, totais_reais, saldo):
     """
-    Gera o PDF e armazena o resultado em cache. O '_' evita o erro de hashing
-    na classe customizada Orcamento.
+    Enfileira a geração do PDF na fila de relatórios (em segundo plano) e retorna o id do trabalho.
+    A chave é o SnapshotOrcamento imutável (com todos os itens), então dois
+    orçamentos com os mesmos totais mas itens diferentes não compartilham o PDF;
+    pedidos iguais em andamento são reaproveitados e o resultado passa pelo cache de relatórios.
     """
-    # Usamos o nome com underscore na chamada para a função externa.
-    return criar_pdf_relatorio(_orcamento_obj, limites, totais_reais, saldo, user_name, frequencia_pagamento)
+    return fila_relatorios.enviar(
+        ('mensal', snapshot),
+        lambda: criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, snapshot.user_name, snapshot.frequencia_pagamento)
+    )
 
 # --- FUNÇÕES AUXILIARES DE ENTRADA ---
 
@@ -90,6 +96,12 @@ with st.sidebar:
     st.subheader("Entrada de Despesas (50% e 30%)")
     st.markdown("Digite os valores nas tabelas.")
 
+    with st.expander("📊 Métricas do cache de relatórios"):
+        st.json(cache_relatorios.estatisticas())
+        st.json(fila_relatorios.estatisticas())
+        if iniciar_exportacao_metricas():
+            st.caption(f"Métricas no formato do Prometheus em `{ARQUIVO_METRICAS}`")
+
 # --- ENTRADA DE DESPESAS USANDO st.data_editor ---
 st.subheader("Dados de Entrada ✏️")
 
@@ -145,27 +157,27 @@ if st.button("💰 Gerar Relatório e Download"):
         poupanca=poupanca_alocada
     )
 
-    # 3. Geração Otimizada (Chamada ao cache)
+    snapshot = SnapshotOrcamento.criar(
+        mes, salario, despesas_fixas, despesas_lazer, poupanca_alocada,
+        frequencia_pagamento, user_name
+    )
+
+    # 3. Geração em segundo plano (fila de relatórios + cache)
     try:
-        with st.spinner('Gerando o relatório PDF...'):
-            # Passamos o objeto 'orcamento_obj' que será mapeado para o parâmetro '_orcamento_obj'
-            pdf_bytes = get_pdf_bytes_report(
-                orcamento_obj, 
-                limites, 
-                totais_reais, 
-                saldo, 
-                user_name, 
-                frequencia_pagamento
-            )
-
-        # 4. Configuração e Exibição do Download
-        st.success("Relatório gerado com sucesso!")
-        
-        st.download_button(
-            label="✅ Clique para Baixar Relatório PDF",
-            data=pdf_bytes,
-            file_name=f"Relatorio_Dindin_{mes.replace(' ', '_')}.pdf",
-            mime="application/pdf"
+        # O snapshot é a chave do cache; o objeto 'orcamento_obj' só é usado se o PDF precisar ser gerado
+        trabalho_id = enviar_pdf_report(
+            snapshot,
+            orcamento_obj, 
+            limites, 
+            totais_reais, 
+            saldo
+        )
+        st.session_state.relatorio_app_trabalho = (snapshot.impressao(), trabalho_id)
+
+        # 4. Andamento e Download (atualizado sozinho até o PDF ficar pronto)
+        exibir_trabalho_relatorio(
+            'relatorio_app_trabalho', "✅ Clique para Baixar Relatório PDF",
+            f"Relatorio_Dindin_{mes.replace(' ', '_')}.pdf", mensagem_sucesso="Relatório gerado com sucesso!"
         )
         
         # --- Demonstração dos Resultados na Tela ---
@@ -185,4 +197,20 @@ if st.button("💰 Gerar Relatório e Download"):
 
     except Exception as e:
         # A mensagem de erro agora será mais limpa, mas ainda aponta para o gerador de PDF
-        st.error(f" Erro ao gerar o PDF: Verifique o código do gerador de PDF. Detalhes: {e}")
\ No newline at end of file
+        st.error(f" Erro ao gerar o PDF: Verifique o código do gerador de PDF. Detalhes: {e}")
+
+elif 'relatorio_app_trabalho' in st.session_state:
+    # Relatório pedido em uma execução anterior: continua exibindo o andamento/download, mas só
+    # enquanto corresponde às entradas atuais (mês, salário, itens...); senão o pedido é descartado
+    impressao_atual = SnapshotOrcamento.criar(
+        mes, salario, despesas_fixas, despesas_lazer, poupanca_alocada,
+        frequencia_pagamento, user_name
+    ).impressao()
+    if st.session_state.relatorio_app_trabalho[0] == impressao_atual:
+        exibir_trabalho_relatorio(
+            'relatorio_app_trabalho', "✅ Clique para Baixar Relatório PDF",
+            f"Relatorio_Dindin_{mes.replace(' ', '_')}.pdf", mensagem_sucesso="Relatório gerado com sucesso!"
+        )
+    else:
+        st.session_state.pop('relatorio_app_trabalho')
+        st.info("Os dados mudaram desde o último relatório. Clique em **Gerar Relatório** para um novo PDF.")
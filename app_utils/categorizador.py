@@ -0,0 +1,238 @@
+# app_utils/categorizador.py
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+from app_utils.mes_compacto import MesCompacto
+
+CATEGORIAS = ('fixas', 'lazer', 'poupanca')
+TIPOS_REGRA = ('palavra', 'regex')
+
+_RE_NAO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+# Referência numérica (\1, \2...) não escapada: muda de sentido quando as regras são unidas em uma única regex
+_RE_REFERENCIA_NUMERICA = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+
+
+@dataclass(frozen=True)
+class Regra:
+    """
+    Regra de categorização. 'palavra' casa termos inteiros na descrição, sem diferenciar
+    maiúsculas nem acentos ("pão de açúcar" casa "PAO DE ACUCAR 123"); 'regex' é uma expressão
+    regular aplicada à descrição original (sem diferenciar maiúsculas).
+    """
+    padrao: str
+    categoria: str
+    tipo: str = 'palavra'
+
+
+# Regras do sistema: valem para todos os usuários, com prioridade menor que as do próprio usuário
+REGRAS_SISTEMA = tuple(
+    [Regra(p, 'fixas') for p in (
+        'aluguel', 'condominio', 'iptu', 'ipva', 'energia', 'luz', 'enel', 'cemig', 'copel', 'agua', 'sabesp',
+        'gas', 'internet', 'telefone', 'celular', 'vivo', 'claro', 'tim', 'supermercado', 'mercado',
+        'atacadao', 'assai', 'carrefour', 'pao de acucar', 'farmacia', 'drogaria', 'droga raia',
+        'plano de saude', 'unimed', 'seguro', 'escola', 'faculdade', 'mensalidade', 'posto',
+        'combustivel', 'financiamento', 'prestacao', 'boleto',
+    )]
+    + [Regra(p, 'lazer') for p in (
+        'netflix', 'spotify', 'disney', 'prime video', 'hbo', 'youtube', 'ifood', 'rappi', 'restaurante',
+        'lanchonete', 'bar', 'pizzaria', 'hamburgueria', 'cafe', 'cinema', 'ingresso', 'show', 'steam',
+        'playstation', 'xbox', 'viagem', 'hotel', 'airbnb', 'booking', 'academia', 'smart fit', 'shopping',
+    )]
+    + [Regra(p, 'poupanca') for p in (
+        'aplicacao', 'investimento', 'tesouro direto', 'cdb', 'lci', 'lca', 'poupanca', 'corretora',
+    )]
+)
+
+
+def normalizar_descricao(texto) -> str:
+    """Minúsculas, sem acentos e com tudo que não é letra/número virando um espaço (e espaços nas pontas)."""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return f" {_RE_NAO_ALFANUMERICO.sub(' ', texto.lower()).strip()} "
+
+
+class AhoCorasick:
+    """
+    Autômato de Aho-Corasick: encontra todas as ocorrências de vários padrões em uma única
+    passada pelo texto, em tempo linear no tamanho do texto (mais o número de ocorrências).
+    As ligações de falha são resolvidas na construção (autômato determinístico), então cada
+    caractere do texto custa uma única consulta de dicionário.
+    """
+    def __init__(self, padroes):
+        arvore = [{}]  # trie: estado -> {caractere: estado filho}
+        saidas = [()]  # índices dos padrões que terminam em cada estado
+        for indice, padrao in enumerate(padroes):
+            estado = 0
+            for caractere in padrao:
+                proximo = arvore[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(arvore)
+                    arvore[estado][caractere] = proximo
+                    arvore.append({})
+                    saidas.append(())
+                estado = proximo
+            saidas[estado] += (indice,)
+
+        # Em largura: cada estado herda as transições e as saídas do seu estado de falha,
+        # que é mais raso e portanto já está completo
+        transicoes = [arvore[0]] + [None] * (len(arvore) - 1)
+        falha = [0] * len(arvore)
+        fila = deque(arvore[0].values())
+        while fila:
+            estado = fila.popleft()
+            transicoes[estado] = {**transicoes[falha[estado]], **arvore[estado]}
+            for caractere, proximo in arvore[estado].items():
+                falha[proximo] = transicoes[falha[estado]].get(caractere, 0) if estado else 0
+                saidas[proximo] += saidas[falha[proximo]]
+                fila.append(proximo)
+        self._transicoes = transicoes
+        self._saidas = saidas
+
+    def buscar(self, texto) -> list:
+        """Índices dos padrões encontrados no texto (com repetição, na ordem em que terminam)."""
+        transicoes, saidas = self._transicoes, self._saidas
+        encontrados = []
+        estado = 0
+        for caractere in texto:
+            estado = transicoes[estado].get(caractere, 0)
+            if saidas[estado]:
+                encontrados.extend(saidas[estado])
+        return encontrados
+
+
+class _NivelRegras:
+    """As regras de um nível (usuário ou sistema) compiladas em um autômato e uma única regex."""
+    def __init__(self, regras):
+        palavras = [r for r in regras if r.tipo == 'palavra' and normalizar_descricao(r.padrao).strip()]
+        self._palavras = [(len(normalizar_descricao(r.padrao)), r.categoria) for r in palavras]
+        self._automato = AhoCorasick([normalizar_descricao(r.padrao) for r in palavras]) if palavras else None
+
+        expressoes = [r for r in regras if r.tipo == 'regex' and r.padrao]
+        self._categorias_regex = {f"r{i}": r.categoria for i, r in enumerate(expressoes)}
+        self._regex = _compilar_alternativas(expressoes) if expressoes else None
+
+    def categoria(self, descricao, normalizada):
+        """O termo mais longo encontrado decide (o mais específico); sem termos, a primeira regex que casar."""
+        if self._automato is not None:
+            melhor = None
+            for indice in self._automato.buscar(normalizada):
+                if melhor is None or self._palavras[indice][0] > self._palavras[melhor][0]:
+                    melhor = indice
+            if melhor is not None:
+                return self._palavras[melhor][1]
+        if self._regex is not None:
+            encontrado = self._regex.search(descricao)
+            if encontrado:
+                return self._categorias_regex[encontrado.lastgroup]
+        return None
+
+
+def _compilar_alternativas(expressoes):
+    """Todas as regex de um nível em uma única alternação, com um grupo nomeado (r0, r1...) por regra."""
+    return re.compile('|'.join(f"(?P<r{i}>{r.padrao})" for i, r in enumerate(expressoes)), re.IGNORECASE)
+
+
+@lru_cache(maxsize=1)
+def _nivel_sistema() -> _NivelRegras:
+    return _NivelRegras(REGRAS_SISTEMA)
+
+
+def validar_regras(regras):
+    """
+    Levanta ValueError com uma mensagem legível se alguma regra for inválida. As regex são validadas
+    como serão usadas, dentro da alternação única do nível: flags globais no meio, como (?i), e
+    referências numéricas a grupos (\\1) são recusadas.
+    """
+    for regra in regras:
+        if regra.categoria not in CATEGORIAS:
+            raise ValueError(f"Categoria inválida na regra '{regra.padrao}': {regra.categoria}")
+        if regra.tipo not in TIPOS_REGRA:
+            raise ValueError(f"Tipo inválido na regra '{regra.padrao}': {regra.tipo}")
+        if regra.tipo == 'regex':
+            try:
+                compilada = re.compile(regra.padrao)
+            except re.error as e:
+                raise ValueError(f"Expressão regular inválida '{regra.padrao}': {e}") from None
+            if compilada.groupindex:
+                raise ValueError(f"A expressão '{regra.padrao}' não pode ter grupos nomeados (?P<...>).")
+            if _RE_REFERENCIA_NUMERICA.search(regra.padrao):
+                raise ValueError(f"A expressão '{regra.padrao}' não pode ter referências a grupos (\\1, \\2...).")
+            try:
+                re.compile(f"(?P<r0>{regra.padrao})")
+            except re.error as e:
+                raise ValueError(
+                    f"Expressão regular inválida '{regra.padrao}' ({e}). "
+                    "Flags como (?i) só valem no início e aqui são desnecessárias: maiúsculas já não diferem."
+                ) from None
+    expressoes = [r for r in regras if r.tipo == 'regex' and r.padrao]
+    if expressoes:
+        try:
+            _compilar_alternativas(expressoes)
+        except re.error as e:
+            raise ValueError(f"As expressões regulares não podem ser combinadas: {e}") from None
+
+
+class Categorizador:
+    """
+    Classifica descrições de gastos em 'fixas', 'lazer' ou 'poupanca' (ou None, sem regra).
+    As regras do usuário têm prioridade sobre as do sistema. Cada descrição distinta é
+    classificada uma única vez (memo), então lotes grandes custam o número de descrições distintas.
+    """
+    def __init__(self, regras_usuario=(), max_memo=100_000):
+        self.regras_usuario = tuple(regras_usuario)
+        validar_regras(self.regras_usuario)
+        self._niveis = (_NivelRegras(self.regras_usuario), _nivel_sistema())
+        self._memo = {}
+        self.max_memo = max_memo
+
+    def categorizar(self, descricao):
+        try:
+            return self._memo[descricao]
+        except KeyError:
+            pass
+        normalizada = normalizar_descricao(descricao)
+        categoria = None
+        for nivel in self._niveis:
+            categoria = nivel.categoria(descricao, normalizada)
+            if categoria is not None:
+                break
+        if len(self._memo) >= self.max_memo:
+            self._memo.clear()
+        self._memo[descricao] = categoria
+        return categoria
+
+    def categorizar_lote(self, descricoes) -> list:
+        """Categorias de uma sequência de descrições (as repetidas são classificadas uma vez só)."""
+        codigos, unicas = pd.factorize(pd.Series(descricoes, dtype=object), use_na_sentinel=False)
+        categorias = [self.categorizar(descricao) for descricao in unicas]
+        return [categorias[codigo] for codigo in codigos]
+
+
+def recategorizar_mes(registro: MesCompacto, categorizador: Categorizador):
+    """
+    Aplica as regras aos itens de um mês: itens de 'fixas' com regra de 'lazer' mudam de categoria
+    (e vice-versa) e itens com regra de 'poupanca' saem da categoria e somam na poupança.
+    Itens sem regra ficam onde estão. Retorna (novo MesCompacto, itens movidos) ou (registro, 0).
+    """
+    destinos = {'fixas': {}, 'lazer': {}}
+    poupanca = registro.poupanca_investimentos
+    movidos = 0
+    for origem, chave in (('fixas', 'despesas_fixas'), ('lazer', 'gastos_lazer')):
+        for item, valor in registro[chave].items():
+            categoria = categorizador.categorizar(item) or origem
+            if categoria != origem:
+                movidos += 1
+            if categoria == 'poupanca':
+                poupanca += valor
+            else:
+                destino = destinos[categoria]
+                destino[item] = destino.get(item, 0.0) + valor
+    if not movidos:
+        return registro, 0
+    return MesCompacto(registro.salario_liquido, destinos['fixas'], destinos['lazer'], poupanca), movidos
@@ -0,0 +1,88 @@
+# app_utils/frames_historico.py
+import numpy as np
+import pandas as pd
+
+from app_utils.orcamento_class import LoteOrcamentos
+
+CATEGORIAS_EXIBICAO = {'fixas': 'Fixa', 'lazer': 'Lazer'}
+COLUNAS_RESUMO_HISTORICO = [
+    'Salário Líquido', 'Total Gasto', 'Despesas Fixas Real', 'Lazer Real',
+    'Folga/Déficit Necessidades', 'Folga/Déficit Lazer', 'Economia Total Potencial (Folga)'
+]
+
+
+def montar_frames_historico(linhas, meses_ordenados):
+    """
+    Monta, em uma única passada pelas linhas (formato de RepositorioOrcamentos.linhas_historico),
+    o resumo mensal 50-30-20 e o DataFrame longo de itens (Mês, Item, Categoria, Valor).
+    Só entram meses com salário líquido > 0, na ordem de 'meses_ordenados'.
+    """
+    resumo = {}  # mes -> [salario, poupanca, total_fixas, total_lazer]
+    col_mes, col_item, col_categoria, col_valor = [], [], [], []
+
+    for mes, salario, poupanca, categoria, item, valor in linhas:
+        acumulado = resumo.get(mes)
+        if acumulado is None:
+            acumulado = resumo[mes] = [salario, poupanca, 0.0, 0.0]
+        if item is None:
+            continue
+        acumulado[2 if categoria == 'fixas' else 3] += valor
+        col_mes.append(mes)
+        col_item.append(item)
+        col_categoria.append(CATEGORIAS_EXIBICAO.get(categoria, categoria))
+        col_valor.append(valor)
+
+    meses = [mes for mes in meses_ordenados if mes in resumo and resumo[mes][0] > 0]
+    lote = LoteOrcamentos(
+        meses,
+        [resumo[mes][0] for mes in meses],
+        [resumo[mes][2] for mes in meses],
+        [resumo[mes][3] for mes in meses],
+        [resumo[mes][1] for mes in meses],
+    )
+    df_historico_geral = lote.calcular().set_index('Mês')[COLUNAS_RESUMO_HISTORICO]
+
+    df_itens_detalhado = pd.DataFrame({'Mês': col_mes, 'Item': col_item, 'Categoria': col_categoria, 'Valor': col_valor})
+    # Itens na ordem cronológica dos meses (as linhas do banco vêm em ordem de texto)
+    posicao = {mes: i for i, mes in enumerate(meses)}
+    ordem = df_itens_detalhado['Mês'].map(posicao)
+    df_itens_detalhado = df_itens_detalhado[ordem.notna()]
+    df_itens_detalhado = df_itens_detalhado.iloc[ordem.dropna().to_numpy().argsort(kind='stable')].reset_index(drop=True)
+    return df_historico_geral, df_itens_detalhado
+
+
+class IndiceItens:
+    """
+    Índice dos itens do histórico: cada item recebe um código (categórico, em ordem alfabética)
+    e guarda as posições das suas linhas no DataFrame longo. Consultar a série de um item é uma busca
+    no dicionário, sem varrer a coluna 'Item' a cada rerun.
+    """
+    def __init__(self, df_itens_detalhado: pd.DataFrame, meses_ordenados=()):
+        codigos, nomes = pd.factorize(df_itens_detalhado['Item'], sort=True)
+        self.nomes = list(nomes)
+        meses_com_itens = set(df_itens_detalhado['Mês'])
+        self.meses = [mes for mes in meses_ordenados if mes in meses_com_itens]
+        self._df = df_itens_detalhado.assign(Item=pd.Categorical.from_codes(codigos, categories=nomes))
+        self._posicoes = {self.nomes[codigo]: posicoes for codigo, posicoes in pd.Series(codigos).groupby(codigos).indices.items()}
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def __contains__(self, item):
+        return item in self._posicoes
+
+    def serie(self, item) -> pd.DataFrame:
+        """Linhas (Mês, Item, Categoria, Valor) do item, em ordem cronológica."""
+        posicoes = self._posicoes.get(item)
+        if posicoes is None:
+            return self._df.iloc[0:0]
+        return self._df.iloc[posicoes]
+
+    def pivo(self, itens) -> pd.DataFrame:
+        """Tabela Mês x Item com os valores dos itens escolhidos (soma se o item aparece em mais de uma categoria)."""
+        itens = [item for item in itens if item in self._posicoes]
+        if not itens:
+            return pd.DataFrame(index=pd.Index([], name='Mês'))
+        linhas = self._df.iloc[np.concatenate([self._posicoes[item] for item in itens])]
+        tabela = linhas.pivot_table(index='Mês', columns='Item', values='Valor', aggfunc='sum', observed=True)
+        return tabela.reindex(index=[mes for mes in self.meses if mes in tabela.index], columns=itens)
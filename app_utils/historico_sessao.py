@@ -0,0 +1,121 @@
+# app_utils/historico_sessao.py
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import pandas as pd
+
+from app_utils.mes_compacto import MesCompacto
+
+# Meses completos (com itens) mantidos em memória por sessão; os demais ficam só no resumo
+MESES_EM_MEMORIA = 6
+COLUNAS_RESUMO = ['salario_liquido', 'poupanca_investimentos', 'total_fixas', 'total_lazer']
+
+
+def _totais(registro: MesCompacto) -> tuple:
+    return (registro.salario_liquido, registro.poupanca_investimentos, registro.despesas_fixas.total, registro.gastos_lazer.total)
+
+
+class HistoricoSessao(MutableMapping):
+    """
+    Histórico de orçamentos da sessão ({mês: MesCompacto}) com carga sob demanda.
+    Todos os meses constam de um resumo leve (salário, poupança e totais), que responde a
+    'in', len() e à iteração; só os meses usados por último ficam completos em memória (LRU).
+    Um mês fora da memória é buscado com 'carregar' (ex.: no repositório) quando é pedido.
+    Sem 'carregar' (sessão sem banco), nenhum mês é descartado.
+    """
+    def __init__(self, resumo=(), carregar=None, carregar_todos=None, max_meses=MESES_EM_MEMORIA):
+        # resumo: {mês: (salario, poupanca, total_fixas, total_lazer)} ou pares equivalentes
+        self._resumo = dict(resumo)
+        self._meses = OrderedDict()
+        self._carregar = carregar
+        self._carregar_todos = carregar_todos
+        self.max_meses = max_meses
+        self.acertos = 0
+        self.falhas = 0
+
+    @classmethod
+    def de_meses(cls, meses, **kwargs):
+        """Histórico a partir de meses já completos ({mês: dados})."""
+        historico = cls(**kwargs)
+        historico.update(meses)
+        return historico
+
+    def _guardar(self, mes, registro):
+        self._meses[mes] = registro
+        self._meses.move_to_end(mes)
+        if self._carregar is not None:
+            while len(self._meses) > self.max_meses:
+                self._meses.popitem(last=False)
+
+    def __getitem__(self, mes) -> MesCompacto:
+        registro = self._meses.get(mes)
+        if registro is not None:
+            self.acertos += 1
+            self._meses.move_to_end(mes)
+            return registro
+        # Meses fora do resumo também são procurados (ex.: criados por outra sessão do mesmo usuário)
+        dados = self._carregar(mes) if self._carregar is not None else None
+        if dados is None:
+            raise KeyError(mes)
+        self.falhas += 1
+        registro = MesCompacto.de_dados(dados)
+        self._resumo[mes] = _totais(registro)
+        self._guardar(mes, registro)
+        return registro
+
+    def __setitem__(self, mes, dados):
+        registro = MesCompacto.de_dados(dados)
+        self._resumo[mes] = _totais(registro)
+        self._guardar(mes, registro)
+
+    def __delitem__(self, mes):
+        del self._resumo[mes]
+        self._meses.pop(mes, None)
+
+    def __iter__(self):
+        return iter(self._resumo)
+
+    def __len__(self):
+        return len(self._resumo)
+
+    def __contains__(self, mes):
+        return mes in self._resumo
+
+    def items(self):
+        """
+        Todos os meses completos, na ordem do resumo. Os que não estão em memória são lidos de uma vez
+        ('carregar_todos') e não entram no LRU, para que uma varredura não descarte os meses em uso.
+        """
+        faltantes = [mes for mes in self._resumo if mes not in self._meses]
+        lidos = {}
+        if faltantes:
+            if self._carregar_todos is not None:
+                lidos = dict(self._carregar_todos())
+            else:
+                lidos = {mes: self._carregar(mes) for mes in faltantes}
+        for mes in list(self._resumo):
+            registro = self._meses.get(mes)
+            if registro is None:
+                dados = lidos.get(mes)
+                if dados is None:
+                    continue
+                registro = MesCompacto.de_dados(dados)
+            yield mes, registro
+
+    def values(self):
+        return (registro for _, registro in self.items())
+
+    def em_memoria(self) -> list:
+        """Meses completos em memória, do usado há mais tempo ao mais recente."""
+        return list(self._meses)
+
+    def resumo(self) -> pd.DataFrame:
+        """Salário, poupança e totais de cada mês, sem carregar os itens."""
+        return pd.DataFrame.from_dict(self._resumo, orient='index', columns=COLUNAS_RESUMO, dtype=float).rename_axis('Mês')
+
+    def estatisticas(self) -> dict:
+        consultas = self.acertos + self.falhas
+        return {
+            'meses': len(self._resumo), 'em_memoria': len(self._meses), 'acertos': self.acertos, 'falhas': self.falhas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+        }
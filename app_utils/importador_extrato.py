@@ -0,0 +1,273 @@
+# app_utils/importador_extrato.py
+import codecs
+import csv
+import io
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from app_utils.mes_compacto import MesCompacto
+from app_utils.periodo import Periodo
+
+LINHAS_POR_LOTE = 50_000
+TAMANHO_MAXIMO_ITEM = 60
+_AMOSTRA = 64 * 1024  # bytes do início do arquivo usados para detectar codificação e formato
+
+# Nomes de coluna reconhecidos (sem acento, minúsculos) para cada campo do extrato
+COLUNAS_DATA = ('data', 'date', 'data lancamento', 'data do lancamento', 'data movimento', 'dt')
+COLUNAS_DESCRICAO = ('descricao', 'historico', 'lancamento', 'description', 'memo', 'estabelecimento', 'titulo')
+COLUNAS_VALOR = ('valor', 'amount', 'valor (r$)', 'quantia', 'montante')
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y', '%Y%m%d')
+
+CHAVES_CATEGORIA = {'fixas': 'despesas_fixas', 'lazer': 'gastos_lazer'}
+
+_RE_TRANSACAO_OFX = re.compile(r'<(DTPOSTED|TRNAMT|MEMO|NAME)>([^<\r\n]*)', re.IGNORECASE)
+# As tags do OFX não diferenciam maiúsculas de minúsculas (há bancos que exportam '<stmttrn>')
+_RE_INICIO_TRANSACAO_OFX = re.compile(r'<STMTTRN>', re.IGNORECASE)
+_RE_FIM_TRANSACAO_OFX = re.compile(r'</STMTTRN>', re.IGNORECASE)
+_RE_DECIMAL_VIRGULA = re.compile(r',\d{1,2}$')
+
+
+class ErroImportacao(ValueError):
+    """O arquivo não pôde ser interpretado como extrato."""
+
+
+@dataclass
+class ResultadoImportacao:
+    """Gastos agregados de um extrato e as estatísticas da leitura."""
+    totais: dict = field(default_factory=dict)  # (ordinal do período, item) -> total gasto
+    linhas: int = 0
+    gastos: int = 0
+    ignoradas: int = 0  # linhas sem data/valor válidos
+    segundos: float = 0.0
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.segundos if self.segundos > 0 else 0.0
+
+    def meses(self) -> list:
+        """Rótulos ("Mês Ano") dos meses com gastos importados, em ordem cronológica."""
+        return [str(Periodo.de_ordinal(o)) for o in sorted({ordinal for ordinal, _ in self.totais})]
+
+
+def _normalizar_nome(texto) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', str(texto)) if not unicodedata.combining(c)).strip().lower()
+
+
+def abrir_texto(arquivo):
+    """
+    Abre o arquivo (caminho, bytes ou objeto binário, como o do st.file_uploader) para leitura
+    em fluxo. A codificação é detectada no início do arquivo: UTF-8, ou Windows-1252 (comum nos bancos).
+    """
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = io.BytesIO(arquivo)
+    if isinstance(arquivo, str):
+        binario = open(arquivo, 'rb', buffering=_AMOSTRA)
+    else:
+        binario = io.BufferedReader(arquivo, _AMOSTRA)
+    inicio = binario.peek(_AMOSTRA)[:_AMOSTRA]
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(inicio)  # um caractere cortado no fim não é erro
+        codificacao = 'utf-8-sig'
+    except UnicodeDecodeError:
+        codificacao = 'cp1252'
+    return io.TextIOWrapper(binario, encoding=codificacao, errors='replace', newline='')
+
+
+def _coluna(cabecalho, candidatos, obrigatoria=True):
+    normalizados = [_normalizar_nome(c) for c in cabecalho]
+    for candidato in candidatos:
+        if candidato in normalizados:
+            return cabecalho[normalizados.index(candidato)]
+    if obrigatoria:
+        raise ErroImportacao(f"Coluna não encontrada no CSV (esperado um destes nomes: {', '.join(candidatos)}).")
+    return None
+
+
+def lotes_csv(texto, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Lê o CSV em lotes de até 'linhas_por_lote' linhas (DataFrames com data, descricao e valor em texto).
+    O separador (',', ';', tab ou '|') é detectado na primeira linha.
+    """
+    primeira = texto.readline()
+    if not primeira.strip():
+        raise ErroImportacao("Arquivo CSV vazio.")
+    try:
+        separador = csv.Sniffer().sniff(primeira, delimiters=',;\t|').delimiter
+    except csv.Error:
+        separador = ';' if primeira.count(';') > primeira.count(',') else ','
+    cabecalho = next(csv.reader([primeira], delimiter=separador))
+    colunas = {
+        _coluna(cabecalho, COLUNAS_DATA): 'data',
+        _coluna(cabecalho, COLUNAS_DESCRICAO): 'descricao',
+        _coluna(cabecalho, COLUNAS_VALOR): 'valor',
+    }
+    leitor = pd.read_csv(
+        texto, sep=separador, names=cabecalho, header=None, usecols=list(colunas), dtype=str,
+        keep_default_na=False, chunksize=linhas_por_lote, on_bad_lines='skip', engine='c',
+    )
+    for lote in leitor:
+        yield lote.rename(columns=colunas)
+
+
+def lotes_ofx(texto, linhas_por_lote=LINHAS_POR_LOTE, bloco_leitura=256 * 1024):
+    """
+    Lê as transações (<STMTTRN>) de um OFX em fluxo, aceitando tanto o formato SGML (tags sem
+    fechamento, OFX 1.x) quanto o XML (OFX 2.x). Gera DataFrames como lotes_csv().
+    """
+    datas, descricoes, valores = [], [], []
+    resto = ''
+    primeiro = True
+    while True:
+        bloco = texto.read(bloco_leitura)
+        atual = resto + bloco
+        partes = _RE_INICIO_TRANSACAO_OFX.split(atual) if atual else []
+        if primeiro:
+            if len(partes) < 2:
+                # Ainda no cabeçalho: guarda só o fim, onde a primeira tag pode ter sido cortada entre blocos
+                partes = [atual[-len('<STMTTRN>'):]] if bloco else []
+            else:
+                partes = partes[1:]  # cabeçalho do arquivo, antes da primeira transação
+                primeiro = False
+        # A última parte pode estar incompleta até o fim do arquivo
+        resto = partes.pop() if bloco and partes else ''
+        for parte in partes:
+            campos = {tag.upper(): valor.strip() for tag, valor in _RE_TRANSACAO_OFX.findall(_RE_FIM_TRANSACAO_OFX.split(parte, 1)[0])}
+            datas.append(campos.get('DTPOSTED', '')[:8])
+            descricoes.append(campos.get('MEMO') or campos.get('NAME', ''))
+            valores.append(campos.get('TRNAMT', ''))
+        if len(datas) >= linhas_por_lote or (not bloco and datas):
+            yield pd.DataFrame({'data': datas, 'descricao': descricoes, 'valor': valores})
+            datas, descricoes, valores = [], [], []
+        if not bloco:
+            break
+
+
+def _valores(serie: pd.Series) -> pd.Series:
+    """Converte valores em texto ("-1.234,56", "R$ 45,90", "-45.90") para float; inválidos viram NaN."""
+    limpos = serie.str.replace(r'[R$\s]', '', regex=True)
+    if limpos.str.contains(_RE_DECIMAL_VIRGULA, regex=True).any():
+        limpos = limpos.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    else:
+        limpos = limpos.str.replace(',', '', regex=False)
+    return pd.to_numeric(limpos, errors='coerce')
+
+
+def _formato_data(amostra: pd.Series):
+    """O primeiro formato de FORMATOS_DATA que interpreta toda a amostra (ou o que interpreta mais)."""
+    melhor, validos_melhor = None, -1
+    for formato in FORMATOS_DATA:
+        validos = pd.to_datetime(amostra, format=formato, errors='coerce').notna().sum()
+        if validos == len(amostra):
+            return formato
+        if validos > validos_melhor:
+            melhor, validos_melhor = formato, validos
+    return melhor
+
+
+class ImportadorExtrato:
+    """
+    Importa extratos bancários (CSV ou OFX) em fluxo: cada lote é interpretado de forma vetorizada
+    (datas, valores e descrições) e somado por (mês, item). A memória depende apenas do tamanho
+    do lote e do número de pares mês/item distintos, não do número de linhas do arquivo.
+    Só as saídas (valores negativos) são consideradas gastos.
+    """
+    def __init__(self, linhas_por_lote=LINHAS_POR_LOTE):
+        self.linhas_por_lote = linhas_por_lote
+        self._formato_data = None
+
+    def importar(self, arquivo, formato=None, progresso=None) -> ResultadoImportacao:
+        """
+        formato: 'csv' ou 'ofx' (detectado pelo conteúdo se None).
+        progresso: função opcional chamada a cada lote com o ResultadoImportacao parcial.
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoImportacao()
+        self._formato_data = None
+        texto = abrir_texto(arquivo)
+        if formato is None:
+            inicio_arquivo = texto.buffer.peek(_AMOSTRA)[:_AMOSTRA].decode('latin-1').upper()
+            formato = 'ofx' if 'OFXHEADER' in inicio_arquivo or '<OFX>' in inicio_arquivo else 'csv'
+        lotes = lotes_ofx(texto, self.linhas_por_lote) if formato == 'ofx' else lotes_csv(texto, self.linhas_por_lote)
+        try:
+            for lote in lotes:
+                self._agregar(lote, resultado)
+                resultado.segundos = time.perf_counter() - inicio
+                if progresso:
+                    progresso(resultado)
+        except pd.errors.ParserError as e:
+            raise ErroImportacao(f"Não foi possível ler o extrato: {e}") from e
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def _agregar(self, lote: pd.DataFrame, resultado: ResultadoImportacao):
+        resultado.linhas += len(lote)
+        if self._formato_data is None:
+            amostra = lote['data'][lote['data'].str.strip() != ''].head(200)
+            self._formato_data = _formato_data(amostra.str.strip()) if len(amostra) else FORMATOS_DATA[0]
+        datas = pd.to_datetime(lote['data'].str.strip(), format=self._formato_data, errors='coerce')
+        valores = _valores(lote['valor'])
+
+        validas = datas.notna().to_numpy() & valores.notna().to_numpy()
+        resultado.ignoradas += int((~validas).sum())
+        gastos = validas & (valores.to_numpy() < 0)
+        resultado.gastos += int(gastos.sum())
+        if not gastos.any():
+            return
+
+        ordinais = (datas.dt.year.to_numpy()[gastos] * 12 + datas.dt.month.to_numpy()[gastos] - 1).astype(np.int64)
+        itens = (
+            lote['descricao'][gastos].str.strip().str.replace(r'\s+', ' ', regex=True)
+            .str.slice(0, TAMANHO_MAXIMO_ITEM).replace('', 'Sem descrição')
+        )
+        por_item = pd.Series(-valores.to_numpy()[gastos]).groupby([ordinais, itens.to_numpy()], sort=False).sum()
+        totais = resultado.totais
+        for chave, valor in zip(por_item.index.tolist(), por_item.to_numpy().tolist()):
+            totais[chave] = totais.get(chave, 0.0) + valor
+
+
+def aplicar_importacao(historico, totais, categoria='lazer', ano_padrao=None, categorizar=None) -> dict:
+    """
+    Monta os registros (MesCompacto) dos meses afetados pela importação, sem alterar 'historico'.
+    Os itens importados substituem os de mesmo nome (reimportar o mesmo extrato não duplica
+    valores); os demais itens, o salário e a poupança do mês são mantidos.
+    'categorizar' (item -> 'fixas'/'lazer'/'poupanca' ou None) escolhe a categoria de cada item,
+    com 'categoria' para os sem regra; os itens de poupança somados passam a ser a poupança do mês.
+    Meses que já existem com outro rótulo (ex.: "dez/2025") são reconhecidos pelo período.
+    Retorna {rótulo do mês: MesCompacto}.
+    """
+    rotulos = {}
+    for rotulo in historico:
+        periodo = Periodo.de_texto(rotulo, ano_padrao)
+        if periodo is not None:
+            rotulos.setdefault(periodo.ordinal, rotulo)
+
+    por_mes = {}
+    for (ordinal, item), valor in totais.items():
+        por_mes.setdefault(ordinal, {})[item] = round(valor, 2)
+
+    alterados = {}
+    for ordinal, itens in sorted(por_mes.items()):
+        rotulo = rotulos.get(ordinal) or str(Periodo.de_ordinal(ordinal))
+        atual = MesCompacto.de_dados(historico[rotulo]) if rotulo in historico else MesCompacto()
+        categorias = {nome: dict(atual[chave].items()) for nome, chave in CHAVES_CATEGORIA.items()}
+        poupanca = None
+        for item, valor in itens.items():
+            destino = (categorizar(item) if categorizar else None) or categoria
+            for nome, itens_categoria in categorias.items():
+                if nome != destino:
+                    itens_categoria.pop(item, None)  # o item muda de categoria
+            if destino == 'poupanca':
+                poupanca = (poupanca or 0.0) + valor
+            else:
+                categorias[destino][item] = valor
+        alterados[rotulo] = MesCompacto(
+            atual.salario_liquido, categorias['fixas'], categorias['lazer'],
+            atual.poupanca_investimentos if poupanca is None else round(poupanca, 2)
+        )
+    return alterados
@@ -0,0 +1,126 @@
+# app_utils/mes_compacto.py
+import sys
+from array import array
+from collections.abc import Mapping
+
+from app_utils.orcamento_class import ItensCategoria
+
+
+class BlocoItens(Mapping):
+    """
+    Itens de uma categoria em formato compacto e imutável: nomes internados (compartilhados
+    entre meses) em uma tupla e valores em um array tipado de doubles.
+    Blocos não mudam depois de criados, então podem ser compartilhados entre versões do mês.
+    """
+    __slots__ = ('nomes', 'valores', 'total')
+
+    def __init__(self, nomes=(), valores=()):
+        self.nomes = tuple(sys.intern(str(nome)) for nome in nomes)
+        self.valores = array('d', valores)
+        self.total = sum(self.valores, 0.0)
+
+    @classmethod
+    def sobre_buffer(cls, nomes, valores):
+        """
+        Bloco que usa como valores o próprio buffer de doubles recebido (ex.: a fatia NumPy de uma coluna
+        Arrow), sem copiá-lo: a memoryview mantém o buffer vivo enquanto o bloco existir.
+        """
+        bloco = cls.__new__(cls)
+        bloco.nomes = tuple(sys.intern(str(nome)) for nome in nomes)
+        bloco.valores = memoryview(valores).toreadonly()
+        bloco.total = sum(bloco.valores, 0.0)
+        return bloco
+
+    @classmethod
+    def de_itens(cls, itens):
+        itens = itens.items() if isinstance(itens, Mapping) else itens
+        nomes, valores = [], []
+        for nome, valor in itens:
+            nomes.append(nome)
+            valores.append(float(valor or 0.0))
+        return cls(nomes, valores)
+
+    def __getitem__(self, nome):
+        try:
+            return self.valores[self.nomes.index(nome)]
+        except ValueError:
+            raise KeyError(nome) from None
+
+    def __iter__(self):
+        return iter(self.nomes)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def items(self):
+        return zip(self.nomes, self.valores)
+
+    def values(self):
+        return iter(self.valores)
+
+    def para_itens(self) -> ItensCategoria:
+        """Materializa uma cópia editável, lembrando de qual bloco ela veio (para copy-on-write)."""
+        itens = ItensCategoria(zip(self.nomes, self.valores))
+        itens.marcar_origem(self)
+        return itens
+
+
+BLOCO_VAZIO = BlocoItens()
+
+
+def _bloco_de(itens) -> BlocoItens:
+    """Reaproveita o bloco de origem se os itens não foram alterados desde que foram materializados."""
+    if isinstance(itens, BlocoItens):
+        return itens
+    if isinstance(itens, ItensCategoria) and itens.inalterado_desde_origem():
+        return itens.origem
+    if not itens:
+        return BLOCO_VAZIO
+    return BlocoItens.de_itens(itens)
+
+
+class MesCompacto(Mapping):
+    """
+    Registro imutável de um mês no histórico. Mantém a interface de dicionário usada pelo
+    restante da aplicação (dados.get('salario_liquido'), dados['despesas_fixas'], ...),
+    mas guarda os itens em BlocoItens compartilháveis.
+    """
+    __slots__ = ('salario_liquido', 'poupanca_investimentos', 'despesas_fixas', 'gastos_lazer')
+
+    CAMPOS = ('salario_liquido', 'despesas_fixas', 'gastos_lazer', 'poupanca_investimentos')
+
+    def __init__(self, salario_liquido=0.0, despesas_fixas=BLOCO_VAZIO, gastos_lazer=BLOCO_VAZIO, poupanca_investimentos=0.0):
+        self.salario_liquido = float(salario_liquido or 0.0)
+        self.despesas_fixas = _bloco_de(despesas_fixas)
+        self.gastos_lazer = _bloco_de(gastos_lazer)
+        self.poupanca_investimentos = float(poupanca_investimentos or 0.0)
+
+    @classmethod
+    def de_dados(cls, dados):
+        """Converte o dicionário de um mês (formato antigo/JSON) em MesCompacto; reaproveita se já for um."""
+        if isinstance(dados, MesCompacto):
+            return dados
+        return cls(
+            dados.get('salario_liquido', 0.0), dados.get('despesas_fixas', {}),
+            dados.get('gastos_lazer', {}), dados.get('poupanca_investimentos', 0.0)
+        )
+
+    def __getitem__(self, campo):
+        if campo not in self.CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __iter__(self):
+        return iter(self.CAMPOS)
+
+    def __len__(self):
+        return len(self.CAMPOS)
+
+    def para_dict(self) -> dict:
+        """Dicionário simples (serializável em JSON) com os dados do mês."""
+        return {
+            'salario_liquido': self.salario_liquido,
+            'despesas_fixas': dict(self.despesas_fixas.items()),
+            'gastos_lazer': dict(self.gastos_lazer.items()),
+            'poupanca_investimentos': self.poupanca_investimentos,
+        }
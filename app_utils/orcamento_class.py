@@ -1,3 +1,161 @@
+import hashlib
+import json
+from dataclasses import dataclass, astuple
+
+import numpy as np
+import pandas as pd
+
+from app_utils.perfil import medido
+
+# Regra 50-30-20: (nome do limite, percentual do salário líquido)
+PERCENTUAIS_50_30_20 = (
+    ('Necessidades (50%)', 0.50),
+    ('Desejos/Lazer (30%)', 0.30),
+    ('Poupança/Investimento (20%)', 0.20),
+)
+
+
+def _calcular_economia(limite_fixas, limite_lazer, meta_poupanca, total_fixas, total_lazer, total_poupanca):
+    """
+    Núcleo do cálculo de folga/déficit, compartilhado por Orcamento (escalares)
+    e LoteOrcamentos (arrays NumPy): as mesmas operações servem para os dois casos.
+    """
+    return (
+        limite_fixas - total_fixas,
+        limite_lazer - total_lazer,
+        total_poupanca - meta_poupanca,
+    )
+
+
+class ItensCategoria(dict):
+    """
+    Dicionário {item: valor} de uma categoria que mantém o total atualizado a cada
+    inclusão, edição ou exclusão, para não somar todos os itens de novo a cada rerun.
+    'versao' muda a cada alteração e permite invalidar caches derivados.
+    """
+    __slots__ = ('total', 'versao', 'origem', 'versao_origem')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.total = sum(dict.values(self), 0.0)
+        self.versao = 0
+        self.origem = None
+        self.versao_origem = None
+
+    def marcar_origem(self, origem):
+        """Registra o bloco imutável que tem o mesmo conteúdo destes itens (para copy-on-write)."""
+        self.origem = origem
+        self.versao_origem = self.versao
+
+    def inalterado_desde_origem(self) -> bool:
+        return self.origem is not None and self.versao == self.versao_origem
+
+    @classmethod
+    def de(cls, itens):
+        """Reaproveita o objeto se já for ItensCategoria; caso contrário, cria um a partir do dicionário."""
+        return itens if isinstance(itens, cls) else cls(itens or {})
+
+    def __setitem__(self, item, valor):
+        self.total += valor - dict.get(self, item, 0.0)
+        dict.__setitem__(self, item, valor)
+        self.versao += 1
+
+    def __delitem__(self, item):
+        self.total -= dict.__getitem__(self, item)
+        dict.__delitem__(self, item)
+        self.versao += 1
+
+    def pop(self, item, *padrao):
+        if item in self:
+            valor = self[item]
+            del self[item]
+            return valor
+        return dict.pop(self, item, *padrao)
+
+    def popitem(self):
+        item, valor = dict.popitem(self)
+        self.total -= valor
+        self.versao += 1
+        return item, valor
+
+    def setdefault(self, item, padrao=0.0):
+        if item not in self:
+            self[item] = padrao
+        return self[item]
+
+    def update(self, *args, **kwargs):
+        for item, valor in dict(*args, **kwargs).items():
+            self[item] = valor
+
+    def __ior__(self, outro):
+        self.update(outro)
+        return self
+
+    def clear(self):
+        dict.clear(self)
+        self.total = 0.0
+        self.versao += 1
+
+    def aplicar_edicoes(self, nomes, edicoes):
+        """
+        Aplica as edições de um st.data_editor com colunas 'Item' e 'Valor' montado a partir destes
+        itens ('nomes' na ordem das linhas): {'edited_rows': {linha: {coluna: valor}}, 'added_rows': [...],
+        'deleted_rows': [...]}. Só as linhas alteradas são tocadas (o total acompanha a cada passo).
+        Renomear um item move o valor para o novo nome; itens sem nome ou com valor vazio ou <= 0 saem.
+        Um nome repetido (renomear para um item existente, ou duas linhas iguais) levanta ValueError
+        sem alterar nada. Retorna (linhas alteradas, nomes das linhas que ficaram de fora).
+        """
+        removidos = [nomes[int(linha)] for linha in edicoes.get('deleted_rows', [])]
+        excluidos = set(removidos)
+        gravar = []
+        for linha, mudancas in edicoes.get('edited_rows', {}).items():
+            nome = nomes[int(linha)]
+            if nome in excluidos:
+                continue
+            novo_nome = mudancas.get('Item', nome)
+            valor = mudancas.get('Valor', self.get(nome))
+            removidos.append(nome)
+            gravar.append((novo_nome, valor))
+        for linha in edicoes.get('added_rows', []):
+            gravar.append((linha.get('Item'), linha.get('Valor')))
+
+        validos, ignorados = [], []
+        for nome, valor in gravar:
+            nome = str(nome).strip() if nome is not None else ''
+            if nome and valor is not None and valor > 0:
+                validos.append((nome, float(valor)))
+            else:
+                ignorados.append(nome or '(sem nome)')
+
+        # Nenhum nome pode sobrar em dobro: nem entre as linhas gravadas, nem com um item que não foi tocado
+        mantidos = set(self) - set(removidos)
+        vistos = set()
+        for nome, _ in validos:
+            if nome in mantidos or nome in vistos:
+                raise ValueError(f'O item "{nome}" aparece mais de uma vez. Use outro nome ou junte os valores em uma só linha.')
+            vistos.add(nome)
+
+        # Primeiro saem os nomes antigos, depois entram os novos (trocas de nome entre dois itens funcionam)
+        for nome in removidos:
+            self.pop(nome, None)
+        for nome, valor in validos:
+            self[nome] = valor
+        alteradas = len(edicoes.get('deleted_rows', [])) + len(edicoes.get('edited_rows', {})) + len(edicoes.get('added_rows', []))
+        return alteradas, ignorados
+
+    def copy(self):
+        copia = ItensCategoria.__new__(ItensCategoria)
+        dict.update(copia, self)
+        copia.total = self.total
+        copia.versao = 0
+        copia.origem = None
+        copia.versao_origem = None
+        return copia
+
+    def __reduce__(self):
+        return (ItensCategoria, (dict(self),))
+
+
 class Orcamento:
     """
     Classe para gerenciar o orçamento 50-30-20.
@@ -6,36 +164,76 @@ class Orcamento:
     def __init__(self, salario_liquido, mes, despesas_fixas, gastos_lazer, poupanca_investimentos):
         self.salario_liquido = salario_liquido
         self.mes = mes
-        self.despesas_fixas = despesas_fixas
-        self.gastos_lazer = gastos_lazer
+        # As coleções de itens pertencem ao orçamento e mantêm os totais atualizados
+        self.despesas_fixas = ItensCategoria.de(despesas_fixas)
+        self.gastos_lazer = ItensCategoria.de(gastos_lazer)
         self.poupanca_investimentos = poupanca_investimentos
+        self._cache_totais = (None, None)
+
+    def _itens(self, categoria: str) -> ItensCategoria:
+        if categoria == 'fixas':
+            return self.despesas_fixas
+        elif categoria == 'lazer':
+            return self.gastos_lazer
+        raise ValueError(f"Categoria de itens inválida: {categoria}")
 
     def calcular_total_categoria(self, categoria: str) -> float:
-        """Calcula o total de gastos para uma categoria específica."""
+        """Retorna o total de gastos de uma categoria (mantido incrementalmente, sem somar os itens)."""
         if categoria == 'fixas':
-            return sum(self.despesas_fixas.values())
+            return self.despesas_fixas.total
         elif categoria == 'lazer':
-            return sum(self.gastos_lazer.values())
+            return self.gastos_lazer.total
         elif categoria == 'poupanca':
             return self.poupanca_investimentos
         return 0.0
 
+    def adicionar_item(self, categoria: str, item, valor):
+        """Inclui ou edita um item, atualizando o total da categoria."""
+        self._itens(categoria)[item] = valor
+
+    def remover_item(self, categoria: str, item):
+        """Exclui um item (se existir), atualizando o total da categoria."""
+        self._itens(categoria).pop(item, None)
+
+    @medido('orcamento:totais')
+    def calcular_totais_reais(self) -> dict:
+        """
+        Retorna os totais reais do mês. O resultado fica em cache até que itens
+        ou poupança mudem (a chave usa a versão de cada coleção de itens).
+        """
+        chave = (
+            id(self.despesas_fixas), self.despesas_fixas.versao,
+            id(self.gastos_lazer), self.gastos_lazer.versao,
+            self.poupanca_investimentos
+        )
+        chave_cache, totais = self._cache_totais
+        if chave_cache != chave:
+            total_fixas = self.despesas_fixas.total
+            total_lazer = self.gastos_lazer.total
+            totais = {
+                'total_fixas': total_fixas,
+                'total_lazer': total_lazer,
+                'total_poupanca': self.poupanca_investimentos,
+                'total_gasto_real': total_fixas + total_lazer + self.poupanca_investimentos
+            }
+            self._cache_totais = (chave, totais)
+        return dict(totais)
+
+    @medido('orcamento:limites')
     def calcular_limites_50_30_20(self) -> dict:
         """Calcula os valores ideais (limites) com base na regra 50-30-20."""
         if self.salario_liquido <= 0:
             return {}
-        limites = {
-            'Necessidades (50%)': self.salario_liquido * 0.50,
-            'Desejos/Lazer (30%)': self.salario_liquido * 0.30,
-            'Poupança/Investimento (20%)': self.salario_liquido * 0.20
-        }
-        return limites
+        return {nome: self.salario_liquido * percentual for nome, percentual in PERCENTUAIS_50_30_20}
 
+    @medido('orcamento:economia')
     def calcular_economizado(self, limites, totais_reais):
         """Calcula a diferença entre o limite ideal e o gasto real para cada categoria."""
-        economia_fixas = limites.get('Necessidades (50%)', 0) - totais_reais['total_fixas']
-        economia_lazer = limites.get('Desejos/Lazer (30%)', 0) - totais_reais['total_lazer']
-        economia_poupanca = totais_reais['total_poupanca'] - limites.get('Poupança/Investimento (20%)', 0)
+        economia_fixas, economia_lazer, economia_poupanca = _calcular_economia(
+            limites.get('Necessidades (50%)', 0), limites.get('Desejos/Lazer (30%)', 0),
+            limites.get('Poupança/Investimento (20%)', 0),
+            totais_reais['total_fixas'], totais_reais['total_lazer'], totais_reais['total_poupanca']
+        )
         
         return {
             'fixas': economia_fixas,
@@ -43,6 +241,7 @@ class Orcamento:
             'poupanca_extra': economia_poupanca
         }
 
+    @medido('orcamento:divisao_quinzenal')
     def calcular_divisao_quinzenal(self, limites_50_30_20: dict):
         """
         Calcula a divisão ideal para as categorias Necessidades (50%) e Lazer (30%) 
@@ -62,4 +261,125 @@ class Orcamento:
         limites_quinzenais['Lazer - Início (60%)'] = limite_lazer * 0.60
         limites_quinzenais['Lazer - Meio (40%)'] = limite_lazer * 0.40
         
-        return limites_quinzenais
\ No newline at end of file
+        return limites_quinzenais
+
+
+class LoteOrcamentos:
+    """
+    Versão vetorizada do Orcamento: calcula a regra 50-30-20 para muitos meses
+    (ou meses de muitos usuários) de uma só vez, com arrays NumPy alinhados por posição.
+    Recebe os totais já somados por categoria (ex.: RepositorioOrcamentos.resumo_meses).
+    """
+    def __init__(self, meses, salario_liquido, total_fixas, total_lazer, poupanca_investimentos, user_email=None):
+        self.meses = np.asarray(meses, dtype=object)
+        self.salario_liquido = np.asarray(salario_liquido, dtype=float)
+        self.total_fixas = np.asarray(total_fixas, dtype=float)
+        self.total_lazer = np.asarray(total_lazer, dtype=float)
+        self.poupanca_investimentos = np.asarray(poupanca_investimentos, dtype=float)
+        self.user_email = np.asarray(user_email, dtype=object) if user_email is not None else None
+
+    @classmethod
+    def de_totais_mensais(cls, linhas):
+        """Cria o lote a partir de linhas (mes, salario_liquido, poupanca_investimentos, total_fixas, total_lazer)."""
+        linhas = list(linhas)
+        if not linhas:
+            return cls([], [], [], [], [])
+        meses, salarios, poupancas, fixas, lazer = zip(*linhas)
+        return cls(meses, salarios, fixas, lazer, poupancas)
+
+    @classmethod
+    def de_orcamentos(cls, orcamentos):
+        """Cria o lote a partir de objetos Orcamento (soma os itens de cada um)."""
+        orcamentos = list(orcamentos)
+        return cls(
+            [o.mes for o in orcamentos],
+            [o.salario_liquido for o in orcamentos],
+            [o.calcular_total_categoria('fixas') for o in orcamentos],
+            [o.calcular_total_categoria('lazer') for o in orcamentos],
+            [o.poupanca_investimentos for o in orcamentos],
+        )
+
+    def __len__(self):
+        return len(self.meses)
+
+    def calcular_limites_50_30_20(self) -> dict:
+        """Limites ideais por mês ({nome: array}); meses sem salário têm limite 0."""
+        salario_valido = np.where(self.salario_liquido > 0, self.salario_liquido, 0.0)
+        return {nome: salario_valido * percentual for nome, percentual in PERCENTUAIS_50_30_20}
+
+    @medido('orcamento:lote')
+    def calcular(self) -> pd.DataFrame:
+        """Calcula limites, totais reais, saldo, folga/déficit e economia potencial em uma única passada."""
+        limites = self.calcular_limites_50_30_20()
+        total_gasto_real = self.total_fixas + self.total_lazer + self.poupanca_investimentos
+        economia_fixas, economia_lazer, economia_poupanca = _calcular_economia(
+            limites['Necessidades (50%)'], limites['Desejos/Lazer (30%)'], limites['Poupança/Investimento (20%)'],
+            self.total_fixas, self.total_lazer, self.poupanca_investimentos
+        )
+
+        colunas = {'Mês': self.meses}
+        if self.user_email is not None:
+            colunas['Usuário'] = self.user_email
+        colunas.update({
+            'Salário Líquido': self.salario_liquido,
+            **limites,
+            'Despesas Fixas Real': self.total_fixas,
+            'Lazer Real': self.total_lazer,
+            'Poupança Real': self.poupanca_investimentos,
+            'Total Gasto': total_gasto_real,
+            'Saldo': self.salario_liquido - total_gasto_real,
+            'Folga/Déficit Necessidades': economia_fixas,
+            'Folga/Déficit Lazer': economia_lazer,
+            'Poupança Extra': economia_poupanca,
+            'Economia Total Potencial (Folga)': np.maximum(0.0, economia_fixas + economia_lazer),
+        })
+        return pd.DataFrame(colunas)
+
+
+@dataclass(frozen=True)
+class SnapshotOrcamento:
+    """
+    Cópia imutável e hashable de tudo que define um relatório mensal.
+    Usada como chave real de cache: dois orçamentos só compartilham um PDF
+    se mês, salário, todos os itens, poupança, frequência e usuário forem iguais.
+    """
+    mes: str
+    salario_liquido: float
+    despesas_fixas: tuple
+    gastos_lazer: tuple
+    poupanca_investimentos: float
+    frequencia_pagamento: str
+    user_name: str
+
+    @classmethod
+    def criar(cls, mes, salario_liquido, despesas_fixas, gastos_lazer, poupanca_investimentos, frequencia_pagamento, user_name):
+        """Normaliza os dados (itens ordenados, valores float) e cria o snapshot."""
+        return cls(
+            mes=str(mes),
+            salario_liquido=float(salario_liquido),
+            despesas_fixas=tuple(sorted((str(k), float(v)) for k, v in despesas_fixas.items())),
+            gastos_lazer=tuple(sorted((str(k), float(v)) for k, v in gastos_lazer.items())),
+            poupanca_investimentos=float(poupanca_investimentos),
+            frequencia_pagamento=str(frequencia_pagamento),
+            user_name=str(user_name),
+        )
+
+    @classmethod
+    def de_orcamento(cls, orcamento: Orcamento, frequencia_pagamento, user_name):
+        return cls.criar(
+            orcamento.mes, orcamento.salario_liquido, orcamento.despesas_fixas,
+            orcamento.gastos_lazer, orcamento.poupanca_investimentos,
+            frequencia_pagamento, user_name
+        )
+
+    def para_orcamento(self) -> Orcamento:
+        """Reconstrói um Orcamento (mutável) a partir do snapshot."""
+        return Orcamento(
+            self.salario_liquido, self.mes, dict(self.despesas_fixas),
+            dict(self.gastos_lazer), self.poupanca_investimentos
+        )
+
+    def impressao(self) -> str:
+        """Impressão digital (sha256) estável do conteúdo, útil para guardar no session_state."""
+        texto = json.dumps(astuple(self), ensure_ascii=False)
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
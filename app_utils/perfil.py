@@ -0,0 +1,287 @@
+# app_utils/perfil.py
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+# Perfil de execução, opcional: DINDIN_PERFIL=1 liga os ganchos. Desligado, os decoradores devolvem a
+# própria função e medir() um contexto vazio, sem custo nas execuções.
+ATIVO = os.environ.get('DINDIN_PERFIL', '') not in ('', '0')
+# Cada execução concluída vira uma linha JSON neste arquivo (para análise fora do app)
+ARQUIVO_PERFIL = os.environ.get('DINDIN_PERFIL_ARQUIVO', 'perfil_execucoes.jsonl')
+EXECUCOES_POR_SESSAO = 50
+
+_SEM_MEDICAO = nullcontext()
+
+
+def _linhas_fases(fases) -> list:
+    """[(fase, chamadas, ms total, ms médio, ms máximo)], da fase mais cara para a mais barata."""
+    linhas = [
+        (fase, chamadas, segundos * 1000, segundos * 1000 / chamadas, maior * 1000)
+        for fase, (chamadas, segundos, maior) in fases.items()
+    ]
+    return sorted(linhas, key=lambda linha: linha[2], reverse=True)
+
+
+class Execucao:
+    """
+    Uma execução medida: um rerun da página, o rerun de um fragmento ou um trabalho em segundo plano
+    (ex.: geração de PDF). Guarda, por fase, o número de chamadas, o tempo total e o maior tempo.
+    """
+    def __init__(self, origem, sessao=None, sessao_id=None):
+        self.origem = origem
+        self.sessao = sessao
+        self.sessao_id = sessao_id
+        self.inicio = time.time()
+        self._inicio_relogio = time.perf_counter()
+        self._fim_relogio = self._inicio_relogio
+        self.fases = {}  # fase -> [chamadas, segundos, maior]
+        self.segundos = 0.0
+        self.status = 'aberta'
+
+    def registrar(self, fase, segundos):
+        medida = self.fases.get(fase)
+        if medida is None:
+            self.fases[fase] = [1, segundos, segundos]
+        else:
+            medida[0] += 1
+            medida[1] += segundos
+            medida[2] = max(medida[2], segundos)
+        self._fim_relogio = time.perf_counter()
+
+    def concluir(self, status):
+        # Execuções fechadas só pela seguinte (ex.: páginas sem fim explícito) contam até a última fase medida
+        fim = time.perf_counter() if status != 'sem_fim' else self._fim_relogio
+        self.segundos = fim - self._inicio_relogio
+        self.status = status
+
+    def totais(self) -> list:
+        return _linhas_fases(self.fases)
+
+    def como_dict(self) -> dict:
+        return {
+            'inicio': round(self.inicio, 3), 'origem': self.origem, 'sessao': self.sessao_id,
+            'status': self.status, 'ms': round(self.segundos * 1000, 3),
+            'fases': {
+                fase: {'chamadas': chamadas, 'ms': round(segundos * 1000, 3), 'max_ms': round(maior * 1000, 3)}
+                for fase, (chamadas, segundos, maior) in self.fases.items()
+            },
+        }
+
+
+class PerfilSessao:
+    """Execuções recentes e totais acumulados por fase de uma sessão (guardado no session_state)."""
+    def __init__(self, max_execucoes=EXECUCOES_POR_SESSAO):
+        self.execucoes = deque(maxlen=max_execucoes)
+        self.fases = {}  # fase -> [chamadas, segundos, maior]
+        self.total_execucoes = 0
+        self.total_segundos = 0.0
+        self.aberta = None  # rerun da página em andamento (fechado pelo seguinte se ficar sem fim)
+        self._lock = threading.Lock()
+
+    def adicionar(self, execucao: Execucao):
+        with self._lock:
+            self.execucoes.append(execucao)
+            self.total_execucoes += 1
+            self.total_segundos += execucao.segundos
+            for fase, (chamadas, segundos, maior) in execucao.fases.items():
+                acumulado = self.fases.setdefault(fase, [0, 0.0, 0.0])
+                acumulado[0] += chamadas
+                acumulado[1] += segundos
+                acumulado[2] = max(acumulado[2], maior)
+
+    def ultima(self, origem=None):
+        """Execução concluída mais recente (da origem, se informada), ou None."""
+        with self._lock:
+            for execucao in reversed(self.execucoes):
+                if origem is None or execucao.origem == origem:
+                    return execucao
+        return None
+
+    def totais(self) -> list:
+        """Totais acumulados por fase (ver _linhas_fases)."""
+        with self._lock:
+            return _linhas_fases(self.fases)
+
+
+def _sessao_streamlit():
+    """(PerfilSessao, id da sessão) da sessão Streamlit da thread atual; (None, None) fora dela (ex.: fila de PDFs)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None, None
+    import streamlit as st
+    perfil_sessao = st.session_state.get('perfil_sessao')
+    if perfil_sessao is None:
+        perfil_sessao = st.session_state.perfil_sessao = PerfilSessao()
+    return perfil_sessao, ctx.session_id
+
+
+class Perfilador:
+    """
+    Mede as fases das execuções do processo. A execução em andamento é por thread (cada sessão roda o
+    script na sua thread); as concluídas vão para o PerfilSessao da sessão e, uma linha por execução,
+    para o arquivo JSON lines. Execuções sem sessão (trabalhos em segundo plano) ficam em 'fundo'.
+    """
+    def __init__(self, arquivo=ARQUIVO_PERFIL):
+        self.arquivo = arquivo
+        self.fundo = PerfilSessao()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._saida = None
+
+    def atual(self):
+        """Execução em andamento na thread atual (ou None)."""
+        execucao = getattr(self._local, 'execucao', None)
+        return execucao if execucao is not None and execucao.status == 'aberta' else None
+
+    def iniciar(self, origem, pagina=False) -> Execucao:
+        """
+        Abre uma execução na thread atual. Com 'pagina' (início de um rerun), o rerun anterior da sessão
+        que tenha ficado aberto (ex.: páginas sem fim explícito) é concluído antes.
+        """
+        sessao, sessao_id = _sessao_streamlit()
+        if pagina and sessao is not None:
+            if sessao.aberta is not None and sessao.aberta.status == 'aberta':
+                self._finalizar(sessao.aberta, 'sem_fim')
+        execucao = self._local.execucao = Execucao(origem, sessao, sessao_id)
+        if pagina and sessao is not None:
+            sessao.aberta = execucao
+        return execucao
+
+    def concluir(self, status='ok'):
+        """Fecha a execução da thread atual, registrando-a na sessão e no arquivo. Retorna a execução (ou None)."""
+        execucao = self.atual()
+        if execucao is None:
+            return None
+        self._local.execucao = None
+        if execucao.status == 'aberta':
+            self._finalizar(execucao, status)
+        return execucao
+
+    def _finalizar(self, execucao, status):
+        execucao.concluir(status)
+        (execucao.sessao or self.fundo).adicionar(execucao)
+        self._gravar(execucao.como_dict())
+
+    def _gravar(self, registro):
+        if not self.arquivo:
+            return
+        linha = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._saida is None:
+                self._saida = open(self.arquivo, 'a', encoding='utf-8')
+            self._saida.write(linha)
+            self._saida.flush()
+
+    def medir(self, fase, raiz=False):
+        """
+        Contexto que mede a fase na execução em andamento. Sem execução aberta, a fase é ignorada,
+        a menos que seja 'raiz' (região da página ou trabalho em segundo plano): aí ela abre a sua.
+        """
+        return _Medicao(self, fase, raiz)
+
+    def fechar(self):
+        with self._lock:
+            if self._saida is not None:
+                self._saida.close()
+                self._saida = None
+
+
+def _status(tipo_erro) -> str:
+    # st.rerun()/st.stop() interrompem a execução com exceções de controle do Streamlit (não derivam de Exception)
+    if tipo_erro is None:
+        return 'ok'
+    return 'erro' if issubclass(tipo_erro, Exception) else 'interrompida'
+
+
+class _Medicao:
+    __slots__ = ('perfilador', 'fase', 'raiz', 'execucao', 'propria', 'inicio')
+
+    def __init__(self, perfilador, fase, raiz):
+        self.perfilador = perfilador
+        self.fase = fase
+        self.raiz = raiz
+
+    def __enter__(self):
+        self.execucao = self.perfilador.atual()
+        self.propria = self.execucao is None and self.raiz
+        if self.propria:
+            self.execucao = self.perfilador.iniciar(self.fase)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        if self.execucao is not None:
+            self.execucao.registrar(self.fase, time.perf_counter() - self.inicio)
+            if self.propria:
+                self.perfilador.concluir(_status(tipo))
+        return False
+
+
+class _Conclusao:
+    __slots__ = ('perfilador',)
+
+    def __init__(self, perfilador):
+        self.perfilador = perfilador
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        self.perfilador.concluir(_status(tipo))
+        return False
+
+
+_perfilador = None
+_lock_perfilador = threading.Lock()
+
+
+def obter_perfilador() -> Perfilador:
+    """Retorna o perfilador único do processo, criando-o na primeira chamada."""
+    global _perfilador
+    if _perfilador is None:
+        with _lock_perfilador:
+            if _perfilador is None:
+                perfilador = Perfilador()
+                atexit.register(perfilador.fechar)
+                _perfilador = perfilador
+    return _perfilador
+
+
+def medir(fase, raiz=False):
+    """Contexto que mede um trecho como 'fase' (ver Perfilador.medir); vazio com o perfil desligado."""
+    if not ATIVO:
+        return _SEM_MEDICAO
+    return obter_perfilador().medir(fase, raiz)
+
+
+def medido(fase, raiz=False):
+    """Decorador que mede cada chamada da função como 'fase'; com o perfil desligado, devolve a própria função."""
+    def decorar(funcao):
+        if not ATIVO:
+            return funcao
+
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with obter_perfilador().medir(fase, raiz):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def iniciar_execucao(origem='pagina'):
+    """Marca o início de um rerun da página (as fases medidas a seguir pertencem a ele)."""
+    if ATIVO:
+        obter_perfilador().iniciar(origem, pagina=True)
+
+
+def concluindo_execucao():
+    """Contexto que fecha o rerun em andamento ao final do trecho (interrompido por st.rerun() ou concluído)."""
+    if not ATIVO:
+        return _SEM_MEDICAO
+    return _Conclusao(obter_perfilador())
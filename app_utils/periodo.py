@@ -0,0 +1,181 @@
+# app_utils/periodo.py
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+MESES_PT = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+
+def _sem_acentos(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)).lower()
+
+
+# Aceita o nome completo ou as três primeiras letras, com ou sem acento ("Março", "marco", "mar")
+_NUMERO_DO_MES = {}
+for _numero, _nome in enumerate(MESES_PT, start=1):
+    _NUMERO_DO_MES[_sem_acentos(_nome)] = _numero
+    _NUMERO_DO_MES[_sem_acentos(_nome)[:3]] = _numero
+
+_RE_NOME_ANO = re.compile(r'^\s*([a-z]+)\.?\s*(?:de\s+|[/\-\s]\s*)?(\d{4})?\s*$')
+_RE_ANO_MES = re.compile(r'^\s*(\d{4})[/\-](\d{1,2})\s*$')
+_RE_MES_ANO = re.compile(r'^\s*(\d{1,2})[/\-](\d{4})\s*$')
+
+
+@dataclass(frozen=True, order=True)
+class Periodo:
+    """Mês de referência com ano (chave cronológica dos orçamentos)."""
+    ano: int
+    mes: int
+
+    @property
+    def ordinal(self) -> int:
+        """Número sequencial do mês (ano * 12 + mês), usado para ordenar e calcular distâncias."""
+        return self.ano * 12 + (self.mes - 1)
+
+    @classmethod
+    def de_ordinal(cls, ordinal: int):
+        return cls(ordinal // 12, ordinal % 12 + 1)
+
+    @classmethod
+    def de_texto(cls, texto, ano_padrao=None):
+        """
+        Interpreta rótulos como "Dezembro 2025", "dez/2025", "2025-12" ou "12/2025".
+        Rótulos só com o nome do mês ("Dezembro") usam ano_padrao (ou o ano atual); para rótulos já
+        gravados, ver datar_rotulos. Retorna None se o texto não for reconhecido.
+        """
+        return _periodo_de_texto(str(texto), ano_padrao if ano_padrao is not None else date.today().year)
+
+    @classmethod
+    def atual(cls):
+        hoje = date.today()
+        return cls(hoje.year, hoje.month)
+
+    def deslocar(self, meses: int):
+        return Periodo.de_ordinal(self.ordinal + meses)
+
+    def __str__(self):
+        return f"{MESES_PT[self.mes - 1]} {self.ano}"
+
+
+@lru_cache(maxsize=4096)
+def _periodo_de_texto(texto, ano_padrao):
+    normalizado = _sem_acentos(texto)
+    for regex, grupo_ano, grupo_mes in ((_RE_ANO_MES, 1, 2), (_RE_MES_ANO, 2, 1)):
+        encontrado = regex.match(normalizado)
+        if encontrado:
+            mes = int(encontrado.group(grupo_mes))
+            return Periodo(int(encontrado.group(grupo_ano)), mes) if 1 <= mes <= 12 else None
+
+    encontrado = _RE_NOME_ANO.match(normalizado)
+    if encontrado and encontrado.group(1) in _NUMERO_DO_MES:
+        ano = int(encontrado.group(2)) if encontrado.group(2) else ano_padrao
+        return Periodo(ano, _NUMERO_DO_MES[encontrado.group(1)])
+    return None
+
+
+def _proximo_com_mes(periodo, mes):
+    """Primeiro período com o mês 'mes' depois de 'periodo'."""
+    return periodo.deslocar((mes - periodo.mes) % 12 or 12)
+
+
+def _anterior_com_mes(periodo, mes):
+    """Último período com o mês 'mes' antes de 'periodo'."""
+    return periodo.deslocar(-((periodo.mes - mes) % 12 or 12))
+
+
+def datar_rotulos(rotulos, referencia=None) -> dict:
+    """
+    Ano dos rótulos só com o nome do mês ("Novembro"), inferido pela ordem em que foram criados
+    ('rotulos' nessa ordem): cada um fica no primeiro mês com esse nome depois do rótulo anterior; os que
+    vêm antes de qualquer rótulo com ano ficam no último mês com o nome antes do seguinte. Sem nenhum
+    rótulo com ano, o último fica no mês mais recente até 'referencia' (padrão: o mês atual).
+    Retorna {rótulo sem ano: Periodo}; rótulos com ano ou não reconhecidos não entram.
+    """
+    rotulos = [str(rotulo) for rotulo in rotulos]
+    periodos = [_periodo_de_texto(rotulo, None) for rotulo in rotulos]
+    datas = {}
+
+    anterior = None
+    for rotulo, periodo in zip(rotulos, periodos):
+        if periodo is None:
+            continue
+        if periodo.ano is not None:
+            anterior = periodo
+        elif anterior is not None:
+            anterior = datas[rotulo] = _proximo_com_mes(anterior, periodo.mes)
+
+    primeiro = next((i for i, periodo in enumerate(periodos) if periodo is not None and periodo.ano is not None), None)
+    if primeiro is None:
+        seguinte, primeiro = (referencia or Periodo.atual()).deslocar(1), len(periodos)
+    else:
+        seguinte = periodos[primeiro]
+    for rotulo, periodo in zip(reversed(rotulos[:primeiro]), reversed(periodos[:primeiro])):
+        if periodo is not None:
+            seguinte = datas[rotulo] = _anterior_com_mes(seguinte, periodo.mes)
+    return datas
+
+
+class IndicePeriodos:
+    """
+    Índice cronológico dos meses (rótulos) de um usuário.
+    Mantém os ordinais ordenados para seleções por intervalo e "últimos N meses" com busca binária.
+    Rótulos que não representam um mês reconhecível ficam em 'sem_periodo', no fim da ordenação.
+    """
+    def __init__(self, rotulos, ano_padrao=None):
+        self.ano_padrao = ano_padrao
+        datados, sem_periodo = [], []
+        for rotulo in rotulos:
+            periodo = Periodo.de_texto(rotulo, ano_padrao)
+            if periodo is None:
+                sem_periodo.append(rotulo)
+            else:
+                datados.append((periodo.ordinal, rotulo))
+        datados.sort()
+        self._ordinais = [ordinal for ordinal, _ in datados]
+        self._rotulos = [rotulo for _, rotulo in datados]
+        self.sem_periodo = sorted(sem_periodo)
+
+    def __len__(self):
+        return len(self._rotulos) + len(self.sem_periodo)
+
+    def datados(self) -> list:
+        """Apenas os rótulos reconhecidos como mês/ano, em ordem cronológica."""
+        return list(self._rotulos)
+
+    def ordenados(self) -> list:
+        """Todos os rótulos em ordem cronológica (os sem período ao final)."""
+        return self._rotulos + self.sem_periodo
+
+    def periodo(self, rotulo):
+        return Periodo.de_texto(rotulo, self.ano_padrao)
+
+    def ultimos(self, n: int) -> list:
+        """Os n meses mais recentes, em ordem cronológica."""
+        return self._rotulos[-n:] if n > 0 else []
+
+    def intervalo(self, inicio, fim) -> list:
+        """Meses entre os períodos inicio e fim (inclusive), em ordem cronológica."""
+        esquerda = bisect_left(self._ordinais, inicio.ordinal)
+        direita = bisect_right(self._ordinais, fim.ordinal)
+        return self._rotulos[esquerda:direita]
+
+    def posicao(self, rotulo) -> int:
+        """Posição cronológica de um rótulo (útil para ordenar tabelas e gráficos)."""
+        periodo = Periodo.de_texto(rotulo, self.ano_padrao)
+        if periodo is None:
+            return len(self._rotulos) + self.sem_periodo.index(rotulo)
+        return bisect_left(self._ordinais, periodo.ordinal)
+
+
+def janela_movel(serie, meses: int, funcao='mean'):
+    """
+    Agregado em janela móvel de 'meses' sobre uma série já em ordem cronológica
+    (ex.: média móvel de 3 meses do total gasto).
+    """
+    return getattr(serie.rolling(meses, min_periods=1), funcao)()
@@ -0,0 +1,415 @@
+# app_utils/repositorio.py
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from app_utils.periodo import datar_rotulos
+
+DATABASE_NAME = 'orcamento_app.db'
+# Espera antes de tentar de novo um lote cuja gravação falhou (ex.: disco cheio, banco bloqueado)
+ESPERA_NOVA_TENTATIVA_SEGUNDOS = 5.0
+
+logger = logging.getLogger(__name__)
+
+# Comandos SQL fixos: o sqlite3 mantém as instruções preparadas em cache pelo texto do comando.
+# Listas de meses são passadas como um único parâmetro JSON (json_each), para que o texto não varie.
+SQL_UPSERT_ORCAMENTO = """
+    INSERT INTO orcamentos (user_email, mes, dados_json, salario_liquido, poupanca_investimentos, total_fixas, total_lazer)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_email, mes) DO UPDATE SET
+        dados_json = excluded.dados_json,
+        salario_liquido = excluded.salario_liquido,
+        poupanca_investimentos = excluded.poupanca_investimentos,
+        total_fixas = excluded.total_fixas,
+        total_lazer = excluded.total_lazer
+"""
+SQL_SELECT_ORCAMENTO = "SELECT dados_json FROM orcamentos WHERE user_email = ? AND mes = ?"
+SQL_SELECT_ORCAMENTOS_USUARIO = "SELECT mes, dados_json FROM orcamentos WHERE user_email = ? ORDER BY id"
+SQL_RESUMO_MESES = """
+    SELECT mes, salario_liquido, poupanca_investimentos, total_fixas, total_lazer
+    FROM orcamentos WHERE user_email = ? ORDER BY id
+"""
+SQL_DELETE_ITENS_MES = "DELETE FROM itens WHERE user_email = ? AND periodo = ?"
+SQL_INSERT_ITEM = "INSERT OR REPLACE INTO itens (user_email, periodo, categoria, item, valor) VALUES (?, ?, ?, ?, ?)"
+SQL_LINHAS_HISTORICO = """
+    SELECT o.mes, o.salario_liquido, o.poupanca_investimentos, i.categoria, i.item, i.valor
+    FROM orcamentos o
+    LEFT JOIN itens i ON i.user_email = o.user_email AND i.periodo = o.mes
+    WHERE o.user_email = ?1 AND (?2 IS NULL OR o.mes IN (SELECT value FROM json_each(?2)))
+"""
+SQL_SELECT_CONTA = "SELECT email, nome, senha FROM usuarios WHERE email = ?"
+SQL_INSERT_CONTA = "INSERT INTO usuarios (email, nome, senha) VALUES (?, ?, ?)"
+SQL_UPDATE_SENHA = "UPDATE usuarios SET senha = ? WHERE email = ?"
+SQL_SELECT_REGRAS = "SELECT padrao, categoria, tipo FROM regras_categoria WHERE user_email = ? ORDER BY ordem"
+SQL_DELETE_REGRAS = "DELETE FROM regras_categoria WHERE user_email = ?"
+SQL_INSERT_REGRA = "INSERT INTO regras_categoria (user_email, ordem, padrao, categoria, tipo) VALUES (?, ?, ?, ?, ?)"
+
+# Versão do esquema guardada em PRAGMA user_version
+VERSAO_ESQUEMA = 4
+
+
+def criar_esquema(conn: sqlite3.Connection):
+    """Cria as tabelas da aplicação, caso ainda não existam, e aplica as migrações pendentes."""
+    cursor = conn.cursor()
+
+    # Tabela de Usuários (para autenticação)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            email TEXT PRIMARY KEY,
+            nome TEXT NOT NULL,
+            senha TEXT NOT NULL
+        )
+    """)
+
+    # Tabela de Orçamentos (para persistir os dados mensais de cada usuário)
+    # Os dados complexos (despesas_fixas, gastos_lazer) são salvos como JSON
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS orcamentos (
+            id INTEGER PRIMARY KEY,
+            user_email TEXT,
+            mes TEXT NOT NULL,
+            dados_json TEXT NOT NULL,
+            UNIQUE(user_email, mes)
+        )
+    """)
+
+    versao = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if versao < 1:
+        _migrar_para_itens(conn)
+    if versao < 2:
+        _criar_regras_categoria(conn)
+    if versao < 3:
+        _adicionar_totais(conn)
+    if versao < 4:
+        _datar_meses(conn)
+    conn.commit()
+
+
+def _migrar_para_itens(conn: sqlite3.Connection):
+    """
+    Versão 1: salário e poupança viram colunas de 'orcamentos' e os itens de cada mês
+    ganham a tabela normalizada 'itens', preenchida a partir dos blobs JSON existentes.
+    """
+    colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(orcamentos)")}
+    if 'salario_liquido' not in colunas:
+        conn.execute("ALTER TABLE orcamentos ADD COLUMN salario_liquido REAL NOT NULL DEFAULT 0")
+    if 'poupanca_investimentos' not in colunas:
+        conn.execute("ALTER TABLE orcamentos ADD COLUMN poupanca_investimentos REAL NOT NULL DEFAULT 0")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS itens (
+            user_email TEXT NOT NULL,
+            periodo TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            item TEXT NOT NULL,
+            valor REAL NOT NULL,
+            PRIMARY KEY (user_email, periodo, categoria, item)
+        ) WITHOUT ROWID
+    """)
+    # A chave primária atende às consultas por mês; este índice (de cobertura) atende
+    # à série histórica de um item e à lista de itens distintos sem ler a tabela
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_usuario_item ON itens (user_email, item, periodo, categoria, valor)")
+
+    for user_email, mes, dados_json in conn.execute("SELECT user_email, mes, dados_json FROM orcamentos").fetchall():
+        dados = json.loads(dados_json)
+        conn.execute(
+            "UPDATE orcamentos SET salario_liquido = ?, poupanca_investimentos = ? WHERE user_email IS ? AND mes = ?",
+            (dados.get('salario_liquido', 0.0), dados.get('poupanca_investimentos', 0.0), user_email, mes)
+        )
+        conn.executemany(SQL_INSERT_ITEM, _linhas_itens(user_email, mes, dados))
+    conn.execute("PRAGMA user_version = 1")
+
+
+def _criar_regras_categoria(conn: sqlite3.Connection):
+    """Versão 2: regras de categorização de cada usuário, na ordem em que foram cadastradas."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS regras_categoria (
+            user_email TEXT NOT NULL,
+            ordem INTEGER NOT NULL,
+            padrao TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            tipo TEXT NOT NULL DEFAULT 'palavra',
+            PRIMARY KEY (user_email, ordem)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("PRAGMA user_version = 2")
+
+
+def _adicionar_totais(conn: sqlite3.Connection):
+    """Versão 3: totais de cada categoria guardados no próprio mês, para o resumo do histórico não somar os itens."""
+    colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(orcamentos)")}
+    for coluna in ('total_fixas', 'total_lazer'):
+        if coluna not in colunas:
+            conn.execute(f"ALTER TABLE orcamentos ADD COLUMN {coluna} REAL NOT NULL DEFAULT 0")
+    conn.execute("""
+        UPDATE orcamentos SET
+            total_fixas = COALESCE((SELECT SUM(valor) FROM itens i
+                                    WHERE i.user_email = orcamentos.user_email AND i.periodo = orcamentos.mes AND i.categoria = 'fixas'), 0),
+            total_lazer = COALESCE((SELECT SUM(valor) FROM itens i
+                                    WHERE i.user_email = orcamentos.user_email AND i.periodo = orcamentos.mes AND i.categoria = 'lazer'), 0)
+    """)
+    conn.execute("PRAGMA user_version = 3")
+
+
+def _datar_meses(conn: sqlite3.Connection):
+    """
+    Versão 4: meses gravados só com o nome ("Novembro") passam a "Mês Ano", com o ano inferido pela ordem
+    de criação dos meses do usuário (ver datar_rotulos); sem isso, o ano mudaria a cada virada de ano.
+    """
+    usuarios = [user_email for (user_email,) in conn.execute("SELECT DISTINCT user_email FROM orcamentos").fetchall()]
+    for user_email in usuarios:
+        meses = [mes for (mes,) in conn.execute("SELECT mes FROM orcamentos WHERE user_email IS ? ORDER BY id", (user_email,))]
+        existentes = set(meses)
+        for mes, periodo in datar_rotulos(meses).items():
+            novo = str(periodo)
+            if novo in existentes:
+                logger.warning("Mês '%s' de %s mantido sem ano: '%s' já existe", mes, user_email, novo)
+                continue
+            conn.execute("UPDATE orcamentos SET mes = ? WHERE user_email IS ? AND mes = ?", (novo, user_email, mes))
+            conn.execute("UPDATE itens SET periodo = ? WHERE user_email IS ? AND periodo = ?", (novo, user_email, mes))
+            existentes.add(novo)
+    conn.execute("PRAGMA user_version = 4")
+
+
+def _totais_dados(dados):
+    """(salario, poupanca, total_fixas, total_lazer) dos dados de um mês."""
+    return (
+        dados['salario_liquido'], dados['poupanca_investimentos'],
+        sum(dados['despesas_fixas'].values(), 0.0), sum(dados['gastos_lazer'].values(), 0.0)
+    )
+
+
+def _linhas_itens(user_email, mes, dados):
+    """Gera as linhas da tabela 'itens' para um mês."""
+    for categoria, chave in (('fixas', 'despesas_fixas'), ('lazer', 'gastos_lazer')):
+        for item, valor in dados.get(chave, {}).items():
+            yield (user_email, mes, categoria, item, float(valor or 0.0))
+
+
+def _copiar_dados(dados):
+    """Copia os dados de um mês, sem compartilhar os dicionários de itens com quem chamou."""
+    return {
+        'salario_liquido': dados.get('salario_liquido', 0.0),
+        'despesas_fixas': dict(dados.get('despesas_fixas', {}).items()),
+        'gastos_lazer': dict(dados.get('gastos_lazer', {}).items()),
+        'poupanca_investimentos': dados.get('poupanca_investimentos', 0.0),
+    }
+
+
+class RepositorioOrcamentos:
+    """
+    Acesso ao SQLite compartilhado por todo o processo (uma única conexão em modo WAL).
+    As gravações são enfileiradas e descarregadas em lote por uma thread de fundo,
+    para que os callbacks on_change dos widgets nunca esperem pelo fsync do disco.
+    """
+    def __init__(self, caminho=DATABASE_NAME, intervalo_gravacao=0.5, espera_nova_tentativa=ESPERA_NOVA_TENTATIVA_SEGUNDOS):
+        self.caminho = caminho
+        self.intervalo_gravacao = intervalo_gravacao
+        self.espera_nova_tentativa = espera_nova_tentativa
+        # Erro da última tentativa de gravação (None depois de uma gravação bem-sucedida)
+        self.ultimo_erro = None
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        criar_esquema(self._conn)
+
+        self._lock_conn = threading.Lock()
+        self._lock_pendentes = threading.Lock()
+        self._pendentes = {}  # (user_email, mes) -> dados; gravações repetidas do mesmo mês são coalescidas
+        self._evento = threading.Event()
+        self._encerrar = False
+        self._thread = threading.Thread(target=self._loop_gravacao, name="repositorio-gravacao", daemon=True)
+        self._thread.start()
+
+    # --- Escrita (write-behind) ---
+
+    def salvar(self, user_email, mes, dados):
+        """Enfileira a gravação do mês; retorna imediatamente."""
+        with self._lock_pendentes:
+            self._pendentes[(user_email, mes)] = _copiar_dados(dados)
+        self._evento.set()
+
+    def salvar_varios(self, user_email, meses: dict):
+        """Enfileira vários meses ({mes: dados}) de uma vez, gravados na mesma transação."""
+        copias = {(user_email, mes): _copiar_dados(dados) for mes, dados in meses.items()}
+        with self._lock_pendentes:
+            self._pendentes.update(copias)
+        self._evento.set()
+
+    def descarregar(self):
+        """
+        Grava imediatamente tudo o que está pendente (usado no encerramento e antes de consultas em SQL).
+        Se a transação falha, o lote volta para a fila (sem sobrepor gravações mais novas do mesmo mês)
+        e o sqlite3.Error é propagado.
+        """
+        # O lock da conexão é obtido antes de retirar o lote: quem ler durante a gravação
+        # espera o commit e então encontra os dados no banco
+        with self._lock_conn:
+            with self._lock_pendentes:
+                lote, self._pendentes = self._pendentes, {}
+            if not lote:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany(SQL_UPSERT_ORCAMENTO, [
+                        (user_email, mes, json.dumps(dados, ensure_ascii=False), *_totais_dados(dados))
+                        for (user_email, mes), dados in lote.items()
+                    ])
+                    self._conn.executemany(SQL_DELETE_ITENS_MES, list(lote.keys()))
+                    self._conn.executemany(SQL_INSERT_ITEM, [
+                        linha
+                        for (user_email, mes), dados in lote.items()
+                        for linha in _linhas_itens(user_email, mes, dados)
+                    ])
+            except sqlite3.Error as e:
+                with self._lock_pendentes:
+                    for chave, dados in lote.items():
+                        self._pendentes.setdefault(chave, dados)
+                self.ultimo_erro = e
+                raise
+            self.ultimo_erro = None
+
+    def _loop_gravacao(self):
+        while not self._encerrar:
+            self._evento.wait()
+            self._evento.clear()
+            # Pequena espera para agrupar rajadas de alterações em uma única transação
+            time.sleep(self.intervalo_gravacao)
+            try:
+                self.descarregar()
+            except sqlite3.Error:
+                logger.warning("Falha ao gravar orçamentos no banco; nova tentativa em %.1fs", self.espera_nova_tentativa, exc_info=True)
+                # O lote voltou para a fila: tenta de novo depois da espera (ou antes, se chegar outra gravação)
+                self._evento.wait(self.espera_nova_tentativa)
+                self._evento.set()
+
+    def fechar(self):
+        self._encerrar = True
+        self._evento.set()
+        self._thread.join(timeout=5)
+        try:
+            self.descarregar()
+        except sqlite3.Error:
+            logger.error("Orçamentos não gravados no encerramento (%d meses)", len(self._pendentes), exc_info=True)
+        with self._lock_conn:
+            self._conn.close()
+
+    # --- Leitura (considera as gravações ainda pendentes) ---
+
+    def carregar(self, user_email, mes):
+        """Retorna os dados de um mês (ou None se não existir)."""
+        with self._lock_pendentes:
+            pendente = self._pendentes.get((user_email, mes))
+        if pendente is not None:
+            return _copiar_dados(pendente)
+
+        with self._lock_conn:
+            linha = self._conn.execute(SQL_SELECT_ORCAMENTO, (user_email, mes)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def carregar_usuario(self, user_email):
+        """Retorna todo o histórico do usuário como {mes: dados}."""
+        with self._lock_pendentes:
+            pendentes = {mes: dados for (email, mes), dados in self._pendentes.items() if email == user_email}
+        with self._lock_conn:
+            linhas = self._conn.execute(SQL_SELECT_ORCAMENTOS_USUARIO, (user_email,)).fetchall()
+        historico = {mes: json.loads(dados_json) for mes, dados_json in linhas}
+
+        # As gravações pendentes são mais recentes que o banco
+        for mes, dados in pendentes.items():
+            historico[mes] = _copiar_dados(dados)
+        return historico
+
+    # --- Consultas agregadas (tabela normalizada 'itens') ---
+
+    def _pendentes_usuario(self, user_email, meses):
+        """Meses do usuário ainda na fila de gravação; sobrepõem o resultado das consultas SQL."""
+        meses = set(meses) if meses is not None else None
+        with self._lock_pendentes:
+            return {
+                mes: _copiar_dados(dados) for (email, mes), dados in self._pendentes.items()
+                if email == user_email and (meses is None or mes in meses)
+            }
+
+    def _consultar(self, sql, parametros):
+        with self._lock_conn:
+            return self._conn.execute(sql, parametros).fetchall()
+
+    def resumo_meses(self, user_email):
+        """
+        Retorna [(mes, salario_liquido, poupanca_investimentos, total_fixas, total_lazer)] de todos os meses
+        do usuário, na ordem de criação, lendo só a tabela 'orcamentos' (sem os itens nem o JSON).
+        """
+        pendentes = self._pendentes_usuario(user_email, None)
+        resumo = {linha[0]: linha[1:] for linha in self._consultar(SQL_RESUMO_MESES, (user_email,))}
+        for mes, dados in pendentes.items():
+            resumo[mes] = _totais_dados(dados)
+        return [(mes, *totais) for mes, totais in resumo.items()]
+
+    def linhas_historico(self, user_email, meses=None):
+        """
+        Retorna [(mes, salario_liquido, poupanca_investimentos, categoria, item, valor)] em formato longo,
+        uma linha por item (meses sem itens vêm com categoria/item/valor = None).
+        """
+        pendentes = self._pendentes_usuario(user_email, meses)
+        filtro = json.dumps(list(meses), ensure_ascii=False) if meses is not None else None
+        linhas = [linha for linha in self._consultar(SQL_LINHAS_HISTORICO, (user_email, filtro)) if linha[0] not in pendentes]
+        for mes, dados in pendentes.items():
+            itens_do_mes = list(_linhas_itens(user_email, mes, dados))
+            if not itens_do_mes:
+                linhas.append((mes, dados['salario_liquido'], dados['poupanca_investimentos'], None, None, None))
+            for _, _, categoria, item, valor in itens_do_mes:
+                linhas.append((mes, dados['salario_liquido'], dados['poupanca_investimentos'], categoria, item, valor))
+        return linhas
+
+    # --- Contas de usuário (gravação imediata) ---
+
+    def buscar_conta(self, email):
+        """Retorna (email, nome, senha_hash) ou None; busca pela chave primária."""
+        linhas = self._consultar(SQL_SELECT_CONTA, (email,))
+        return linhas[0] if linhas else None
+
+    def inserir_conta(self, email, nome, senha_hash) -> bool:
+        """Cria a conta; retorna False se o email já está cadastrado."""
+        try:
+            with self._lock_conn, self._conn:
+                self._conn.execute(SQL_INSERT_CONTA, (email, nome, senha_hash))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def atualizar_senha(self, email, senha_hash):
+        with self._lock_conn, self._conn:
+            self._conn.execute(SQL_UPDATE_SENHA, (senha_hash, email))
+
+    # --- Regras de categorização (gravação imediata: mudam raramente) ---
+
+    def carregar_regras(self, user_email):
+        """Retorna [(padrao, categoria, tipo)] do usuário, na ordem de cadastro."""
+        return self._consultar(SQL_SELECT_REGRAS, (user_email,))
+
+    def salvar_regras(self, user_email, regras):
+        """Substitui as regras do usuário por [(padrao, categoria, tipo)]."""
+        with self._lock_conn, self._conn:
+            self._conn.execute(SQL_DELETE_REGRAS, (user_email,))
+            self._conn.executemany(SQL_INSERT_REGRA, [
+                (user_email, ordem, padrao, categoria, tipo) for ordem, (padrao, categoria, tipo) in enumerate(regras)
+            ])
+
+
+_repositorio = None
+_lock_repositorio = threading.Lock()
+
+
+def obter_repositorio() -> RepositorioOrcamentos:
+    """Retorna o repositório único do processo, criando-o na primeira chamada."""
+    global _repositorio
+    if _repositorio is None:
+        with _lock_repositorio:
+            if _repositorio is None:
+                _repositorio = RepositorioOrcamentos()
+                atexit.register(_repositorio.fechar)
+    return _repositorio
@@ -0,0 +1,234 @@
+# app_utils/snapshot_historico.py
+import io
+import json
+import logging
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from app_utils.mes_compacto import BlocoItens, MesCompacto
+from app_utils.periodo import IndicePeriodos, datar_rotulos
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem o pyarrow, só o formato JSON está disponível
+    pa = pq = None
+
+CAMINHO_DADOS_INICIAIS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'initial_data.json')
+
+logger = logging.getLogger(__name__)
+
+VERSAO_SNAPSHOT = 1
+CHAVE_METADADOS = b'dindin.historico'
+FORMATOS = {'arrow': '.arrow', 'parquet': '.parquet', 'json': '.json'}
+COLUNAS_RESUMO = ['salario_liquido', 'poupanca_investimentos', 'total_fixas', 'total_lazer']
+
+_ASSINATURA_ARROW = b'ARROW1'
+_ASSINATURA_PARQUET = b'PAR1'
+
+
+def formatos_disponiveis() -> list:
+    return list(FORMATOS) if pa is not None else ['json']
+
+
+def _meses_ordenados(historico) -> list:
+    return IndicePeriodos(list(historico)).ordenados()
+
+
+def exportar_historico(historico, formato='arrow') -> bytes:
+    """
+    Serializa o histórico ({mês: dados}) em um snapshot.
+    'arrow' (Arrow IPC, lido sem cópia via memory map) e 'parquet' (mais compacto) guardam os itens
+    em colunas (mes, categoria, item, valor), com os itens de cada mês contíguos; os dados por mês
+    (salário, poupança, totais e a posição dos itens) ficam nos metadados, para que o resumo seja
+    lido sem tocar nos itens. 'json' é o formato de reserva, sem dependências.
+    """
+    meses = _meses_ordenados(historico)
+    registros = [MesCompacto.de_dados(historico[mes]) for mes in meses]
+    if formato == 'json':
+        dados = {'versao': VERSAO_SNAPSHOT, 'meses': {mes: r.para_dict() for mes, r in zip(meses, registros)}}
+        return json.dumps(dados, ensure_ascii=False, indent=1).encode('utf-8')
+    if pa is None:
+        raise RuntimeError("O pyarrow não está instalado; use o formato 'json'.")
+
+    nomes, valores, indices_mes, categorias, indice = [], [], [], [], []
+    posicao = 0
+    for numero, registro in enumerate(registros):
+        entrada = {'salario_liquido': registro.salario_liquido, 'poupanca_investimentos': registro.poupanca_investimentos,
+                   'total_fixas': registro.despesas_fixas.total, 'total_lazer': registro.gastos_lazer.total, 'inicio': posicao}
+        for codigo, bloco in enumerate((registro.despesas_fixas, registro.gastos_lazer)):
+            nomes.extend(bloco.nomes)
+            valores.append(np.frombuffer(bloco.valores, dtype=np.float64) if len(bloco) else np.empty(0))
+            indices_mes.append(np.full(len(bloco), numero, dtype=np.int32))
+            categorias.append(np.full(len(bloco), codigo, dtype=np.int8))
+            posicao += len(bloco)
+            entrada['meio' if codigo == 0 else 'fim'] = posicao
+        indice.append(entrada)
+
+    tabela = pa.table({
+        'mes': pa.DictionaryArray.from_arrays(np.concatenate(indices_mes or [np.empty(0, np.int32)]), pa.array(meses, pa.string())),
+        'categoria': pa.DictionaryArray.from_arrays(np.concatenate(categorias or [np.empty(0, np.int8)]), pa.array(['fixas', 'lazer'])),
+        'item': pa.array(nomes, pa.string()).dictionary_encode(),
+        'valor': pa.array(np.concatenate(valores or [np.empty(0)]), pa.float64()),
+    })
+    metadados = {'versao': VERSAO_SNAPSHOT, 'meses': meses, 'indice': indice}
+    tabela = tabela.replace_schema_metadata({CHAVE_METADADOS: json.dumps(metadados, ensure_ascii=False)})
+
+    saida = io.BytesIO()
+    if formato == 'parquet':
+        pq.write_table(tabela, saida, compression='zstd')
+    else:
+        with pa.ipc.new_file(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    return saida.getvalue()
+
+
+class SnapshotHistorico(Mapping):
+    """
+    Histórico lido de um snapshot, com carga preguiçosa: abrir o arquivo lê só o índice de meses
+    (e o resumo, nos formatos colunares); cada mês só vira MesCompacto quando é pedido, a partir de
+    fatias das colunas (os valores vêm do buffer do Arrow, sem montar dicionários item a item).
+    """
+    def __init__(self, meses, resumo, obter_mes):
+        self._meses = meses
+        self._resumo = resumo
+        self._obter_mes = obter_mes
+
+    @classmethod
+    def abrir(cls, origem):
+        """origem: caminho de arquivo ou bytes. O formato é reconhecido pelo conteúdo."""
+        if isinstance(origem, (bytes, bytearray, memoryview)):
+            inicio = bytes(origem[:8])
+        else:
+            with open(origem, 'rb') as f:
+                inicio = f.read(8)
+        if inicio.startswith(_ASSINATURA_ARROW) or inicio.startswith(_ASSINATURA_PARQUET):
+            if pa is None:
+                raise RuntimeError("Este snapshot é binário (Arrow/Parquet) e o pyarrow não está instalado.")
+            return cls._de_tabela(cls._ler_tabela(origem, inicio.startswith(_ASSINATURA_ARROW)))
+        return cls._de_json(origem)
+
+    @staticmethod
+    def _ler_tabela(origem, arrow):
+        if isinstance(origem, (bytes, bytearray, memoryview)):
+            fonte = pa.BufferReader(pa.py_buffer(origem))
+        else:
+            fonte = pa.memory_map(origem, 'r') if arrow else origem
+        if arrow:
+            return pa.ipc.open_file(fonte).read_all()
+        return pq.read_table(fonte, memory_map=not isinstance(fonte, pa.BufferReader))
+
+    @classmethod
+    def _de_tabela(cls, tabela):
+        metadados = json.loads((tabela.schema.metadata or {}).get(CHAVE_METADADOS, b'{}'))
+        if not isinstance(metadados, dict):
+            raise ValueError("Backup inválido: metadados do snapshot não reconhecidos.")
+        if metadados.get('versao') != VERSAO_SNAPSHOT:
+            raise ValueError("Snapshot de histórico em versão desconhecida.")
+        meses, indice = metadados.get('meses'), metadados.get('indice')
+        if not (isinstance(meses, list) and isinstance(indice, list) and len(meses) == len(indice)
+                and all(isinstance(entrada, dict) for entrada in indice)):
+            raise ValueError("Backup inválido: índice de meses do snapshot não reconhecido.")
+        try:
+            resumo = pd.DataFrame(indice, index=pd.Index(meses, name='Mês'))[COLUNAS_RESUMO]
+        except KeyError as e:
+            raise ValueError(f"Backup inválido: falta {e} no índice de meses.") from None
+
+        coluna_item = tabela.column('item').combine_chunks()
+        coluna_valor = tabela.column('valor').combine_chunks()
+        # Os nomes distintos são convertidos (e internados) uma única vez, sob demanda
+        dicionario = []
+
+        def nomes(inicio, fim):
+            if not dicionario:
+                dicionario.append([sys.intern(nome) for nome in coluna_item.dictionary.to_pylist()])
+            codigos = coluna_item.indices.slice(inicio, fim - inicio).to_numpy(zero_copy_only=False)
+            return [dicionario[0][codigo] for codigo in codigos.tolist()]
+
+        def bloco(inicio, fim):
+            if fim <= inicio:
+                return BlocoItens()
+            valores = coluna_valor.slice(inicio, fim - inicio).to_numpy(zero_copy_only=True)
+            return BlocoItens.sobre_buffer(nomes(inicio, fim), valores)
+
+        posicoes = dict(zip(meses, indice))
+
+        def obter_mes(mes):
+            entrada = posicoes[mes]
+            return MesCompacto(
+                entrada['salario_liquido'], bloco(entrada['inicio'], entrada['meio']),
+                bloco(entrada['meio'], entrada['fim']), entrada['poupanca_investimentos']
+            )
+
+        return cls(meses, resumo, obter_mes)
+
+    @classmethod
+    def _de_json(cls, origem):
+        if isinstance(origem, (bytes, bytearray, memoryview)):
+            texto = bytes(origem).decode('utf-8-sig')
+        else:
+            with open(origem, encoding='utf-8-sig') as f:
+                texto = f.read()
+        dados = json.loads(texto) if texto.strip() else {}
+        if not isinstance(dados, dict):
+            raise ValueError("Backup inválido: o JSON deve ser um objeto com os meses.")
+        # Aceita o snapshot ({"versao", "meses": {...}}) ou diretamente {mês: dados}
+        por_mes = dados.get('meses', {}) if 'versao' in dados else dados
+        if not isinstance(por_mes, dict):
+            raise ValueError("Backup inválido: 'meses' deve ser um objeto {mês: dados}.")
+        for mes, dados_mes in por_mes.items():
+            if not isinstance(dados_mes, dict):
+                raise ValueError(f"Backup inválido: os dados do mês '{mes}' devem ser um objeto.")
+            for chave in ('despesas_fixas', 'gastos_lazer'):
+                itens = dados_mes.get(chave, {})
+                if not isinstance(itens, dict) or not all(isinstance(valor, (int, float)) for valor in itens.values()):
+                    raise ValueError(f"Backup inválido: '{chave}' do mês '{mes}' deve ser um objeto {{item: valor}}.")
+            for chave in ('salario_liquido', 'poupanca_investimentos'):
+                if not isinstance(dados_mes.get(chave, 0.0), (int, float)):
+                    raise ValueError(f"Backup inválido: '{chave}' do mês '{mes}' deve ser um número.")
+        meses = _meses_ordenados(por_mes)
+        resumo = pd.DataFrame(
+            [(d.get('salario_liquido', 0.0), d.get('poupanca_investimentos', 0.0),
+              sum(d.get('despesas_fixas', {}).values()), sum(d.get('gastos_lazer', {}).values()))
+             for d in (por_mes[mes] for mes in meses)],
+            columns=COLUNAS_RESUMO, index=pd.Index(meses, name='Mês'), dtype=float
+        )
+        return cls(meses, resumo, lambda mes: MesCompacto.de_dados(por_mes[mes]))
+
+    def resumo(self) -> pd.DataFrame:
+        """Salário, poupança e totais de cada mês (em ordem cronológica), sem materializar os itens."""
+        return self._resumo
+
+    def __getitem__(self, mes) -> MesCompacto:
+        if mes not in self._resumo.index:
+            raise KeyError(mes)
+        return self._obter_mes(mes)
+
+    def __iter__(self):
+        return iter(self._meses)
+
+    def __len__(self):
+        return len(self._meses)
+
+    def __contains__(self, mes):
+        return mes in self._resumo.index
+
+
+def carregar_dados_iniciais(caminho=CAMINHO_DADOS_INICIAIS) -> dict:
+    """
+    Meses iniciais de uma sessão nova ({mês: MesCompacto}), lidos de data/initial_data.json.
+    Meses só com o nome ganham o ano (ver datar_rotulos), como os gravados no banco.
+    """
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        snapshot = SnapshotHistorico.abrir(caminho)
+    except (ValueError, OSError) as e:
+        logger.warning("Dados iniciais ignorados (%s): %s", caminho, e)
+        return {}
+    datas = datar_rotulos(snapshot)
+    return {str(datas[mes]) if mes in datas else mes: snapshot[mes] for mes in snapshot}
@@ -1,98 +1,421 @@
 # app_utils/state_manager.py
+import time
+
 import streamlit as st
 import sqlite3
+from app_utils.repositorio import DATABASE_NAME, criar_esquema, obter_repositorio
+from app_utils.orcamento_class import ItensCategoria
+from app_utils.mes_compacto import MesCompacto
+from app_utils.historico_sessao import HistoricoSessao
+from app_utils.periodo import IndicePeriodos, Periodo, datar_rotulos
+from app_utils.importador_extrato import ImportadorExtrato, aplicar_importacao
+from app_utils.categorizador import Categorizador, Regra, recategorizar_mes, validar_regras
+from app_utils.usuarios import obter_usuarios
+from app_utils.snapshot_historico import SnapshotHistorico, carregar_dados_iniciais, exportar_historico
+from app_utils.perfil import iniciar_execucao, medido
+from utils.graficos import CacheFiguras
+
+
+# Editores (st.data_editor) dos itens de cada categoria: variável de estado -> chave do widget
+EDITORES_DO_MES = {'despesas_fixas': 'editor_fixas', 'gastos_lazer': 'editor_lazer'}
+
+# Alterações do mês ficam só na sessão até este intervalo sem gravação (ou até trocar de mês, sair ou um checkpoint)
+INTERVALO_GRAVACAO_SEGUNDOS = 3.0
+
+# Widgets cujo valor pertence ao mês selecionado: chave do widget -> variável de estado
+WIDGETS_DO_MES = {'salario_input': 'salario_liquido', 'poupanca_input': 'poupanca_investimentos'}
+
+
+def _sincronizar_widgets():
+    # Nos callbacks on_change o widget já tem o valor novo, mas a variável de estado
+    # só é atualizada quando o script roda; sincronizamos antes de salvar.
+    for chave_widget, variavel in WIDGETS_DO_MES.items():
+        if chave_widget in st.session_state:
+            st.session_state[variavel] = st.session_state[chave_widget]
+    if 'frequencia_input' in st.session_state:
+        st.session_state.frequencia_pagamento = st.session_state.frequencia_input
+
+
+def _dados_mes_atual():
+    """
+    Monta o registro compacto do mês a partir dos valores em edição no session_state.
+    Categorias sem alteração reaproveitam o bloco de itens já guardado (copy-on-write).
+    """
+    _sincronizar_widgets()
+    registro = MesCompacto(
+        st.session_state.salario_liquido,
+        st.session_state.despesas_fixas,
+        st.session_state.gastos_lazer,
+        st.session_state.poupanca_investimentos
+    )
+    # Os itens em edição passam a ter o novo registro como origem
+    st.session_state.despesas_fixas = ItensCategoria.de(st.session_state.despesas_fixas)
+    st.session_state.gastos_lazer = ItensCategoria.de(st.session_state.gastos_lazer)
+    st.session_state.despesas_fixas.marcar_origem(registro.despesas_fixas)
+    st.session_state.gastos_lazer.marcar_origem(registro.gastos_lazer)
+    st.session_state.registro_materializado = registro
+    return registro
+
 
+def registrar_alteracao_historico():
+    """Incrementa a versão do histórico, invalidando os frames memoizados do dashboard."""
+    st.session_state.versao_historico = st.session_state.get('versao_historico', 0) + 1
+
+
+def _persistir_mes(mes, dados):
+    """Enfileira a gravação do mês no banco (write-behind), se houver usuário logado."""
+    registrar_alteracao_historico()
+    if st.session_state.get('user_email'):
+        obter_repositorio().salvar(st.session_state.user_email, mes, dados)
+
+
+def reiniciar_widgets_do_mes():
+    """Descarta o estado dos widgets do mês anterior, para que exibam os valores do mês carregado."""
+    for chave_widget in WIDGETS_DO_MES:
+        st.session_state.pop(chave_widget, None)
+
+
+@medido('estado:carregar_mes')
 def carregar_dados_mes_selecionado():
     mes_atual = st.session_state.mes_selecionado
-    dados = st.session_state.historico_orcamentos.get(mes_atual, {})
+    # Meses fora da memória da sessão são buscados no banco (HistoricoSessao)
+    registro = st.session_state.historico_orcamentos.get(mes_atual)
+    if registro is None:
+        registro = MesCompacto()
 
-    st.session_state.salario_liquido = dados.get('salario_liquido', 0.0) 
     st.session_state.mes_referencia = mes_atual
-    st.session_state.despesas_fixas = dados.get('despesas_fixas', {})
-    st.session_state.gastos_lazer = dados.get('gastos_lazer', {})
-    st.session_state.poupanca_investimentos = dados.get('poupanca_investimentos', 0.0)
+    # O mês só é materializado (salário, poupança e ItensCategoria editáveis) quando o registro muda;
+    # nos demais reruns a sessão continua com os mesmos objetos, inclusive as alterações ainda não gravadas
+    if st.session_state.get('registro_materializado') is not registro:
+        st.session_state.salario_liquido = registro.salario_liquido
+        st.session_state.poupanca_investimentos = registro.poupanca_investimentos
+        st.session_state.despesas_fixas = registro.despesas_fixas.para_itens()
+        st.session_state.gastos_lazer = registro.gastos_lazer.para_itens()
+        st.session_state.registro_materializado = registro
 
 
-def salvar_orcamento_atual():
+def marcar_alteracao(*campos):
+    """
+    Registra que campos do mês atual mudaram, sem gravar (usado nos on_change dos widgets e nas edições).
+    Alterações seguidas são acumuladas e gravadas de uma vez por descarregar_alteracoes().
+    """
+    _sincronizar_widgets()
+    if not campos:
+        return
     mes_atual = st.session_state.mes_selecionado
-    st.session_state.historico_orcamentos[mes_atual] = {
-        'salario_liquido': st.session_state.salario_liquido,
-        'despesas_fixas': st.session_state.despesas_fixas.copy(),
-        'gastos_lazer': st.session_state.gastos_lazer.copy(),
-        'poupanca_investimentos': st.session_state.poupanca_investimentos
-    }
-
-
-def adicionar_gasto(categoria, item, valor):
-    if valor > 0 and item:
-        if categoria == 'fixas':
-            st.session_state.despesas_fixas[item] = valor
-        elif categoria == 'lazer':
-            st.session_state.gastos_lazer[item] = valor
-        st.success(f'Item "{item}" (R$ {valor:,.2f}) adicionado em {categoria.upper()}.')
-        salvar_orcamento_atual() 
-        st.rerun()
+    pendentes = st.session_state.get('alteracoes_pendentes')
+    if pendentes is not None and pendentes['mes'] != mes_atual:
+        descarregar_alteracoes()
+        pendentes = None
+    if pendentes is None:
+        pendentes = st.session_state.alteracoes_pendentes = {'mes': mes_atual, 'campos': set(), 'desde': time.monotonic()}
+    pendentes['campos'].update(campos)
+
+
+@medido('estado:gravar')
+def descarregar_alteracoes(somente_vencidas=False) -> bool:
+    """
+    Grava o mês com alterações pendentes, se houver. Com 'somente_vencidas', só grava se a primeira
+    alteração pendente tem mais de INTERVALO_GRAVACAO_SEGUNDOS. Retorna True se gravou.
+    """
+    pendentes = st.session_state.get('alteracoes_pendentes')
+    if not pendentes:
+        return False
+    if somente_vencidas and time.monotonic() - pendentes['desde'] < INTERVALO_GRAVACAO_SEGUNDOS:
+        return False
+    mes = pendentes['mes']
+    st.session_state.historico_orcamentos[mes] = _dados_mes_atual()
+    _persistir_mes(mes, st.session_state.historico_orcamentos[mes])
+    st.session_state.pop('alteracoes_pendentes', None)
+    return True
+
+
+def falha_gravacao():
+    """Erro da última gravação em segundo plano no banco (os meses ficam na fila e são tentados de novo), ou None."""
+    return obter_repositorio().ultimo_erro
+
+
+def salvar_orcamento_atual():
+    """Checkpoint: grava já o mês atual, com ou sem alterações pendentes."""
+    marcar_alteracao(*MesCompacto.CAMPOS)
+    descarregar_alteracoes()
+
+
+def adicionar_gasto(categoria, item, valor) -> bool:
+    """Inclui o gasto no mês atual (gravado depois, ver marcar_alteracao). Retorna False se nome ou valor estão vazios."""
+    if not (valor > 0 and item):
+        return False
+    if categoria == 'fixas':
+        st.session_state.despesas_fixas[item] = valor
+        marcar_alteracao('despesas_fixas')
+    elif categoria == 'lazer':
+        st.session_state.gastos_lazer[item] = valor
+        marcar_alteracao('gastos_lazer')
+    return True
+
+def aplicar_edicoes_itens(chave_itens, nomes, edicoes):
+    """
+    Aplica ao mês atual as edições do data_editor da categoria ('despesas_fixas' ou 'gastos_lazer'),
+    linha a linha (ver ItensCategoria.aplicar_edicoes), e descarta o estado do editor.
+    Retorna (linhas alteradas, linhas que ficaram de fora); ValueError (nome repetido) não altera nada.
+    """
+    itens = st.session_state[chave_itens] = ItensCategoria.de(st.session_state[chave_itens])
+    alteradas, ignorados = itens.aplicar_edicoes(nomes, edicoes)
+    if alteradas:
+        marcar_alteracao(chave_itens)
+    st.session_state.pop(EDITORES_DO_MES[chave_itens], None)
+    return alteradas, ignorados
+
 
 def atualizar_orcamento_do_selectbox():
-    if 'mes_anterior' in st.session_state and st.session_state.mes_anterior != st.session_state.mes_select:
-        mes_a_salvar = st.session_state.mes_anterior
-        
-        st.session_state.historico_orcamentos[mes_a_salvar] = {
-            'salario_liquido': st.session_state.salario_liquido,
-            'despesas_fixas': st.session_state.despesas_fixas.copy(),
-            'gastos_lazer': st.session_state.gastos_lazer.copy(),
-            'poupanca_investimentos': st.session_state.poupanca_investimentos
-        }
+    # Só o mês que saiu de cena é gravado, e só se tiver alterações
+    descarregar_alteracoes()
     
     st.session_state.mes_selecionado = st.session_state.mes_select
     st.session_state.mes_anterior = st.session_state.mes_selecionado
     
     carregar_dados_mes_selecionado()
+    reiniciar_widgets_do_mes()
     st.rerun()
 
 
+def _regra_valida(regra) -> bool:
+    try:
+        validar_regras([regra])
+    except ValueError:
+        return False
+    return True
+
+
+def obter_categorizador() -> Categorizador:
+    """Categorizador com as regras do usuário logado; recompilado só quando as regras mudam."""
+    if 'categorizador' not in st.session_state:
+        regras = []
+        if st.session_state.get('user_email'):
+            regras = [Regra(*linha) for linha in obter_repositorio().carregar_regras(st.session_state.user_email)]
+        try:
+            categorizador = Categorizador(regras)
+        except ValueError:
+            # Regras gravadas antes da validação atual (ex.: com referências \1): as inválidas ficam de fora
+            categorizador = Categorizador([regra for regra in regras if _regra_valida(regra)])
+        st.session_state.categorizador = categorizador
+    return st.session_state.categorizador
+
+
+def salvar_regras_categorizacao(regras):
+    """Valida (ValueError se inválidas), grava e passa a usar as regras do usuário."""
+    categorizador = Categorizador(regras)
+    if st.session_state.get('user_email'):
+        obter_repositorio().salvar_regras(
+            st.session_state.user_email, [(r.padrao, r.categoria, r.tipo) for r in categorizador.regras_usuario]
+        )
+    st.session_state.categorizador = categorizador
+
+
+def aplicar_regras_historico():
+    """
+    Reclassifica os itens de todos os meses do histórico pelas regras atuais (ver recategorizar_mes).
+    Retorna (itens movidos, meses alterados).
+    """
+    categorizador = obter_categorizador()
+    mes_atual = st.session_state.mes_selecionado
+    descarregar_alteracoes()
+    alterados, movidos = {}, 0
+    for mes, dados in st.session_state.historico_orcamentos.items():
+        registro, movidos_mes = recategorizar_mes(MesCompacto.de_dados(dados), categorizador)
+        if movidos_mes:
+            alterados[mes] = registro
+            movidos += movidos_mes
+    if alterados:
+        _gravar_meses(alterados)
+        if mes_atual in alterados:
+            _recarregar_mes_atual()
+    return movidos, list(alterados)
+
+
+@medido('estado:gravar_meses')
+def _gravar_meses(meses):
+    """Enfileira a gravação de vários meses de uma vez e os atualiza no histórico da sessão."""
+    # A gravação vem antes: o histórico pode descartar da memória meses que acabaram de entrar
+    if st.session_state.get('user_email'):
+        obter_repositorio().salvar_varios(st.session_state.user_email, meses)
+    st.session_state.historico_orcamentos.update(meses)
+    registrar_alteracao_historico()
+
+
+def _recarregar_mes_atual():
+    """Rematerializa o mês em edição a partir do registro novo, descartando o estado dos widgets."""
+    carregar_dados_mes_selecionado()
+    reiniciar_widgets_do_mes()
+    for chave_editor in EDITORES_DO_MES.values():
+        st.session_state.pop(chave_editor, None)
+
+
+def exportar_backup_historico(formato) -> bytes:
+    """Snapshot de todo o histórico da sessão (com as edições em andamento do mês atual)."""
+    descarregar_alteracoes()
+    return exportar_historico(dict(st.session_state.historico_orcamentos.items()), formato)
+
+
+def restaurar_backup_historico(conteudo) -> int:
+    """
+    Restaura um snapshot (bytes de um arquivo .arrow, .parquet ou .json): os meses do backup
+    substituem os de mesmo nome; os demais são mantidos. Retorna o número de meses restaurados.
+    """
+    snapshot = SnapshotHistorico.abrir(conteudo)
+    if not len(snapshot):
+        return 0
+    descarregar_alteracoes()
+    # Backups antigos podem ter meses só com o nome: ganham o ano como os do banco
+    datas = datar_rotulos(snapshot)
+    _gravar_meses({str(datas[mes]) if mes in datas else mes: snapshot[mes] for mes in snapshot})
+    _recarregar_mes_atual()
+    return len(snapshot)
+
+
+def importar_extrato(arquivo, categoria, formato=None, progresso=None, usar_regras=True):
+    """
+    Importa um extrato (CSV/OFX) para o histórico: os gastos agregados por mês e item entram
+    nos meses correspondentes, criados se ainda não existirem. Com 'usar_regras', a categoria
+    de cada item vem das regras de categorização; 'categoria' vale para os itens sem regra.
+    Retorna (ResultadoImportacao, lista de meses alterados).
+    """
+    resultado = ImportadorExtrato().importar(arquivo, formato, progresso)
+    if not resultado.totais:
+        return resultado, []
+
+    # As edições em andamento do mês atual entram antes, para não serem sobrescritas
+    descarregar_alteracoes()
+    categorizar = obter_categorizador().categorizar if usar_regras else None
+    alterados = aplicar_importacao(st.session_state.historico_orcamentos, resultado.totais, categoria, categorizar=categorizar)
+    _gravar_meses(alterados)
+    _recarregar_mes_atual()
+    return resultado, list(alterados)
+
+
+def obter_indice_periodos() -> IndicePeriodos:
+    """Índice cronológico dos meses do histórico; só é reconstruído quando o conjunto de meses muda."""
+    chaves = tuple(st.session_state.historico_orcamentos.keys())
+    if st.session_state.get('indice_periodos_chaves') != chaves:
+        st.session_state.indice_periodos = IndicePeriodos(chaves)
+        st.session_state.indice_periodos_chaves = chaves
+    return st.session_state.indice_periodos
+
+
+def obter_cache_figuras() -> CacheFiguras:
+    """Figuras Plotly da sessão, reaproveitadas entre reruns."""
+    if 'cache_figuras' not in st.session_state:
+        st.session_state.cache_figuras = CacheFiguras()
+    return st.session_state.cache_figuras
+
+
+def criar_novo_mes(nome_mes):
+    """Grava as alterações do mês atual, cria um mês vazio e o seleciona."""
+    descarregar_alteracoes()
+    st.session_state.historico_orcamentos[nome_mes] = MesCompacto()
+    _persistir_mes(nome_mes, st.session_state.historico_orcamentos[nome_mes])
+    st.session_state.mes_selecionado = nome_mes
+    reiniciar_widgets_do_mes()
+    # O seletor de mês também precisa refletir o novo mês
+    st.session_state.pop('mes_select', None)
+
+
+@medido('estado:carregar_historico')
+def _historico_do_usuario(user_email, historico_sessao) -> HistoricoSessao:
+    """
+    Histórico sob demanda do usuário. Meses que só existem na sessão (ex.: os iniciais) também
+    vão para o banco, que é a fonte das consultas do dashboard.
+    """
+    repositorio = obter_repositorio()
+    resumo = {mes: totais for mes, *totais in repositorio.resumo_meses(user_email)}
+    locais = {mes: dados for mes, dados in historico_sessao.items() if mes not in resumo}
+    if locais:
+        repositorio.salvar_varios(user_email, locais)
+    historico = HistoricoSessao(
+        resumo,
+        carregar=lambda mes: repositorio.carregar(user_email, mes),
+        carregar_todos=lambda: repositorio.carregar_usuario(user_email).items(),
+    )
+    historico.update(locais)
+    return historico
+
+
 def inicializar_estado():
-    MES_INICIAL = "Dezembro"
-    
+    """Início de cada rerun da página: prepara a sessão e o mês selecionado (e abre a medição do rerun, se o perfil está ligado)."""
+    iniciar_execucao()
+    _inicializar_estado()
+
+
+@medido('inicializar_estado')
+def _inicializar_estado():
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
         st.session_state.user_name = None
         st.session_state.user_email = None
         st.session_state.app_mode = 'login' 
         
-    if 'usuarios' not in st.session_state:
-        st.session_state.usuarios = {
-            'exemplo@teste.com': {'nome': 'Exemplo User', 'senha': '123'}
-        }
-        
+    # O token de sessão fica só no servidor (session_state, nunca na URL); expirado ou revogado, volta ao login
+    token = st.session_state.get('token_sessao')
+    if st.session_state.authenticated and token and obter_usuarios().conta_do_token(token) is None:
+        logout()
+
     if 'frequencia_pagamento' not in st.session_state:
         st.session_state.frequencia_pagamento = 'Mensal'
 
     if 'historico_orcamentos' not in st.session_state:
-        st.session_state.historico_orcamentos = {
-            "Novembro": {
-                'salario_liquido': 0.0, 
-                'despesas_fixas': {'Aluguel/Moradia': 0.0, 'Supermercado': 0.0, 'Contas (Luz/Água/Internet)': 0.0},
-                'gastos_lazer': {'Streaming/Assinatura': 0.0, 'Lanches/Restaurantes': 0.0, 'Academia': 0.0},
-                'poupanca_investimentos': 0.0
-            }
-        }
-    
+        # Meses de exemplo de uma sessão nova (data/initial_data.json)
+        st.session_state.historico_orcamentos = HistoricoSessao.de_meses(carregar_dados_iniciais())
+
+    # Mês aberto numa sessão nova: o seguinte ao último mês de exemplo (ou o mês atual, sem exemplos)
+    if 'mes_inicial' not in st.session_state:
+        datados = IndicePeriodos(list(st.session_state.historico_orcamentos)).datados()
+        periodo_inicial = Periodo.de_texto(datados[-1]).deslocar(1) if datados else Periodo.atual()
+        st.session_state.mes_inicial = str(periodo_inicial)
+    MES_INICIAL = st.session_state.mes_inicial
+
     if 'mes_selecionado' not in st.session_state:
         st.session_state.mes_selecionado = MES_INICIAL
     
     if MES_INICIAL not in st.session_state.historico_orcamentos:
-        st.session_state.historico_orcamentos[MES_INICIAL] = {
-            'salario_liquido': 0.0, 
-            'despesas_fixas': {},
-            'gastos_lazer': {},
-            'poupanca_investimentos': 0.0
-        }
+        st.session_state.historico_orcamentos[MES_INICIAL] = MesCompacto()
     
+    # No login, a sessão passa a usar o histórico do banco: só o resumo de todos os meses (totais
+    # agregados no SQLite) é lido agora; os itens de cada mês são lidos quando o mês é aberto
+    if st.session_state.authenticated and st.session_state.get('historico_carregado_de') != st.session_state.user_email:
+        st.session_state.historico_orcamentos = _historico_do_usuario(st.session_state.user_email, st.session_state.historico_orcamentos)
+        st.session_state.pop('registro_materializado', None)
+        st.session_state.historico_carregado_de = st.session_state.user_email
+        registrar_alteracao_historico()
+
     if st.session_state.authenticated:
+        descarregar_alteracoes(somente_vencidas=True)
         carregar_dados_mes_selecionado()
 
+def iniciar_sessao(conta):
+    """Autentica a sessão com a conta já verificada e guarda o token de sessão (só no session_state)."""
+    st.session_state.token_sessao = obter_usuarios().criar_token(conta)
+    st.session_state.authenticated = True
+    st.session_state.user_name = conta.nome
+    st.session_state.user_email = conta.email
+    st.session_state.app_mode = 'main_app'
+
+
 def logout():
+    if st.session_state.get('user_email'):
+        descarregar_alteracoes()
+    token = st.session_state.pop('token_sessao', None)
+    if token:
+        obter_usuarios().revogar_token(token)
+    # O histórico pertence ao usuário que saiu; o próximo login recarrega o seu do banco
+    st.session_state.pop('historico_orcamentos', None)
+    st.session_state.pop('historico_carregado_de', None)
+    st.session_state.pop('registro_materializado', None)
+    st.session_state.pop('frames_historico', None)
+    st.session_state.pop('frames_historico_fatia', None)
+    st.session_state.pop('categorizador', None)
+    st.session_state.pop('alteracoes_pendentes', None)
+    for chave_editor in EDITORES_DO_MES.values():
+        st.session_state.pop(f"{chave_editor}_base", None)
     st.session_state.authenticated = False
     st.session_state.user_name = None
     st.session_state.user_email = None
@@ -100,34 +423,10 @@ def logout():
     st.success("Sessão encerrada com sucesso.")
     st.rerun()
 
-DATABASE_NAME = 'orcamento_app.db'
-
 def init_db():
+    # O esquema fica no repositório, que também mantém a conexão compartilhada do processo
     conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    # Tabela de Usuários (para autenticação)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            email TEXT PRIMARY KEY,
-            nome TEXT NOT NULL,
-            senha TEXT NOT NULL 
-        )
-    """)
-    
-    # Tabela de Orçamentos (para persistir os dados mensais de cada usuário)
-    # Recomendação: Salvar os dados complexos (despesas_fixas, gastos_lazer) como JSON
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orcamentos (
-            id INTEGER PRIMARY KEY,
-            user_email TEXT,
-            mes TEXT NOT NULL,
-            dados_json TEXT NOT NULL,
-            UNIQUE(user_email, mes)
-        )
-    """)
-    
-    conn.commit()
+    criar_esquema(conn)
     conn.close()
 
-# Você chamaria init_db() no início do seu app.py ou main_app_controller()
\ No newline at end of file
+# Você chamaria init_db() no início do seu app.py ou main_app_controller()
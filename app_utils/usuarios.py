@@ -0,0 +1,175 @@
+# app_utils/usuarios.py
+import atexit
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from app_utils.repositorio import obter_repositorio
+
+# Custo do scrypt: n (CPU/memória, potência de 2), r (tamanho do bloco), p (paralelismo).
+# Hashes gravados com outros parâmetros são refeitos no próximo login bem-sucedido.
+PARAMETROS_SCRYPT = {'n': 2 ** 14, 'r': 8, 'p': 1}
+TAMANHO_SAL = 16
+TAMANHO_HASH = 32
+VALIDADE_TOKEN_SEGUNDOS = 12 * 60 * 60
+# Metade dos núcleos para hash de senha; o restante fica para as threads de script do Streamlit
+WORKERS_HASH = max(1, (os.cpu_count() or 2) // 2)
+
+CONTA_EXEMPLO = ('exemplo@teste.com', 'Exemplo User', '123')
+
+
+class MuitasTentativas(RuntimeError):
+    """Há verificações de senha demais aguardando (rajada de logins)."""
+
+
+@dataclass(frozen=True)
+class Conta:
+    email: str
+    nome: str
+    senha_hash: str
+
+
+def gerar_hash_senha(senha, parametros=None) -> str:
+    """Hash da senha no formato 'scrypt$n$r$p$sal$hash' (sal e hash em hexadecimal)."""
+    parametros = parametros or PARAMETROS_SCRYPT
+    sal = secrets.token_bytes(TAMANHO_SAL)
+    chave = hashlib.scrypt(
+        senha.encode('utf-8'), salt=sal, n=parametros['n'], r=parametros['r'], p=parametros['p'],
+        maxmem=256 * parametros['n'] * parametros['r'], dklen=TAMANHO_HASH
+    )
+    return f"scrypt${parametros['n']}${parametros['r']}${parametros['p']}${sal.hex()}${chave.hex()}"
+
+
+def verificar_senha(senha, senha_hash, parametros=None):
+    """
+    Retorna (senha confere, hash precisa ser refeito). Senhas antigas gravadas em texto puro
+    são aceitas uma última vez e sinalizadas para virar hash.
+    """
+    parametros = parametros or PARAMETROS_SCRYPT
+    partes = senha_hash.split('$')
+    if len(partes) != 6 or partes[0] != 'scrypt':
+        return hmac.compare_digest(senha.encode('utf-8'), senha_hash.encode('utf-8')), True
+    n, r, p = (int(parte) for parte in partes[1:4])
+    esperado = bytes.fromhex(partes[5])
+    chave = hashlib.scrypt(
+        senha.encode('utf-8'), salt=bytes.fromhex(partes[4]), n=n, r=r, p=p, maxmem=256 * n * r, dklen=len(esperado)
+    )
+    desatualizado = (n, r, p) != (parametros['n'], parametros['r'], parametros['p'])
+    return hmac.compare_digest(chave, esperado), desatualizado
+
+
+class ArmazemUsuarios:
+    """
+    Contas de usuário compartilhadas por todas as sessões do processo, gravadas na tabela 'usuarios'.
+    As contas lidas ficam em um dicionário por email. O hash das senhas (scrypt, caro de propósito)
+    roda em um pool pequeno de threads com fila limitada: uma rajada de logins ocupa no máximo
+    'max_workers' núcleos e o excedente recebe MuitasTentativas em vez de enfileirar sem fim.
+    Um login bem-sucedido gera um token de sessão, que dispensa a senha até expirar ou ser revogado.
+    """
+    def __init__(self, repositorio=None, max_workers=WORKERS_HASH, max_pendentes=16, parametros=None,
+                 validade_token_segundos=VALIDADE_TOKEN_SEGUNDOS):
+        self._repositorio = repositorio or obter_repositorio()
+        self.parametros = parametros or PARAMETROS_SCRYPT
+        self.validade_token_segundos = validade_token_segundos
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='senha')
+        self._vagas = threading.BoundedSemaphore(max_pendentes)
+        self._lock = threading.Lock()
+        self._contas = {}  # email -> Conta
+        self._tokens = {}  # token -> (email, expira_em)
+
+    def buscar(self, email):
+        """Conta do email (ou None)."""
+        with self._lock:
+            conta = self._contas.get(email)
+        if conta is None:
+            linha = self._repositorio.buscar_conta(email)
+            if linha is None:
+                return None
+            conta = Conta(*linha)
+            with self._lock:
+                self._contas[email] = conta
+        return conta
+
+    def _no_pool(self, funcao, *args):
+        """Executa a função no pool de hash, esperando o resultado; MuitasTentativas se a fila está cheia."""
+        if not self._vagas.acquire(blocking=False):
+            raise MuitasTentativas("Muitos acessos ao mesmo tempo. Tente novamente em alguns segundos.")
+        try:
+            return self._executor.submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+
+    def cadastrar(self, email, nome, senha):
+        """Cria a conta e retorna a Conta, ou None se o email já está cadastrado."""
+        if self.buscar(email) is not None:
+            return None
+        conta = Conta(email, nome, self._no_pool(gerar_hash_senha, senha, self.parametros))
+        if not self._repositorio.inserir_conta(conta.email, conta.nome, conta.senha_hash):
+            return None
+        with self._lock:
+            self._contas[email] = conta
+        return conta
+
+    def autenticar(self, email, senha):
+        """Conta se a senha confere; None caso contrário."""
+        conta = self.buscar(email)
+        if conta is None:
+            return None
+        confere, refazer = self._no_pool(verificar_senha, senha, conta.senha_hash, self.parametros)
+        if not confere:
+            return None
+        if refazer:
+            conta = Conta(conta.email, conta.nome, self._no_pool(gerar_hash_senha, senha, self.parametros))
+            self._repositorio.atualizar_senha(conta.email, conta.senha_hash)
+            with self._lock:
+                self._contas[email] = conta
+        return conta
+
+    # --- Tokens de sessão ---
+
+    def criar_token(self, conta) -> str:
+        token = secrets.token_urlsafe(32)
+        agora = time.monotonic()
+        with self._lock:
+            for antigo in [t for t, (_, expira_em) in self._tokens.items() if expira_em <= agora]:
+                del self._tokens[antigo]
+            self._tokens[token] = (conta.email, agora + self.validade_token_segundos)
+        return token
+
+    def conta_do_token(self, token):
+        """Conta dona do token válido (ou None), sem verificar a senha."""
+        with self._lock:
+            registro = self._tokens.get(token)
+        if registro is None or registro[1] <= time.monotonic():
+            return None
+        return self.buscar(registro[0])
+
+    def revogar_token(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def fechar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_armazem = None
+_lock_armazem = threading.Lock()
+
+
+def obter_usuarios() -> ArmazemUsuarios:
+    """Retorna o armazém de usuários único do processo (com a conta de exemplo), criando-o na primeira chamada."""
+    global _armazem
+    if _armazem is None:
+        with _lock_armazem:
+            if _armazem is None:
+                armazem = ArmazemUsuarios()
+                if armazem.buscar(CONTA_EXEMPLO[0]) is None:
+                    armazem.cadastrar(*CONTA_EXEMPLO)
+                atexit.register(armazem.fechar)
+                _armazem = armazem
+    return _armazem
@@ -1,5 +1,6 @@
 import streamlit as st
-from app_utils.state_manager import logout
+from app_utils.state_manager import logout, iniciar_sessao
+from app_utils.usuarios import obter_usuarios, MuitasTentativas
 
 def tela_cadastro():
     st.sidebar.title("🔒 Acesso")
@@ -21,17 +22,18 @@ def tela_cadastro():
                 st.error("Por favor, preencha todos os campos corretamente (a senha deve ter no mínimo 3 caracteres).")
                 return
             
-            if new_email in st.session_state.usuarios:
+            # A conta vai para o armazém compartilhado do processo (tabela 'usuarios'), visível a todas as sessões
+            try:
+                conta = obter_usuarios().cadastrar(new_email, new_name.strip().title(), new_password)
+            except MuitasTentativas as e:
+                st.error(str(e))
+                return
+            if conta is None:
                 st.error("Este email já está cadastrado. Tente fazer Login.")
                 return
             
-            st.session_state.usuarios[new_email] = {'nome': new_name.strip().title(), 'senha': new_password}
-            
             # Autentica e muda o modo
-            st.session_state.authenticated = True
-            st.session_state.user_name = new_name.strip().title()
-            st.session_state.user_email = new_email
-            st.session_state.app_mode = 'main_app'
+            iniciar_sessao(conta)
             st.success(f"Cadastro efetuado! Bem-vindo(a), {st.session_state.user_name}!")
             st.rerun()
 
@@ -49,14 +51,16 @@ def tela_login():
         login_button = st.form_submit_button("Entrar no Sistema 🚀")
         
         if login_button:
-            if email in st.session_state.usuarios:
-                user_data = st.session_state.usuarios[email]
-                if user_data['senha'] == password:
+            usuarios = obter_usuarios()
+            if usuarios.buscar(email) is not None:
+                try:
+                    conta = usuarios.autenticar(email, password)
+                except MuitasTentativas as e:
+                    st.error(str(e))
+                    return
+                if conta is not None:
                     # Autentica e muda o modo
-                    st.session_state.authenticated = True
-                    st.session_state.user_name = user_data['nome']
-                    st.session_state.user_email = email
-                    st.session_state.app_mode = 'main_app'
+                    iniciar_sessao(conta)
                     st.success(f"Bem-vindo(a), {st.session_state.user_name}!")
                     st.rerun()
                 else:
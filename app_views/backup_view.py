@@ -0,0 +1,38 @@
+# app_views/backup_view.py
+import time
+
+import streamlit as st
+from app_utils.snapshot_historico import FORMATOS, formatos_disponiveis
+from app_utils.state_manager import exportar_backup_historico, restaurar_backup_historico
+
+ROTULOS_FORMATO = {'arrow': 'Arrow (carga mais rápida)', 'parquet': 'Parquet (mais compacto)', 'json': 'JSON (texto)'}
+
+
+def exibir_backup_historico():
+    """Exportação e restauração do histórico completo do usuário (barra lateral)."""
+    with st.sidebar.expander("💾 Backup do Histórico"):
+        mensagem = st.session_state.pop('backup_mensagem', None)
+        if mensagem:
+            st.success(mensagem)
+
+        formato = st.selectbox('Formato', formatos_disponiveis(), format_func=ROTULOS_FORMATO.get, key="backup_formato")
+        if st.button('Preparar backup', key="preparar_backup"):
+            st.session_state.backup_historico = (formato, exportar_backup_historico(formato))
+        backup = st.session_state.get('backup_historico')
+        if backup and backup[0] == formato:
+            st.download_button(
+                f"⬇️ Baixar ({len(backup[1]) / 1024:,.0f} KB)", data=backup[1],
+                file_name=f"historico_orcamentos{FORMATOS[formato]}", mime="application/octet-stream"
+            )
+
+        arquivo = st.file_uploader('Restaurar de um backup', type=[extensao.lstrip('.') for extensao in FORMATOS.values()], key="backup_upload")
+        if arquivo is not None and st.button('Restaurar', key="restaurar_backup"):
+            inicio = time.perf_counter()
+            try:
+                restaurados = restaurar_backup_historico(arquivo.getvalue())
+            except (ValueError, RuntimeError) as e:
+                st.error(f"Backup inválido: {e}")
+            else:
+                st.session_state.pop('backup_historico', None)
+                st.session_state.backup_mensagem = f"{restaurados} mês(es) restaurado(s) em {time.perf_counter() - inicio:.2f}s."
+                st.rerun()
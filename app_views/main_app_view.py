@@ -1,37 +1,290 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from app_utils.state_manager import logout, salvar_orcamento_atual, atualizar_orcamento_do_selectbox, adicionar_gasto
+from app_utils.state_manager import logout, salvar_orcamento_atual, marcar_alteracao, aplicar_edicoes_itens, EDITORES_DO_MES, descarregar_alteracoes, falha_gravacao, INTERVALO_GRAVACAO_SEGUNDOS, atualizar_orcamento_do_selectbox, adicionar_gasto, criar_novo_mes, obter_indice_periodos, obter_cache_figuras, importar_extrato
+from app_utils.importador_extrato import ErroImportacao
+from app_utils.periodo import Periodo
 from app_utils.orcamento_class import Orcamento
-from utils.pdf_generator import criar_pdf_relatorio, criar_pdf_relatorio_historico
+from utils.relatorio_cache import impressao_orcamento, impressao_historico
+from utils.fila_relatorios import enviar_pdf_relatorio, enviar_pdf_relatorio_historico
+from utils.graficos import CATEGORIAS_50_30_20, figura_ideal_vs_real
+from .relatorios_view import pedir_relatorio, exibir_trabalho_relatorio
 from .dashboard_view import criar_dashboard_historico
+from .regras_view import exibir_regras_categorizacao, ROTULOS_CATEGORIA
+from .backup_view import exibir_backup_historico
+from .perfil_view import exibir_painel_perfil
+from app_utils.perfil import concluindo_execucao, medido
+
+
+@st.fragment(run_every=INTERVALO_GRAVACAO_SEGUNDOS)
+def _aguardar_gravacao():
+    """Grava as alterações paradas há mais de INTERVALO_GRAVACAO_SEGUNDOS mesmo sem interação."""
+    # Se a gravação falhar, as alterações continuam pendentes e são tentadas de novo no próximo ciclo
+    if descarregar_alteracoes(somente_vencidas=True):
+        st.rerun()  # a página toda, para o dashboard refletir o que foi gravado
+
+
+@st.fragment(key='gravacao_pendente')
+def _gravacao_pendente():
+    """Aviso de alterações não gravadas e checkpoint; o temporizador só roda enquanto há alterações pendentes."""
+    if falha_gravacao() is not None:
+        st.warning("⚠️ O banco recusou a última gravação; ela será tentada de novo.")
+    if st.session_state.get('alteracoes_pendentes'):
+        _aguardar_gravacao()
+        st.caption("✏️ Alterações ainda não gravadas")
+        if st.button("💾 Salvar agora", key="checkpoint_mes"):
+            salvar_orcamento_atual()
+            st.rerun()
+
+
+# Regiões da página que se atualizam sozinhas (st.fragment com chave). Cada parte do estado do mês lista
+# as regiões que dependem dela: o callback que altera a parte reexecuta só essas regiões, não a página toda.
+# Salário, mês, frequência, importação, regras e backup continuam reexecutando a página inteira.
+# 'gravacao_pendente' entra em todas: é ela que liga o temporizador de gravação da alteração.
+DEPENDENCIAS_REGIOES = {
+    'despesas_fixas': ['aba_fixas', 'resumo_mes', 'relatorio_mensal', 'gravacao_pendente'],
+    'gastos_lazer': ['aba_lazer', 'resumo_mes', 'relatorio_mensal', 'gravacao_pendente'],
+    'poupanca_investimentos': ['aba_poupanca', 'resumo_mes', 'relatorio_mensal', 'gravacao_pendente'],
+}
+
+
+def _orcamento_do_mes() -> Orcamento:
+    """Orçamento do mês atual a partir do session_state (as coleções de itens são reaproveitadas, sem cópia)."""
+    return Orcamento(
+        st.session_state.salario_liquido, st.session_state.mes_selecionado,
+        st.session_state.despesas_fixas, st.session_state.gastos_lazer,
+        st.session_state.poupanca_investimentos
+    )
+
+
+def _adicionar_gasto_do_form(categoria, chave_itens, prefixo):
+    """Callback do formulário de novo gasto: inclui o item e atualiza só as regiões que dependem da categoria."""
+    item = st.session_state[f"{prefixo}_item"]
+    valor = st.session_state[f"{prefixo}_valor"]
+    if adicionar_gasto(categoria, item, valor):
+        st.session_state[f"{chave_itens}_mensagem"] = f'Item "{item}" (R$ {valor:,.2f}) adicionado em {categoria.upper()}.'
+        st.rerun(DEPENDENCIAS_REGIOES[chave_itens])
+
+
+def _salvar_edicoes(chave_itens, mensagem_sucesso):
+    """Callback do botão Salvar do editor: aplica as alterações do widget e atualiza as regiões dependentes."""
+    chave_editor = EDITORES_DO_MES[chave_itens]
+    nomes = st.session_state[f"{chave_editor}_base"][2]
+    try:
+        _, ignorados = aplicar_edicoes_itens(chave_itens, nomes, st.session_state.get(chave_editor) or {})
+    except ValueError as e:
+        # Nada foi aplicado e o editor continua com as alterações, para o usuário corrigir
+        st.session_state[f"{chave_itens}_erro"] = str(e)
+        return
+    st.session_state[f"{chave_itens}_mensagem"] = mensagem_sucesso
+    if ignorados:
+        st.session_state[f"{chave_itens}_aviso"] = (
+            f"Linhas sem nome ou com valor vazio/zero ficaram de fora: {', '.join(ignorados)}."
+        )
+    st.rerun(DEPENDENCIAS_REGIOES[chave_itens])
+
+
+def _alterar_poupanca():
+    marcar_alteracao('poupanca_investimentos')
+    st.rerun(DEPENDENCIAS_REGIOES['poupanca_investimentos'])
+
+
+def _editor_itens(chave_itens, rotulo_salvar, chave_salvar, mensagem_sucesso):
+    """
+    Editor dos itens de uma categoria. A tabela base só é remontada quando os itens mudam, e as alterações
+    são lidas do próprio widget (linhas editadas, incluídas e excluídas), não comparando tabelas inteiras.
+    Editar células reexecuta só a aba (o fragmento em que o editor está).
+    """
+    itens = st.session_state[chave_itens]
+    chave_editor = EDITORES_DO_MES[chave_itens]
+    base = st.session_state.get(f"{chave_editor}_base")
+    if base is None or base[0] is not itens or base[1] != itens.versao:
+        if base is not None:
+            # As posições das edições guardadas no widget se referem à tabela antiga
+            st.session_state.pop(chave_editor, None)
+        nomes = list(itens.keys())
+        base = (itens, itens.versao, nomes, pd.DataFrame({'Item': nomes, 'Valor': list(itens.values())}))
+        st.session_state[f"{chave_editor}_base"] = base
+    df_itens = base[3]
+
+    st.markdown("---")
+    st.subheader("Itens Lançados: Edite o nome ou o valor, ou Exclua a linha (🗑️)")
+    st.data_editor(
+        df_itens, use_container_width=True, num_rows="dynamic", hide_index=True, key=chave_editor,
+        column_config={
+            "Item": st.column_config.TextColumn("Item", required=True),
+            "Valor": st.column_config.NumberColumn("Valor (R$)", min_value=0.0, format="R$ %.2f"),
+        },
+    )
+    edicoes = st.session_state.get(chave_editor) or {}
+    if edicoes.get('edited_rows') or edicoes.get('added_rows') or edicoes.get('deleted_rows'):
+        st.warning("Existem alterações pendentes (edição, inclusão ou exclusão). Clique em Salvar para aplicar.")
+        st.button(rotulo_salvar, key=chave_salvar, on_click=_salvar_edicoes, args=(chave_itens, mensagem_sucesso))
+
+
+def _aba_itens(categoria, chave_itens, chave_limite, titulo_limite, prefixo, rotulo_item, rotulo_adicionar,
+               rotulo_salvar, chave_salvar, mensagem_sucesso):
+    """Limite, total, formulário de novo gasto e editor de uma categoria de itens (conteúdo das abas 50% e 30%)."""
+    orcamento = _orcamento_do_mes()
+    limite = orcamento.calcular_limites_50_30_20().get(chave_limite, 0.0)
+    total = orcamento.calcular_total_categoria(categoria)
+    st.subheader(f"{titulo_limite}: R$ {limite:,.2f}")
+    st.info(f"Total Gasto Atual: R$ {total:,.2f} | Restante: R$ {limite - total:,.2f}")
+    mensagem = st.session_state.pop(f"{chave_itens}_mensagem", None)
+    if mensagem:
+        st.success(mensagem)
+    aviso = st.session_state.pop(f"{chave_itens}_aviso", None)
+    if aviso:
+        st.warning(aviso)
+    erro = st.session_state.pop(f"{chave_itens}_erro", None)
+    if erro:
+        st.error(erro)
+
+    with st.form(f"form_adicionar_{prefixo}"):
+        col_item, col_valor = st.columns([3, 2])
+        with col_item: st.text_input(rotulo_item, key=f"{prefixo}_item")
+        with col_valor: st.number_input('Valor (R$)', min_value=0.0, step=1.0, key=f"{prefixo}_valor")
+        st.form_submit_button(rotulo_adicionar, on_click=_adicionar_gasto_do_form, args=(categoria, chave_itens, prefixo))
+
+    if st.session_state[chave_itens]:
+        _editor_itens(chave_itens, rotulo_salvar, chave_salvar, mensagem_sucesso)
+
+
+# 50% - Despesas Fixas
+@st.fragment(key='aba_fixas')
+@medido('regiao:aba_fixas', raiz=True)
+def _aba_fixas():
+    _aba_itens(
+        'fixas', 'despesas_fixas', 'Necessidades (50%)', "Limite Ideal (50%)", 'fixa', 'Nome da Nova Despesa Fixa',
+        '➕ Adicionar Fixa', 'Salvar Alterações de Despesas Fixas', "salvar_fixas", "Despesas Fixas atualizadas com sucesso!"
+    )
+
+
+# 30% - Desejos e Lazer
+@st.fragment(key='aba_lazer')
+@medido('regiao:aba_lazer', raiz=True)
+def _aba_lazer():
+    _aba_itens(
+        'lazer', 'gastos_lazer', 'Desejos/Lazer (30%)', "Limite Ideal (30%)", 'lazer', 'Nome do Novo Gasto de Lazer/Desejo',
+        '➕ Adicionar Lazer', 'Salvar Alterações de Desejos/Lazer', "salvar_lazer", "Despesas de Lazer atualizadas com sucesso!"
+    )
+
+
+# 20% - Poupança e Investimento
+@st.fragment(key='aba_poupanca')
+@medido('regiao:aba_poupanca', raiz=True)
+def _aba_poupanca():
+    meta_poupanca = _orcamento_do_mes().calcular_limites_50_30_20().get('Poupança/Investimento (20%)', 0.0)
+    st.subheader(f"Meta Ideal (20%): R$ {meta_poupanca:,.2f}")
+
+    st.session_state.poupanca_investimentos = st.number_input(
+        'Digite o valor que você irá **poupar/investir** (R$)', min_value=0.0, value=st.session_state.poupanca_investimentos,
+        step=10.0, format="%.2f", key="poupanca_input", on_change=_alterar_poupanca
+    )
+    total_poupanca = st.session_state.poupanca_investimentos
+    if total_poupanca >= meta_poupanca: st.success(f"Excelente! Você atingiu ou superou a meta de poupança (R$ {total_poupanca:,.2f}).")
+    else: st.warning(f"Atenção: Você está R$ {meta_poupanca - total_poupanca:,.2f} abaixo da meta ideal de 20%.")
+
+
+@st.fragment(key='dashboard')
+@medido('regiao:dashboard', raiz=True)
+def _dashboard():
+    """
+    Dashboard histórico e o relatório de comparação histórica (que usa a seleção do dashboard).
+    Depende só do histórico gravado; mexer nos filtros e gráficos reexecuta apenas esta região.
+    """
+    df_historico_geral = criar_dashboard_historico()
+    if df_historico_geral.empty:
+        return
+
+    chave_pdf_historico = impressao_historico(df_historico_geral)
+    pedido_historico = st.session_state.get('pdf_historico_trabalho')
+    if not (pedido_historico and pedido_historico[0] == chave_pdf_historico and exibir_trabalho_relatorio(
+        'pdf_historico_trabalho', "⬇️ Baixar Relatório de Comparação Histórica em PDF", "Relatorio_Comparacao_Historica.pdf"
+    )):
+        st.button(
+            "📄 Preparar Relatório de Comparação Histórica em PDF",
+            key="preparar_pdf_historico",
+            on_click=pedir_relatorio,
+            args=('pdf_historico_trabalho', chave_pdf_historico, lambda: enviar_pdf_relatorio_historico(df_historico_geral)),
+        )
+
+
+@st.fragment(key='resumo_mes')
+@medido('regiao:resumo_mes', raiz=True)
+def _resumo_mes():
+    orcamento = _orcamento_do_mes()
+    limites = orcamento.calcular_limites_50_30_20()
+    # Totais reais mantidos incrementalmente pelo Orcamento
+    totais_reais = orcamento.calcular_totais_reais()
+    saldo = orcamento.salario_liquido - totais_reais['total_gasto_real']
+
+    st.header("3. 📈 Relatório Final do Mês")
+
+    col_resumo_salario, col_resumo_alocado, col_resumo_saldo = st.columns(3)
+    with col_resumo_salario: st.metric("Salário Líquido", f"R$ {orcamento.salario_liquido:,.2f}")
+    with col_resumo_alocado: st.metric("Total Alocado/Gasto", f"R$ {totais_reais['total_gasto_real']:,.2f}")
+    with col_resumo_saldo: st.metric("Saldo Restante", f"R$ {saldo:,.2f}", delta_color=("inverse" if saldo < 0 else "normal"))
+
+    fig = figura_ideal_vs_real(
+        [limites.get(categoria) for categoria in CATEGORIAS_50_30_20],
+        [totais_reais['total_fixas'], totais_reais['total_lazer'], totais_reais['total_poupanca']],
+        f"Comparação de Orçamento Ideal vs. Real - {orcamento.mes}",
+        cache=obter_cache_figuras(),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment(key='relatorio_mensal')
+@medido('regiao:relatorio_mensal', raiz=True)
+def _relatorio_mensal():
+    """Pedido e download do PDF mensal; pedir o relatório reexecuta só esta região."""
+    orcamento = _orcamento_do_mes()
+    limites = orcamento.calcular_limites_50_30_20()
+    totais_reais = orcamento.calcular_totais_reais()
+    saldo = orcamento.salario_liquido - totais_reais['total_gasto_real']
+    user_name = st.session_state.get('user_name', 'Usuário Desconhecido')
+    frequencia_pagamento = st.session_state.get('frequencia_pagamento', 'N/A')
+
+    # Os PDFs só são gerados quando o usuário pede, em segundo plano (fila de relatórios);
+    # a chave (impressão digital do orçamento) garante que o download corresponde ao conteúdo atual.
+    chave_pdf_mensal = impressao_orcamento(orcamento, user_name, frequencia_pagamento)
+    pedido_mensal = st.session_state.get('pdf_mensal_trabalho')
+    if not (pedido_mensal and pedido_mensal[0] == chave_pdf_mensal and exibir_trabalho_relatorio(
+        'pdf_mensal_trabalho', "⬇️ Baixar Relatório Mensal em PDF",
+        f"Relatorio_Orcamento_{orcamento.mes}.pdf"
+    )):
+        st.button(
+            "📄 Preparar Relatório Mensal em PDF",
+            key="preparar_pdf_mensal",
+            on_click=pedir_relatorio,
+            args=('pdf_mensal_trabalho', chave_pdf_mensal, lambda: enviar_pdf_relatorio(
+                orcamento, limites, totais_reais, saldo, user_name, frequencia_pagamento
+            )),
+        )
+
 
 def MainAppView():
+    # O rerun da página termina aqui (ou no st.rerun()); o painel de perfil já mostra o rerun completo
+    with concluindo_execucao():
+        _pagina_principal()
+    exibir_painel_perfil()
 
 
+def _pagina_principal():
     st.title("💰 Gerenciador de Orçamento 50-30-20 Histórico")
     
     st.sidebar.success(f"Logado como: **{st.session_state.user_name}**")
     st.sidebar.button("Sair", on_click=logout)
+    with st.sidebar:
+        _gravacao_pendente()
+    exibir_backup_historico()
     
-    # Inicializa variáveis para evitar NameError se o salário for <= 0
-    meu_orcamento = None
-    limites = {}
-    total_fixas = 0.0
-    total_lazer = 0.0
-    total_poupanca = st.session_state.get('poupanca_investimentos', 0.0)
-    total_gasto_real = 0.0
-    saldo = st.session_state.salario_liquido
-    df_historico_geral = pd.DataFrame() 
-    
-
-
     # --- 1. Entrada de Dados Principais e Seleção de Mês ---
     st.header("1. 📝 Configuração Inicial e Seleção")
     col_mes_select, col_salario, col_frequencia, col_novo_mes = st.columns([1.5, 1.5, 1.5, 1]) 
 
     with col_mes_select:
-        meses_disponiveis = list(st.session_state.historico_orcamentos.keys())
+        meses_disponiveis = obter_indice_periodos().ordenados()
         if st.session_state.mes_selecionado not in meses_disponiveis:
             meses_disponiveis.append(st.session_state.mes_selecionado)
             
@@ -53,7 +306,7 @@ def MainAppView():
             step=100.0,
             format="%.2f",
             key="salario_input",
-            on_change=salvar_orcamento_atual 
+            on_change=marcar_alteracao, args=('salario_liquido',)
         )
     
     with col_frequencia:
@@ -62,194 +315,81 @@ def MainAppView():
             options=['Mensal', 'Quinzenal'],
             index=['Mensal', 'Quinzenal'].index(st.session_state.frequencia_pagamento),
             key="frequencia_input",
-            on_change=salvar_orcamento_atual 
+            on_change=marcar_alteracao
         )
         
     with col_novo_mes:
-        novo_mes_nome = st.text_input('Novo Mês (ex: Janeiro)', value="")
+        novo_mes_nome = st.text_input('Novo Mês (ex: Janeiro 2026)', value="")
         if st.button('➕ Criar Novo Mês'):
+            # O nome é normalizado para "Mês Ano", garantindo a ordem cronológica do histórico
+            periodo_novo = Periodo.de_texto(novo_mes_nome) if novo_mes_nome else None
+            if novo_mes_nome and periodo_novo is None:
+                st.error("Mês não reconhecido. Use, por exemplo, **Janeiro 2026** ou **01/2026**.")
+                novo_mes_nome = ""
+            elif periodo_novo is not None:
+                novo_mes_nome = str(periodo_novo)
             if novo_mes_nome and novo_mes_nome not in st.session_state.historico_orcamentos:
-                salvar_orcamento_atual() 
-                st.session_state.historico_orcamentos[novo_mes_nome] = {
-                    'salario_liquido': 0.0, 
-                    'despesas_fixas': {},
-                    'gastos_lazer': {},
-                    'poupanca_investimentos': 0.0
-                }
-                st.session_state.mes_selecionado = novo_mes_nome
+                criar_novo_mes(novo_mes_nome)
                 st.success(f"Mês **{novo_mes_nome}** criado. Insira o Salário Líquido!")
                 st.rerun()
             elif novo_mes_nome in st.session_state.historico_orcamentos:
                 st.error("Este mês já existe.")
 
-    if st.session_state.salario_liquido <= 0:
-        st.warning(f"Por favor, insira um **Salário Líquido** para o mês de **{st.session_state.mes_selecionado}** para ver os limites e gráficos.")
-    else: 
-        meu_orcamento = Orcamento(
-            st.session_state.salario_liquido, st.session_state.mes_selecionado,
-            st.session_state.despesas_fixas, st.session_state.gastos_lazer,
-            st.session_state.poupanca_investimentos
+    with st.expander("📥 Importar Extrato Bancário (CSV/OFX)"):
+        mensagem_importacao = st.session_state.pop('extrato_mensagem', None)
+        if mensagem_importacao:
+            st.success(mensagem_importacao)
+        arquivo_extrato = st.file_uploader('Extrato do banco (saídas viram gastos, agrupados por mês e descrição)', type=['csv', 'ofx'], key="extrato_upload")
+        usar_regras = st.checkbox('Categorizar pelas regras (abaixo)', value=True, key="extrato_usar_regras")
+        categoria_extrato = st.radio(
+            'Gastos sem regra vão para' if usar_regras else 'Lançar os gastos em',
+            options=['lazer', 'fixas'], horizontal=True, key="extrato_categoria", format_func=ROTULOS_CATEGORIA.get
         )
-        limites = meu_orcamento.calcular_limites_50_30_20()
-        
-        st.markdown("---")
-        
-        # --- 2. Abas para Inserção/Edição de Gastos ---
-        tab_fixas, tab_lazer, tab_poupanca, tab_historico = st.tabs([
-            f"🏠 50% Necessidades ({st.session_state.mes_selecionado})", 
-            f"✨ 30% Desejos e Lazer ({st.session_state.mes_selecionado})", 
-            f"🎯 20% Poupança/Investimento ({st.session_state.mes_selecionado})",
-            "📊 Dashboard Histórico e Economia"
-        ])
-
-        # Recalcula totais reais para uso na tela e PDF
-        total_fixas = meu_orcamento.calcular_total_categoria('fixas')
-        total_lazer = meu_orcamento.calcular_total_categoria('lazer')
-        total_poupanca = meu_orcamento.calcular_total_categoria('poupanca')
-        total_gasto_real = total_fixas + total_lazer + total_poupanca
-        saldo = st.session_state.salario_liquido - total_gasto_real
-
-        # 50% - Despesas Fixas (Mantido)
-        with tab_fixas:
-            limite_fixas = limites.get('Necessidades (50%)', 0.0)
-            st.subheader(f"Limite Ideal (50%): R$ {limite_fixas:,.2f}")
-            st.info(f"Total Gasto Atual: R$ {total_fixas:,.2f} | Restante: R$ {limite_fixas - total_fixas:,.2f}")
-
-            with st.form("form_adicionar_fixa"):
-                col_item, col_valor = st.columns([3, 2])
-                with col_item: item_fixa = st.text_input('Nome da Nova Despesa Fixa', key="fixa_item")
-                with col_valor: valor_fixa = st.number_input('Valor (R$)', min_value=0.0, step=1.0, key="fixa_valor")
-                if st.form_submit_button('➕ Adicionar Fixa'): adicionar_gasto('fixas', item_fixa, valor_fixa)
-                    
-            if st.session_state.despesas_fixas:
-                st.markdown("---")
-                st.subheader("Itens Lançados: Edite o valor ou Exclua a linha (🗑️)")
-                df_fixas = pd.DataFrame(st.session_state.despesas_fixas.items(), columns=['Item', 'Valor']).set_index('Item') 
-                edited_df_fixas = st.data_editor(df_fixas, use_container_width=True, num_rows="dynamic", key="editor_fixas", column_config={"Valor": st.column_config.NumberColumn("Valor (R$)", min_value=0.0, format="R$ %.2f")})
-                
-                if len(edited_df_fixas) != len(df_fixas) or not edited_df_fixas['Valor'].equals(df_fixas['Valor']):
-                    st.warning("Existem alterações pendentes (edição ou exclusão). Clique em Salvar para aplicar.")
-                    if st.button('Salvar Alterações de Despesas Fixas', key="salvar_fixas"):
-                        novo_estado_fixas = {k: v for k, v in edited_df_fixas['Valor'].to_dict().items() if v is not None and v > 0}
-                        st.session_state.despesas_fixas = novo_estado_fixas
-                        salvar_orcamento_atual()
-                        st.success("Despesas Fixas atualizadas com sucesso!")
-                        st.rerun()
-
-        # 30% - Desejos e Lazer (Mantido)
-        with tab_lazer:
-            limite_lazer = limites.get('Desejos/Lazer (30%)', 0.0)
-            st.subheader(f"Limite Ideal (30%): R$ {limite_lazer:,.2f}")
-            st.info(f"Total Gasto Atual: R$ {total_lazer:,.2f} | Restante: R$ {limite_lazer - total_lazer:,.2f}")
-
-            with st.form("form_adicionar_lazer"):
-                col_item, col_valor = st.columns([3, 2])
-                with col_item: item_lazer = st.text_input('Nome do Novo Gasto de Lazer/Desejo', key="lazer_item")
-                with col_valor: valor_lazer = st.number_input('Valor (R$)', min_value=0.0, step=1.0, key="lazer_valor")
-                if st.form_submit_button('➕ Adicionar Lazer'): adicionar_gasto('lazer', item_lazer, valor_lazer)
-
-            if st.session_state.gastos_lazer:
-                st.markdown("---")
-                st.subheader("Itens Lançados: Edite o valor ou Exclua a linha (🗑️)")
-                df_lazer = pd.DataFrame(st.session_state.gastos_lazer.items(), columns=['Item', 'Valor']).set_index('Item')
-                edited_df_lazer = st.data_editor(df_lazer, use_container_width=True, num_rows="dynamic", key="editor_lazer", column_config={"Valor": st.column_config.NumberColumn("Valor (R$)", min_value=0.0, format="R$ %.2f")})
-                
-                if len(edited_df_lazer) != len(df_lazer) or not edited_df_lazer['Valor'].equals(df_lazer['Valor']):
-                    st.warning("Existem alterações pendentes (edição ou exclusão). Clique em Salvar para aplicar.")
-                    if st.button('Salvar Alterações de Desejos/Lazer', key="salvar_lazer"):
-                        novo_estado_lazer = {k: v for k, v in edited_df_lazer['Valor'].to_dict().items() if v is not None and v > 0}
-                        st.session_state.gastos_lazer = novo_estado_lazer
-                        salvar_orcamento_atual()
-                        st.success("Despesas de Lazer atualizadas com sucesso!")
-                        st.rerun()
-                
-        # 20% - Poupança e Investimento (Mantido)
-        with tab_poupanca:
-            meta_poupanca = limites.get('Poupança/Investimento (20%)', 0.0)
-            st.subheader(f"Meta Ideal (20%): R$ {meta_poupanca:,.2f}")
-            
-            st.session_state.poupanca_investimentos = st.number_input(
-                'Digite o valor que você irá **poupar/investir** (R$)', min_value=0.0, value=st.session_state.poupanca_investimentos,
-                step=10.0, format="%.2f", key="poupanca_input", on_change=salvar_orcamento_atual 
-            )
-            if total_poupanca >= meta_poupanca: st.success(f"Excelente! Você atingiu ou superou a meta de poupança (R$ {total_poupanca:,.2f}).")
-            else: st.warning(f"Atenção: Você está R$ {meta_poupanca - total_poupanca:,.2f} abaixo da meta ideal de 20%.")
-        
+        if arquivo_extrato is not None and st.button('📥 Importar Extrato', key="importar_extrato"):
+            andamento = st.empty()
+            try:
+                arquivo_extrato.seek(0)
+                resultado, meses_alterados = importar_extrato(
+                    arquivo_extrato, categoria_extrato,
+                    formato='ofx' if arquivo_extrato.name.lower().endswith('.ofx') else None,
+                    progresso=lambda r: andamento.caption(f"{r.linhas:,} linhas lidas ({r.linhas_por_segundo:,.0f} linhas/s)..."),
+                    usar_regras=usar_regras
+                )
+            except ErroImportacao as e:
+                st.error(str(e))
+            else:
+                st.session_state.extrato_mensagem = (
+                    f"{resultado.linhas:,} linhas lidas em {resultado.segundos:.1f}s ({resultado.linhas_por_segundo:,.0f} linhas/s): "
+                    f"{resultado.gastos:,} gastos em {len(meses_alterados)} mês(es)"
+                    + (f", {resultado.ignoradas:,} linhas ignoradas (data ou valor inválido)." if resultado.ignoradas else ".")
+                )
+                st.rerun()
 
-        with tab_historico:
-            df_historico_geral = criar_dashboard_historico() 
+    exibir_regras_categorizacao()
 
-        st.markdown("---")
+    if st.session_state.salario_liquido <= 0:
+        st.warning(f"Por favor, insira um **Salário Líquido** para o mês de **{st.session_state.mes_selecionado}** para ver os limites e gráficos.")
+        return
 
-        st.header("3. 📈 Relatório Final do Mês")
-        
-        col_resumo_salario, col_resumo_alocado, col_resumo_saldo = st.columns(3)
-        with col_resumo_salario: st.metric("Salário Líquido", f"R$ {st.session_state.salario_liquido:,.2f}")
-        with col_resumo_alocado: st.metric("Total Alocado/Gasto", f"R$ {total_gasto_real:,.2f}")
-        with col_resumo_saldo: st.metric("Saldo Restante", f"R$ {saldo:,.2f}", delta_color=("inverse" if saldo < 0 else "normal"))
-
-        df_grafico = pd.DataFrame({
-            'Categoria': ['Necessidades (50%)', 'Desejos/Lazer (30%)', 'Poupança/Investimento (20%)'],
-            'Ideal': [limites.get('Necessidades (50%)'), limites.get('Desejos/Lazer (30%)'), limites.get('Poupança/Investimento (20%)')],
-            'Real': [total_fixas, total_lazer, total_poupanca]
-        })
-        df_grafico_melted = df_grafico.melt(id_vars='Categoria', var_name='Tipo', value_name='Valor')
-        fig = px.bar(df_grafico_melted, x='Categoria', y='Valor', color='Tipo', barmode='group', text='Valor', title=f"Comparação de Orçamento Ideal vs. Real - {st.session_state.mes_selecionado}", color_discrete_map={'Ideal': '#1f77b4', 'Real': '#ff7f0e'})
-        fig.update_traces(texttemplate='R$ %{text:,.2f}', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
-
-    user_name = st.session_state.get('user_name', 'Usuário Desconhecido') 
-    frequencia_pagamento = st.session_state.get('frequencia_pagamento', 'N/A')
+    st.markdown("---")
 
-    # A variável meu_orcamento é criada e os totais são calculados APENAS dentro do bloco ELSE
-    if meu_orcamento and meu_orcamento.salario_liquido > 0:
-        totais_reais = {
-            # Recalcula totais *dentro* deste bloco, garantindo que as variáveis existam
-            'total_fixas': meu_orcamento.calcular_total_categoria('fixas'),
-            'total_lazer': meu_orcamento.calcular_total_categoria('lazer'),
-            'total_poupanca': meu_orcamento.calcular_total_categoria('poupanca'),
-            'total_gasto_real': meu_orcamento.calcular_total_categoria('fixas') + meu_orcamento.calcular_total_categoria('lazer') + meu_orcamento.calcular_total_categoria('poupanca')
-        }
-        # Saldo também precisa ser recalculado com base nos valores atualizados
-        saldo_recalculado = meu_orcamento.salario_liquido - totais_reais['total_gasto_real']
-
-
-        try:
-            # 1. GERAÇÃO DOS DADOS BINÁRIOS
-            pdf_data = criar_pdf_relatorio(
-                meu_orcamento, 
-                limites, # Limites já definidos no bloco else
-                totais_reais, 
-                saldo_recalculado,
-                user_name, 
-                frequencia_pagamento
-            )
-            
-            # 2. CHAMADA DO BOTÃO APENAS SE A GERAÇÃO FOI BEM-SUCEDIDA
-            st.download_button(
-                label="⬇️ Baixar Relatório Mensal em PDF",
-                data=pdf_data, # pdf_data agora é garantidamente válido
-                file_name=f"Relatorio_Orcamento_{st.session_state.mes_selecionado}.pdf",
-                mime="application/pdf"
-            )
-            
-        except Exception as e:
-            # Captura erros de FPDF/codificação que ocorrem no Cloud
-            st.error(f"Erro ao gerar PDF: {e}")
-            st.info("Verifique se há acentos ou caracteres especiais em nomes de itens, apesar das correções de codificação.")
-
-
-    # NOVO: GERAÇÃO DO PDF E BOTÃO DE DOWNLOAD (Relatório Histórico)
-    # df_historico_geral foi definido no bloco else. Usamos uma verificação segura.
-    if 'df_historico_geral' in locals() and not df_historico_geral.empty:
-        # A função criar_pdf_relatorio_historico precisa ser chamada aqui
-        try:
-            pdf_data_historico = criar_pdf_relatorio_historico(df_historico_geral)
-            st.download_button(
-                label="⬇️ Baixar Relatório de Comparação Histórica em PDF",
-                data=pdf_data_historico,
-                file_name="Relatorio_Comparacao_Historica.pdf",
-                mime="application/pdf"
-            )
-        except Exception as e:
-            st.error(f"Erro ao gerar PDF Histórico: {e}")
\ No newline at end of file
+    # --- 2. Abas para Inserção/Edição de Gastos ---
+    # Cada aba, o dashboard, o resumo e a área de download são regiões independentes (ver DEPENDENCIAS_REGIOES)
+    tab_fixas, tab_lazer, tab_poupanca, tab_historico = st.tabs([
+        f"🏠 50% Necessidades ({st.session_state.mes_selecionado})",
+        f"✨ 30% Desejos e Lazer ({st.session_state.mes_selecionado})",
+        f"🎯 20% Poupança/Investimento ({st.session_state.mes_selecionado})",
+        "📊 Dashboard Histórico e Economia"
+    ])
+    with tab_fixas:
+        _aba_fixas()
+    with tab_lazer:
+        _aba_lazer()
+    with tab_poupanca:
+        _aba_poupanca()
+    with tab_historico:
+        _dashboard()
+
+    st.markdown("---")
+    _resumo_mes()
+    _relatorio_mensal()
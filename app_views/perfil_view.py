@@ -0,0 +1,43 @@
+# app_views/perfil_view.py
+import pandas as pd
+import streamlit as st
+from app_utils.perfil import ATIVO, obter_perfilador
+
+COLUNAS_FASES = ['Fase', 'Chamadas', 'Total (ms)', 'Média (ms)', 'Máx. (ms)']
+
+
+def _tabela_fases(linhas) -> pd.DataFrame:
+    return pd.DataFrame(linhas, columns=COLUNAS_FASES).set_index('Fase').round(2)
+
+
+def exibir_painel_perfil():
+    """
+    Painel de depuração na barra lateral, só com o perfil ligado (DINDIN_PERFIL=1): tempo de cada fase
+    no último rerun da página, os totais da sessão (inclusive reruns de regiões) e os trabalhos em segundo plano.
+    """
+    if not ATIVO:
+        return
+    perfilador = obter_perfilador()
+    perfil_sessao = st.session_state.get('perfil_sessao')
+    with st.sidebar.expander("🩺 Perfil de Execução"):
+        if perfil_sessao is None or not perfil_sessao.total_execucoes:
+            st.caption("Nenhuma execução medida ainda.")
+            return
+
+        ultima = perfil_sessao.ultima('pagina')
+        if ultima is not None:
+            st.caption(f"Último rerun da página: **{ultima.segundos * 1000:,.1f} ms** ({ultima.status})")
+            st.dataframe(_tabela_fases(ultima.totais()), use_container_width=True)
+
+        st.caption(
+            f"Sessão: {perfil_sessao.total_execucoes:,} execuções, {perfil_sessao.total_segundos * 1000:,.0f} ms "
+            f"(média {perfil_sessao.total_segundos * 1000 / perfil_sessao.total_execucoes:,.1f} ms)"
+        )
+        st.dataframe(_tabela_fases(perfil_sessao.totais()), use_container_width=True)
+
+        fundo = perfilador.fundo.totais()
+        if fundo:
+            st.caption("Segundo plano (todo o processo)")
+            st.dataframe(_tabela_fases(fundo), use_container_width=True)
+        if perfilador.arquivo:
+            st.caption(f"Uma linha JSON por execução em `{perfilador.arquivo}`")
@@ -0,0 +1,60 @@
+# app_views/regras_view.py
+import time
+
+import pandas as pd
+import streamlit as st
+from app_utils.categorizador import CATEGORIAS, TIPOS_REGRA, REGRAS_SISTEMA, Regra
+from app_utils.state_manager import obter_categorizador, salvar_regras_categorizacao, aplicar_regras_historico
+
+ROTULOS_CATEGORIA = {'fixas': '50% Necessidades', 'lazer': '30% Desejos e Lazer', 'poupanca': '20% Poupança'}
+
+
+def exibir_regras_categorizacao():
+    """Editor das regras de categorização do usuário e aplicação em lote ao histórico."""
+    with st.expander("🏷️ Regras de Categorização"):
+        mensagem = st.session_state.pop('regras_mensagem', None)
+        if mensagem:
+            st.success(mensagem)
+        st.caption(
+            "Classificam os gastos importados e, sob demanda, os itens já lançados. 'palavra' casa termos inteiros "
+            "(sem diferenciar maiúsculas e acentos); 'regex' é uma expressão regular. Suas regras valem antes das do "
+            f"sistema ({len(REGRAS_SISTEMA)} termos comuns, como aluguel, supermercado e netflix)."
+        )
+        regras = obter_categorizador().regras_usuario
+        df_regras = pd.DataFrame(
+            [(r.padrao, r.tipo, r.categoria) for r in regras], columns=['Padrão', 'Tipo', 'Categoria']
+        ).astype(str)
+        editado = st.data_editor(
+            df_regras, num_rows="dynamic", use_container_width=True, hide_index=True, key="editor_regras",
+            column_config={
+                "Padrão": st.column_config.TextColumn("Padrão", required=True),
+                "Tipo": st.column_config.SelectboxColumn("Tipo", options=list(TIPOS_REGRA), default='palavra', required=True),
+                "Categoria": st.column_config.SelectboxColumn("Categoria", options=list(CATEGORIAS), default='lazer', required=True),
+            },
+        )
+
+        col_salvar, col_aplicar = st.columns(2)
+        with col_salvar:
+            if st.button('💾 Salvar Regras', key="salvar_regras"):
+                novas = [
+                    Regra(str(padrao).strip(), categoria or 'lazer', tipo or 'palavra')
+                    for padrao, tipo, categoria in editado[['Padrão', 'Tipo', 'Categoria']].itertuples(index=False)
+                    if isinstance(padrao, str) and padrao.strip()
+                ]
+                try:
+                    salvar_regras_categorizacao(novas)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.pop('editor_regras', None)
+                    st.session_state.regras_mensagem = f"{len(novas)} regra(s) salva(s)."
+                    st.rerun()
+        with col_aplicar:
+            if st.button('🔁 Aplicar Regras a Todos os Meses', key="aplicar_regras"):
+                inicio = time.perf_counter()
+                movidos, meses = aplicar_regras_historico()
+                st.session_state.regras_mensagem = (
+                    f"{movidos} item(ns) reclassificado(s) em {len(meses)} mês(es) ({time.perf_counter() - inicio:.2f}s)."
+                    if movidos else "Nenhum item mudou de categoria."
+                )
+                st.rerun()
@@ -0,0 +1,52 @@
+# app_views/relatorios_view.py
+import streamlit as st
+from utils.fila_relatorios import fila_relatorios, FilaCheia, PRONTO
+
+
+def pedir_relatorio(chave_estado, impressao, enviar):
+    """Callback dos botões de relatório: enfileira a geração e guarda (impressão, id do trabalho) na sessão."""
+    try:
+        st.session_state[chave_estado] = (impressao, enviar())
+    except FilaCheia as e:
+        st.session_state[chave_estado] = (impressao, None)
+        st.session_state[f"{chave_estado}_erro"] = str(e)
+
+
+@st.fragment(run_every=1.0)
+def _acompanhar_trabalho(trabalho_id):
+    """Atualiza só este trecho da página a cada segundo até o PDF ficar pronto."""
+    trabalho = fila_relatorios.consultar(trabalho_id)
+    if trabalho is None or not trabalho.em_andamento:
+        st.rerun()
+    st.info(f"⏳ Gerando o relatório PDF... ({trabalho.decorrido():.0f}s)")
+
+
+def exibir_trabalho_relatorio(chave_estado, rotulo_download, nome_arquivo, mensagem_sucesso=None):
+    """
+    Mostra o andamento do relatório pedido em 'chave_estado': aguardando, botão de download ou erro.
+    Retorna False se não há trabalho a exibir (ex.: expirou), para que o botão de pedido volte a aparecer.
+    """
+    _, trabalho_id = st.session_state[chave_estado]
+    erro_envio = st.session_state.pop(f"{chave_estado}_erro", None)
+    if erro_envio:
+        st.session_state.pop(chave_estado, None)
+        st.error(erro_envio)
+        return False
+
+    trabalho = fila_relatorios.consultar(trabalho_id)
+    if trabalho is None:
+        st.session_state.pop(chave_estado, None)
+        return False
+
+    if trabalho.em_andamento:
+        _acompanhar_trabalho(trabalho_id)
+    elif trabalho.status == PRONTO:
+        if mensagem_sucesso:
+            st.success(mensagem_sucesso)
+        st.download_button(label=rotulo_download, data=trabalho.resultado, file_name=nome_arquivo, mime="application/pdf")
+    else:
+        # Mostra o erro e libera um novo pedido
+        st.session_state.pop(chave_estado, None)
+        st.error(f"Erro ao gerar PDF: {trabalho.erro}")
+        return False
+    return True
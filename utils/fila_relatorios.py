@@ -0,0 +1,122 @@
+# utils/fila_relatorios.py
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from app_utils.orcamento_class import SnapshotOrcamento
+from utils.pdf_generator import criar_pdf_relatorio, criar_pdf_relatorio_historico
+from utils.relatorio_cache import cache_relatorios, impressao_historico
+
+NA_FILA = 'na_fila'
+GERANDO = 'gerando'
+PRONTO = 'pronto'
+ERRO = 'erro'
+
+
+class FilaCheia(RuntimeError):
+    """Há trabalhos demais aguardando geração."""
+
+
+@dataclass
+class TrabalhoRelatorio:
+    """Um pedido de geração de PDF e o seu andamento."""
+    id: str
+    chave: tuple
+    status: str = NA_FILA
+    resultado: bytes = None
+    erro: str = None
+    criado_em: float = field(default_factory=time.monotonic)
+    concluido_em: float = None
+
+    @property
+    def em_andamento(self) -> bool:
+        return self.status in (NA_FILA, GERANDO)
+
+    def decorrido(self) -> float:
+        return (self.concluido_em or time.monotonic()) - self.criado_em
+
+
+class FilaRelatorios:
+    """
+    Gera os PDFs em um pool de threads limitado, fora da thread do script do Streamlit.
+    Cada pedido recebe um id para consulta do andamento; pedidos iguais (mesma chave do cache
+    de relatórios) enquanto um deles ainda está na fila, gerando ou pronto devolvem o mesmo id.
+    O resultado passa pelo cache_relatorios, então PDFs já gerados saem na hora.
+    """
+    def __init__(self, max_workers=2, max_pendentes=32, manter_concluidos_segundos=10 * 60):
+        self.max_pendentes = max_pendentes
+        self.manter_concluidos_segundos = manter_concluidos_segundos
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='relatorio')
+        self._lock = threading.Lock()
+        self._trabalhos = {}  # id -> TrabalhoRelatorio
+        self._por_chave = {}  # chave -> id
+
+    def enviar(self, chave, gerar) -> str:
+        """Enfileira a geração (gerar() -> bytes) e retorna o id do trabalho."""
+        with self._lock:
+            self._remover_antigos()
+            existente = self._trabalhos.get(self._por_chave.get(chave))
+            if existente is not None and existente.status != ERRO:
+                return existente.id
+            if sum(t.em_andamento for t in self._trabalhos.values()) >= self.max_pendentes:
+                raise FilaCheia("Muitos relatórios em geração; tente novamente em instantes.")
+            trabalho = TrabalhoRelatorio(uuid.uuid4().hex, chave)
+            self._trabalhos[trabalho.id] = trabalho
+            self._por_chave[chave] = trabalho.id
+        self._executor.submit(self._executar, trabalho, gerar)
+        return trabalho.id
+
+    def _executar(self, trabalho, gerar):
+        trabalho.status = GERANDO
+        try:
+            trabalho.resultado = cache_relatorios.obter(trabalho.chave, gerar)
+            trabalho.status = PRONTO
+        except Exception as e:
+            trabalho.erro = str(e)
+            trabalho.status = ERRO
+        finally:
+            trabalho.concluido_em = time.monotonic()
+
+    def _remover_antigos(self):
+        limite = time.monotonic() - self.manter_concluidos_segundos
+        for trabalho in [t for t in self._trabalhos.values() if t.concluido_em and t.concluido_em < limite]:
+            del self._trabalhos[trabalho.id]
+            if self._por_chave.get(trabalho.chave) == trabalho.id:
+                del self._por_chave[trabalho.chave]
+
+    def consultar(self, trabalho_id):
+        """O trabalho (com status, resultado e erro) ou None se o id não existe mais."""
+        with self._lock:
+            return self._trabalhos.get(trabalho_id)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            contagem = {NA_FILA: 0, GERANDO: 0, PRONTO: 0, ERRO: 0}
+            for trabalho in self._trabalhos.values():
+                contagem[trabalho.status] += 1
+            return contagem
+
+
+fila_relatorios = FilaRelatorios()
+
+
+def enviar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name, frequencia_pagamento) -> str:
+    """
+    Enfileira o PDF mensal. A geração usa uma cópia imutável do orçamento (SnapshotOrcamento),
+    pois o objeto da sessão continua sendo editado enquanto o PDF é gerado.
+    """
+    snapshot = SnapshotOrcamento.de_orcamento(orcamento_obj, frequencia_pagamento, user_name)
+    limites, totais_reais = dict(limites), dict(totais_reais)
+    return fila_relatorios.enviar(
+        ('mensal', snapshot),
+        lambda: criar_pdf_relatorio(snapshot.para_orcamento(), limites, totais_reais, saldo, user_name, frequencia_pagamento)
+    )
+
+
+def enviar_pdf_relatorio_historico(df_resumo_historico) -> str:
+    """Enfileira o PDF da comparação histórica (a partir de uma cópia do resumo)."""
+    df_resumo_historico = df_resumo_historico.copy()
+    chave = ('historico', impressao_historico(df_resumo_historico))
+    return fila_relatorios.enviar(chave, lambda: criar_pdf_relatorio_historico(df_resumo_historico))
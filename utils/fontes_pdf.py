@@ -0,0 +1,160 @@
+# utils/fontes_pdf.py
+import copy
+import io
+import os
+import threading
+import unicodedata
+from functools import lru_cache
+
+from fontTools import subset, ttLib
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap, TTFFont
+
+FAMILIA_UNICODE = "Dindin"
+FAMILIA_PADRAO = "Arial"  # fonte padrão do PDF (Latin-1), usada quando nenhuma TTF é encontrada
+
+_PASTA_FONTES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fonts')
+
+# Procurados nesta ordem; DINDIN_FONTE_TTF / DINDIN_FONTE_TTF_NEGRITO têm prioridade
+CANDIDATAS_FONTE = [
+    (os.path.join(_PASTA_FONTES, 'DejaVuSans.ttf'), os.path.join(_PASTA_FONTES, 'DejaVuSans-Bold.ttf')),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf', '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf'),
+    ('/Library/Fonts/Arial Unicode.ttf', '/Library/Fonts/Arial Bold.ttf'),
+    ('C:\\Windows\\Fonts\\arial.ttf', 'C:\\Windows\\Fonts\\arialbd.ttf'),
+]
+
+# Faixas mantidas na cópia da fonte em memória: latim com acentos, pontuação, moedas e símbolos
+# comuns. Reduzir a fonte uma vez por processo evita que cada PDF decodifique os ~6 mil glifos da TTF.
+FAIXAS_UNICODE = ((0x20, 0x24F), (0x2000, 0x206F), (0x20A0, 0x20BF), (0x2100, 0x21FF))
+
+# Caracteres comuns fora do Latin-1 (colados de bancos/planilhas) e seus equivalentes
+_SUBSTITUTOS_LATIN1 = str.maketrans({
+    '\u2013': '-', '\u2014': '-', '\u2212': '-', '\u2018': "'", '\u2019': "'", '\u201a': ',',
+    '\u201c': '"', '\u201d': '"', '\u2022': '*', '\u2026': '...', '\u20ac': 'EUR', '\u00a0': ' ',
+})
+
+
+@lru_cache(maxsize=1)
+def localizar_fonte():
+    """Caminhos (regular, negrito) da TTF Unicode a usar, ou None. O negrito cai para a regular se faltar."""
+    regular = os.environ.get('DINDIN_FONTE_TTF')
+    if regular:
+        negrito = os.environ.get('DINDIN_FONTE_TTF_NEGRITO', regular)
+        return (regular, negrito) if os.path.exists(regular) else None
+    for regular, negrito in CANDIDATAS_FONTE:
+        if os.path.exists(regular):
+            return regular, negrito if os.path.exists(negrito) else regular
+    return None
+
+
+def familia_fonte() -> str:
+    """Família a usar em set_font(): a TTF Unicode se disponível, senão a fonte padrão."""
+    return FAMILIA_UNICODE if localizar_fonte() else FAMILIA_PADRAO
+
+
+@lru_cache(maxsize=8192)
+def texto_seguro(texto) -> str:
+    """
+    Prepara o texto para o PDF. Com a fonte Unicode, só normaliza (NFC); com a fonte padrão,
+    troca o que não existe em Latin-1 por equivalentes (aspas, travessões) ou pela letra sem acento.
+    """
+    texto = unicodedata.normalize('NFC', str(texto))
+    if localizar_fonte():
+        return texto if all(map(_na_fonte_unicode, texto)) else _trocar_ausentes(texto, _na_fonte_unicode)
+    texto = texto.translate(_SUBSTITUTOS_LATIN1)
+    try:
+        texto.encode('latin-1')
+        return texto
+    except UnicodeEncodeError:
+        return _trocar_ausentes(texto, _no_latin1)
+
+
+def _no_latin1(caractere) -> bool:
+    return ord(caractere) < 256
+
+
+def _na_fonte_unicode(caractere) -> bool:
+    codigo = ord(caractere)
+    return codigo < 0x20 or any(inicio <= codigo <= fim for inicio, fim in FAIXAS_UNICODE)
+
+
+def _trocar_ausentes(texto, disponivel) -> str:
+    return ''.join(c if disponivel(c) else _sem_acento(c, disponivel) for c in texto)
+
+
+def _sem_acento(caractere, disponivel) -> str:
+    base = ''.join(c for c in unicodedata.normalize('NFKD', caractere) if not unicodedata.combining(c))
+    return base if base and all(map(disponivel, base)) else '?'
+
+
+def _fonte_reduzida(caminho) -> bytes:
+    """Bytes da TTF reduzida às FAIXAS_UNICODE (sem hinting nem tabelas de layout avançado)."""
+    opcoes = subset.Options()
+    opcoes.layout_features = []
+    opcoes.hinting = False
+    opcoes.notdef_outline = True
+    opcoes.name_IDs = ['*']
+    opcoes.drop_tables += ['FFTM']
+    redutor = subset.Subsetter(opcoes)
+    redutor.populate(unicodes=[c for inicio, fim in FAIXAS_UNICODE for c in range(inicio, fim + 1)])
+    fonte = ttLib.TTFont(caminho, recalcTimestamp=False)
+    redutor.subset(fonte)
+    saida = io.BytesIO()
+    fonte.save(saida)
+    return saida.getvalue()
+
+
+class _CacheFontes:
+    """
+    Fontes TTF lidas, reduzidas e analisadas uma única vez por processo. O fpdf2 altera a fonte ao gerar
+    o PDF (subset, glifos ausentes, larguras lidas do defaultdict, id do descritor), então cada documento
+    recebe uma cópia do protótipo com todo esse estado próprio e um TTFont novo, aberto dos bytes em memória.
+    Depende dos atributos do TTFFont do fpdf2 fixado em requirements.txt.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prototipos = {}  # estilo -> (protótipo TTFFont, bytes da fonte reduzida)
+
+    def _prototipo(self, estilo, caminho):
+        with self._lock:
+            if estilo not in self._prototipos:
+                dados = _fonte_reduzida(caminho)
+                fontkey = f"{FAMILIA_UNICODE.lower()}{estilo}"
+                self._prototipos[estilo] = (TTFFont(FPDF(), io.BytesIO(dados), fontkey, estilo), dados)
+            return self._prototipos[estilo]
+
+    def registrar(self, pdf: FPDF, estilo, caminho):
+        prototipo, dados = self._prototipo(estilo, caminho)
+        if prototipo.color_font is not None:
+            # Fontes coloridas guardam estado ligado ao FPDF: analisadas de novo a cada documento
+            pdf.fonts[prototipo.fontkey] = TTFFont(pdf, io.BytesIO(dados), prototipo.fontkey, estilo)
+            return
+        # Só as tabelas imutáveis da TTF ficam em comum; o que o fpdf2 altera é copiado por documento
+        fonte = copy.copy(prototipo)
+        fonte.i = len(pdf.fonts) + 1
+        fonte.ttfont = ttLib.TTFont(io.BytesIO(dados), recalcTimestamp=False, lazy=True)
+        fonte.ttffile = caminho
+        fonte.cw = copy.copy(prototipo.cw)
+        fonte.cmap = dict(prototipo.cmap)
+        fonte.glyph_ids = dict(prototipo.glyph_ids)
+        fonte.desc = copy.deepcopy(prototipo.desc)
+        fonte.missing_glyphs = []
+        fonte.biggest_size_pt = 0
+        fonte._hbfont = None
+        fonte.subset = SubsetMap(fonte)
+        pdf.fonts[prototipo.fontkey] = fonte
+
+
+_cache_fontes = _CacheFontes()
+
+
+def novo_pdf() -> FPDF:
+    """Cria o FPDF com a fonte Unicode (se houver) já registrada a partir do cache do processo."""
+    pdf = FPDF()
+    caminhos = localizar_fonte()
+    if caminhos:
+        for estilo, caminho in zip(("", "B"), caminhos):
+            _cache_fontes.registrar(pdf, estilo, caminho)
+    return pdf
@@ -0,0 +1,185 @@
+# utils/gerar_relatorios_lote.py
+"""
+Gera, sem a interface do Streamlit, os relatórios mensais em PDF de todos os usuários
+(ou de alguns meses) a partir do banco da aplicação, em paralelo em vários processos.
+
+    python -m utils.gerar_relatorios_lote --saida relatorios/
+    python -m utils.gerar_relatorios_lote --zip relatorios.zip --meses "Dezembro 2025" --processos 4
+
+A execução pode ser interrompida e retomada com o mesmo comando: os relatórios já gerados
+(com o mesmo conteúdo) ficam registrados em um manifesto e são pulados.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app_utils.orcamento_class import SnapshotOrcamento
+from app_utils.repositorio import DATABASE_NAME
+
+MANIFESTO = '.concluidos.jsonl'
+SQL_MESES_TODOS_USUARIOS = """
+    SELECT o.user_email, COALESCE(u.nome, o.user_email), o.mes, o.dados_json
+    FROM orcamentos o
+    LEFT JOIN usuarios u ON u.email = o.user_email
+    WHERE ?1 IS NULL OR o.mes IN (SELECT value FROM json_each(?1))
+    ORDER BY o.user_email, o.id
+"""
+
+
+def _nome_seguro(texto) -> str:
+    return re.sub(r'[^\w@.-]+', '_', str(texto)).strip('_') or 'sem_nome'
+
+
+def ler_tarefas(banco, meses=None, frequencia_pagamento='Mensal'):
+    """Percorre o banco (somente leitura) e gera um snapshot por mês com salário líquido > 0."""
+    conn = sqlite3.connect(f"file:{banco}?mode=ro", uri=True)
+    try:
+        filtro = json.dumps(list(meses), ensure_ascii=False) if meses else None
+        for user_email, user_name, mes, dados_json in conn.execute(SQL_MESES_TODOS_USUARIOS, (filtro,)):
+            dados = json.loads(dados_json)
+            if float(dados.get('salario_liquido') or 0.0) <= 0:
+                continue
+            snapshot = SnapshotOrcamento.criar(
+                mes, dados.get('salario_liquido', 0.0), dados.get('despesas_fixas', {}),
+                dados.get('gastos_lazer', {}), dados.get('poupanca_investimentos', 0.0),
+                frequencia_pagamento, user_name
+            )
+            arquivo = f"{_nome_seguro(user_email)}/Relatorio_Orcamento_{_nome_seguro(mes)}.pdf"
+            yield arquivo, snapshot
+    finally:
+        conn.close()
+
+
+def _iniciar_processo(sem_graficos):
+    if sem_graficos:
+        from utils.render_graficos import pool_renderizacao
+        pool_renderizacao.indisponivel = "Gráficos desativados (--sem-graficos)."
+
+
+def _gerar_pdf(arquivo, snapshot):
+    """Executado nos processos do pool: monta o Orcamento e gera o PDF."""
+    from utils.pdf_generator import criar_pdf_relatorio
+
+    orcamento = snapshot.para_orcamento()
+    limites = orcamento.calcular_limites_50_30_20()
+    totais_reais = orcamento.calcular_totais_reais()
+    saldo = orcamento.salario_liquido - totais_reais['total_gasto_real']
+    pdf = criar_pdf_relatorio(orcamento, limites, totais_reais, saldo, snapshot.user_name, snapshot.frequencia_pagamento)
+    return arquivo, snapshot.impressao(), pdf
+
+
+def _ler_manifesto(pasta) -> dict:
+    concluidos = {}
+    caminho = os.path.join(pasta, MANIFESTO)
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue  # última linha incompleta de uma execução interrompida
+                concluidos[registro['arquivo']] = registro['impressao']
+    return concluidos
+
+
+def _gravar_atomico(caminho, dados):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+def gerar_em_pasta(tarefas, pasta, processos=None, sem_graficos=False, em_andamento_por_processo=4, saida=sys.stdout):
+    """
+    Gera os PDFs na pasta, pulando os já registrados no manifesto com a mesma impressão digital.
+    Retorna (gerados, pulados, segundos).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    concluidos = _ler_manifesto(pasta)
+    processos = processos or os.cpu_count() or 1
+    limite_em_andamento = processos * em_andamento_por_processo
+    gerados = pulados = 0
+    inicio = ultimo_progresso = time.monotonic()
+
+    with open(os.path.join(pasta, MANIFESTO), 'a', encoding='utf-8') as manifesto, \
+            ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(sem_graficos,)) as executor:
+        em_andamento = set()
+
+        def coletar(bloquear):
+            nonlocal gerados, ultimo_progresso
+            prontos, _ = wait(em_andamento, timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                em_andamento.discard(futuro)
+                arquivo, impressao, pdf = futuro.result()
+                _gravar_atomico(os.path.join(pasta, arquivo), pdf)
+                manifesto.write(json.dumps({'arquivo': arquivo, 'impressao': impressao}, ensure_ascii=False) + '\n')
+                manifesto.flush()
+                gerados += 1
+            agora = time.monotonic()
+            if agora - ultimo_progresso >= 2:
+                ultimo_progresso = agora
+                print(f"  {gerados} gerados, {pulados} pulados ({gerados / (agora - inicio):.1f} relatórios/s)", file=saida)
+
+        for arquivo, snapshot in tarefas:
+            if concluidos.get(arquivo) == snapshot.impressao() and os.path.exists(os.path.join(pasta, arquivo)):
+                pulados += 1
+                continue
+            em_andamento.add(executor.submit(_gerar_pdf, arquivo, snapshot))
+            if len(em_andamento) >= limite_em_andamento:
+                coletar(bloquear=True)
+        while em_andamento:
+            coletar(bloquear=True)
+
+    return gerados, pulados, time.monotonic() - inicio
+
+
+def empacotar_zip(pasta, destino):
+    """Empacota os PDFs da pasta em um zip (gravado em arquivo temporário e renomeado ao final)."""
+    temporario = destino + '.tmp'
+    with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_STORED) as zf:  # PDFs já são comprimidos
+        for raiz, _, arquivos in os.walk(pasta):
+            for nome in sorted(arquivos):
+                if nome.endswith('.pdf'):
+                    caminho = os.path.join(raiz, nome)
+                    zf.write(caminho, os.path.relpath(caminho, pasta))
+    os.replace(temporario, destino)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--banco', default=DATABASE_NAME, help='Arquivo SQLite da aplicação')
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument('--saida', help='Pasta onde os PDFs serão gravados (um subdiretório por usuário)')
+    destino.add_argument('--zip', help='Arquivo zip de saída (gerado a partir de uma pasta de trabalho <zip>.parcial)')
+    parser.add_argument('--meses', nargs='*', help='Gera apenas estes meses (padrão: todos)')
+    parser.add_argument('--frequencia', default='Mensal', choices=['Mensal', 'Quinzenal'])
+    parser.add_argument('--processos', type=int, default=None, help='Número de processos (padrão: núcleos da CPU)')
+    parser.add_argument('--sem-graficos', action='store_true', help='Não embute os gráficos (dispensa o kaleido)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.banco):
+        parser.error(f"Banco não encontrado: {args.banco}")
+
+    pasta = args.saida or args.zip + '.parcial'
+    tarefas = ler_tarefas(args.banco, args.meses, args.frequencia)
+    gerados, pulados, segundos = gerar_em_pasta(tarefas, pasta, args.processos, args.sem_graficos)
+
+    if args.zip:
+        empacotar_zip(pasta, args.zip)
+        shutil.rmtree(pasta)
+
+    taxa = gerados / segundos if segundos > 0 else 0.0
+    print(f"{gerados} relatórios gerados e {pulados} pulados (já gerados) em {segundos:.1f}s: {taxa:.1f} relatórios/s")
+    print(f"Saída: {args.zip or pasta}")
+
+
+if __name__ == '__main__':
+    main()
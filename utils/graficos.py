@@ -0,0 +1,172 @@
+# utils/graficos.py
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from app_utils.perfil import medido
+
+CATEGORIAS_50_30_20 = ['Necessidades (50%)', 'Desejos/Lazer (30%)', 'Poupança/Investimento (20%)']
+CORES_IDEAL_REAL = {'Ideal': '#1f77b4', 'Real': '#ff7f0e'}
+
+
+class FiguraCacheada(go.Figure):
+    """
+    Figura guardada no CacheFiguras. O st.plotly_chart serializa a figura a cada exibição, e a maior parte
+    desse custo é o to_dict() (cópia profunda de todos os traces): aqui o dicionário é montado uma vez e
+    reaproveitado até o CacheFiguras trocar os dados (a figura só deve ser alterada por ele).
+    """
+    def __init__(self, figura):
+        super().__init__(figura)
+        self._especificacao = None
+
+    def to_dict(self):
+        if self._especificacao is None:
+            especificacao = super().to_dict()
+            # O st.plotly_chart remove os uids do dicionário recebido; sem eles, o dicionário guardado não muda
+            for trace in especificacao.get('data', []):
+                trace.pop('uid', None)
+            self._especificacao = especificacao
+        return self._especificacao
+
+    def descartar_especificacao(self):
+        self._especificacao = None
+
+
+class CacheFiguras:
+    """
+    Figuras Plotly já construídas, uma por "vaga" (gráfico da tela), guardadas por sessão.
+    Cada vaga lembra a estrutura da figura (eixos, séries, título) e a impressão dos dados:
+    - mesma estrutura e mesmos dados: devolve a figura existente (com o dicionário já serializado);
+    - mesma estrutura e dados novos: só troca os dados dos traces (sem px/melt de novo);
+    - estrutura diferente: reconstrói a figura.
+    """
+    def __init__(self):
+        self._vagas = {}  # vaga -> [estrutura, dados, figura]
+        self.acertos = 0
+        self.atualizacoes = 0
+        self.construcoes = 0
+
+    def obter(self, vaga, estrutura, dados, construir, atualizar):
+        entrada = self._vagas.get(vaga)
+        if entrada is not None and entrada[0] == estrutura:
+            if entrada[1] == dados:
+                self.acertos += 1
+            else:
+                atualizar(entrada[2])
+                entrada[2].descartar_especificacao()
+                entrada[1] = dados
+                self.atualizacoes += 1
+            return entrada[2]
+
+        figura = FiguraCacheada(construir())
+        self._vagas[vaga] = [estrutura, dados, figura]
+        self.construcoes += 1
+        return figura
+
+    def estatisticas(self) -> dict:
+        return {
+            'figuras': len(self._vagas),
+            'acertos': self.acertos,
+            'atualizacoes': self.atualizacoes,
+            'construcoes': self.construcoes,
+        }
+
+
+def _valores(serie) -> tuple:
+    return tuple(float(v) for v in serie)
+
+
+def _trocar_dados(trace, valores):
+    # Arrays de float, como o px gera (o texttemplate formata 'text' como número)
+    trace.y = np.asarray(valores, dtype=float)
+    trace.text = trace.y
+
+
+@medido('grafico:ideal_vs_real')
+def figura_ideal_vs_real(ideal, real, titulo, cache=None):
+    """Barras agrupadas Ideal x Real para as três categorias da regra 50-30-20."""
+    ideal, real = _valores(ideal), _valores(real)
+
+    def construir():
+        df_grafico = pd.DataFrame({'Categoria': CATEGORIAS_50_30_20, 'Ideal': ideal, 'Real': real})
+        df_grafico_melted = df_grafico.melt(id_vars='Categoria', var_name='Tipo', value_name='Valor')
+        fig = px.bar(df_grafico_melted, x='Categoria', y='Valor', color='Tipo', barmode='group', text='Valor', title=titulo, color_discrete_map=CORES_IDEAL_REAL)
+        fig.update_traces(texttemplate='R$ %{text:,.2f}', textposition='outside')
+        return fig
+
+    def atualizar(fig):
+        for trace in fig.data:
+            _trocar_dados(trace, ideal if trace.name == 'Ideal' else real)
+        fig.layout.title.text = titulo
+
+    if cache is None:
+        return construir()
+    return cache.obter('ideal_vs_real', tuple(CATEGORIAS_50_30_20), (ideal, real, titulo), construir, atualizar)
+
+
+@medido('grafico:folga_necessidades')
+def figura_folga_necessidades(df_historico_geral, cache=None):
+    """Barras da Folga/Déficit em Necessidades (50%) por mês, com escala divergente de cores."""
+    coluna = 'Folga/Déficit Necessidades'
+    valores = _valores(df_historico_geral[coluna])
+
+    def construir():
+        fig = px.bar(
+            df_historico_geral, y=coluna, text=coluna,
+            color=coluna, color_continuous_scale=px.colors.diverging.RdYlGn,
+            title="Folga/Déficit em Necessidades (50%) por Mês"
+        )
+        fig.update_traces(texttemplate='R$ %{text:,.2f}', textposition='outside')
+        return fig
+
+    def atualizar(fig):
+        _trocar_dados(fig.data[0], valores)
+        fig.data[0].marker.color = fig.data[0].y
+
+    if cache is None:
+        return construir()
+    return cache.obter('folga_necessidades', tuple(df_historico_geral.index), valores, construir, atualizar)
+
+
+@medido('grafico:detalhe_item')
+def figura_detalhe_item(df_filtrado, item, meses_ordenados, cache=None):
+    """Barras do valor de um item mês a mês (um trace por mês, como no px.bar com color='Mês')."""
+    meses = tuple(df_filtrado['Mês'])
+    valores = _valores(df_filtrado['Valor'])
+
+    def construir():
+        fig = px.bar(
+            df_filtrado, x='Mês', y='Valor', color='Mês', text='Valor', title=f"Variação de Custo do Item: **{item}**",
+            category_orders={'Mês': list(meses_ordenados)},
+        )
+        fig.update_traces(texttemplate='R$ %{text:,.2f}', textposition='outside')
+        return fig
+
+    def atualizar(fig):
+        for trace in fig.data:
+            _trocar_dados(trace, [v for mes, v in zip(meses, valores) if mes == trace.name])
+
+    if cache is None:
+        return construir()
+    return cache.obter('detalhe_item', (item, meses, tuple(meses_ordenados)), valores, construir, atualizar)
+
+
+@medido('grafico:itens')
+def figura_itens(df_pivo, cache=None):
+    """Linhas com a variação de vários itens (tabela Mês x Item), uma por item."""
+    dados = tuple(_valores(df_pivo[item]) for item in df_pivo.columns)
+
+    def construir():
+        return px.line(
+            df_pivo, x=df_pivo.index, y=list(df_pivo.columns), markers=True,
+            title="Variação de Custo dos Itens Selecionados", labels={'x': 'Mês', 'value': 'Valor', 'variable': 'Item'},
+        )
+
+    def atualizar(fig):
+        for trace in fig.data:
+            trace.y = df_pivo[trace.name].to_numpy()
+
+    if cache is None:
+        return construir()
+    return cache.obter('itens', (tuple(df_pivo.index), tuple(df_pivo.columns)), dados, construir, atualizar)
@@ -3,49 +3,69 @@ from fpdf import FPDF
 import pandas as pd
 import io
 
+from utils.fontes_pdf import familia_fonte, novo_pdf, texto_seguro as safe_text
+from utils.graficos import CATEGORIAS_50_30_20, figura_ideal_vs_real, figura_folga_necessidades
+from utils.render_graficos import pool_renderizacao
+from app_utils.periodo import Periodo
+from app_utils.perfil import medido
 
-try:
-    import safe_text
-except ImportError:
+COLUNAS_PDF_HISTORICO = ['Salário Líquido', 'Total Gasto', 'Folga/Déficit Necessidades', 'Folga/Déficit Lazer']
 
-    def safe_text(text):
-        return text 
-    print("Aviso: Módulo safe_text não encontrado. Usando função dummy.")
+# Família usada em todo o relatório: a TTF Unicode (acentos, "ª", "–") ou, sem ela, a Arial padrão
+FONTE = familia_fonte()
+
+# Modelos de layout, montados uma vez: cada coluna é (largura, alinhamento) e os textos fixos já passam
+# por safe_text aqui, então a geração de cada relatório só formata os valores.
+MODELO_CABECALHO = (("B", 16, 10), ("", 12, 5), ("", 12, 5))  # (estilo, tamanho, altura) de cada linha
+MODELO_ITEM_VALOR = ((60, "L"), (30, "R"))
+MODELO_QUINZENAS = ((60, "L"), (65, "C"), (65, "R"))
+MODELO_PARCELAS = ((60, "L"), (40, "R"), (40, "R"))
+
+TEXTOS_SECAO = {'item': safe_text("Item"), 'valor': safe_text("Valor"), 'total': safe_text("TOTAL GASTO")}
+CABECALHO_QUINZENAS = tuple(safe_text(t) for t in ("Quinzena", "Base de Cálculo", "Limite Máximo de Gasto"))
+LINHAS_QUINZENAS = (
+    (safe_text("1ª Quinzena"), safe_text("60% dos Limites Mensais")),
+    (safe_text("2ª Quinzena"), safe_text("40% dos Limites Mensais")),
+)
+CABECALHO_PARCELAS = tuple(safe_text(t) for t in ("Categoria", "1ª Parcela (60%)", "2ª Parcela (40%)"))
+LINHAS_PARCELAS = (
+    (safe_text("Necessidades (50%)"), 'Fixas - Início (60%)', 'Fixas - Meio (40%)'),
+    (safe_text("Desejos/Lazer (30%)"), 'Lazer - Início (60%)', 'Lazer - Meio (40%)'),
+)
+
+
+def _linha_modelo(pdf: FPDF, modelo, textos, altura=6):
+    """Uma linha de tabela com bordas seguindo o modelo de colunas (textos já preparados)."""
+    ultima = len(modelo) - 1
+    for i, ((largura, alinhamento), texto) in enumerate(zip(modelo, textos)):
+        pdf.cell(largura, altura, texto, 1, 1 if i == ultima else 0, alinhamento)
 
 
 def _configurar_pdf(pdf: FPDF, title: str, user_name: str, frequencia_pagamento: str):
     """Configura o cabeçalho inicial do PDF."""
     pdf.add_page()
-    
-    pdf.set_font("Arial", "B", 16)
-    
-    pdf.cell(0, 10, safe_text(title), 0, 1, "C")
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 5, safe_text(f"Gerado para: {user_name}"), 0, 1, "C")
-    pdf.cell(0, 5, safe_text(f"Frequencia de Pagamento: {frequencia_pagamento}"), 0, 1, "C")
+    textos = (title, f"Gerado para: {user_name}", f"Frequência de Pagamento: {frequencia_pagamento}")
+    for (estilo, tamanho, altura), texto in zip(MODELO_CABECALHO, textos):
+        pdf.set_font(FONTE, estilo, tamanho)
+        pdf.cell(0, altura, safe_text(texto), 0, 1, "C")
     pdf.ln(5)
 
 
 def _adicionar_secao_pdf(pdf: FPDF, titulo: str, total_real: float, limite: float, despesas: dict, cor_limite: tuple):
     """Função auxiliar para adicionar uma seção de categoria ao PDF."""
     pdf.set_fill_color(*cor_limite)
-    pdf.set_font("Arial", "B", 12)
+    pdf.set_font(FONTE, "B", 12)
     pdf.cell(0, 7, safe_text(f"{titulo} (Limite: R$ {limite:,.2f})"), 1, 1, "L", 1)
-    pdf.set_font("Arial", "", 10)
+    pdf.set_font(FONTE, "", 10)
     
     # Tabela de Despesas
-    pdf.cell(60, 6, safe_text("Item"), 1, 0, "L", 0)
-    pdf.cell(30, 6, safe_text("Valor"), 1, 1, "R", 0)
-    
+    _linha_modelo(pdf, MODELO_ITEM_VALOR, (TEXTOS_SECAO['item'], TEXTOS_SECAO['valor']))
     for item, valor in sorted(despesas.items()):
-        item_safe = safe_text(item)
-        pdf.cell(60, 6, item_safe, 1, 0, "L", 0) 
-        pdf.cell(30, 6, f"R$ {valor:,.2f}", 1, 1, "R", 0)
+        _linha_modelo(pdf, MODELO_ITEM_VALOR, (safe_text(item), f"R$ {valor:,.2f}"))
     
     # Linha do Total
-    pdf.set_font("Arial", "B", 10)
-    pdf.cell(60, 6, safe_text("TOTAL GASTO"), 1, 0, "L", 0)
-    pdf.cell(30, 6, f"R$ {total_real:,.2f}", 1, 1, "R", 0)
+    pdf.set_font(FONTE, "B", 10)
+    _linha_modelo(pdf, MODELO_ITEM_VALOR, (TEXTOS_SECAO['total'], f"R$ {total_real:,.2f}"))
     pdf.ln(7)
 
     # AVISO DE LIMITE
@@ -53,18 +73,29 @@ def _adicionar_secao_pdf(pdf: FPDF, titulo: str, total_real: float, limite: floa
         pdf.set_fill_color(255, 192, 203)
         pdf.set_text_color(255, 0, 0)
         ultrapassado = total_real - limite
-        pdf.set_font("Arial", "B", 10)
+        pdf.set_font(FONTE, "B", 10)
         pdf.cell(0, 6, safe_text(f"ATENÇÃO: Você ULTRAPASSOU o limite em R$ {ultrapassado:,.2f}!"), 1, 1, "C", 1)
     elif total_real < limite:
         pdf.set_text_color(0, 128, 0)
         economizado = limite - total_real
-        pdf.set_font("Arial", "", 10)
+        pdf.set_font(FONTE, "", 10)
         pdf.cell(0, 6, safe_text(f"Parabéns! Você economizou R$ {economizado:,.2f} nesta categoria."), 0, 1, "C", 0)
     
     pdf.set_text_color(0, 0, 0)
     pdf.ln(5)
 
 
+def _adicionar_grafico(pdf: FPDF, construir_figura):
+    """Embute o gráfico (o mesmo da tela) como imagem; sem o kaleido disponível, o PDF segue só com as tabelas."""
+    if pool_renderizacao.indisponivel:
+        return  # nem monta a figura
+    png = pool_renderizacao.renderizar_png(construir_figura())
+    if png is None:
+        return
+    pdf.image(io.BytesIO(png), w=pdf.epw)
+    pdf.ln(5)
+
+
 def _saida_pdf_segura(pdf: FPDF) -> bytes:
     """Garante que a saída do PDF seja sempre em bytestring."""
     pdf_output = pdf.output(dest='S')
@@ -75,18 +106,19 @@ def _saida_pdf_segura(pdf: FPDF) -> bytes:
     return bytes(pdf_output) if isinstance(pdf_output, (bytes, bytearray)) else b''
 
 
+@medido('pdf:mensal', raiz=True)
 def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name, frequencia_pagamento) -> bytes:
     """Gera o PDF do relatório 50-30-20."""
-    pdf = FPDF()
+    pdf = novo_pdf()
     _configurar_pdf(pdf, f"Gerenciamento de Valores: Relatório {orcamento_obj.mes}", user_name, frequencia_pagamento)
 
     # --- Resumo Geral e Saldo ---
     # ... (Bloco de Resumo Geral e Saldo idêntico ao original, apenas com safe_text mantido/ajustado) ...
-    pdf.set_font("Arial", "B", 12)
+    pdf.set_font(FONTE, "B", 12)
     pdf.set_fill_color(220, 220, 220)
     pdf.cell(0, 7, safe_text("Resumo Geral e Saldo"), 1, 1, "L", 1)
     
-    pdf.set_font("Arial", "", 10)
+    pdf.set_font(FONTE, "", 10)
     pdf.cell(60, 5, safe_text("Salário Líquido:"), 1, 0)
     pdf.cell(30, 5, f"R$ {orcamento_obj.salario_liquido:,.2f}", 1, 1, "R")
     
@@ -95,10 +127,10 @@ def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name,
     
     if saldo < 0:
         pdf.set_text_color(255, 0, 0)
-        pdf.set_font("Arial", "B", 10)
+        pdf.set_font(FONTE, "B", 10)
     else:
         pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", "B", 10)
+        pdf.set_font(FONTE, "B", 10)
         
     pdf.cell(60, 6, safe_text("SALDO FINAL (Salário - Total Gasto)"), 1, 0, "L", 0)
     pdf.cell(30, 6, f"R$ {saldo:,.2f}", 1, 1, "R", 0)
@@ -106,6 +138,13 @@ def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name,
     pdf.ln(5)
     # ... (Fim do Bloco de Resumo Geral e Saldo) ...
 
+    # Gráfico Ideal vs. Real
+    _adicionar_grafico(pdf, lambda: figura_ideal_vs_real(
+        [limites.get(categoria, 0.0) for categoria in CATEGORIAS_50_30_20],
+        [totais_reais['total_fixas'], totais_reais['total_lazer'], totais_reais['total_poupanca']],
+        f"Comparação de Orçamento Ideal vs. Real - {orcamento_obj.mes}",
+    ))
+
     # --- DIVISÃO QUINZENAL NO PDF ---
     # ... (Bloco Quinzenal idêntico ao original, apenas com safe_text mantido/ajustado) ...
     if frequencia_pagamento == 'Quinzenal':
@@ -118,59 +157,45 @@ def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name,
         
         
         # RESUMO FINANCEIRO QUINZENAL
-        pdf.set_font("Arial", "B", 13)
+        pdf.set_font(FONTE, "B", 13)
         pdf.set_fill_color(200, 220, 255) 
         pdf.cell(0, 8, safe_text("Resumo de Pagamento Quinzenal"), 1, 1, "C", 1)
         
         # ... (Tabelas Quinzenais) ...
-        pdf.set_font("Arial", "B", 10)
+        pdf.set_font(FONTE, "B", 10)
         pdf.cell(95, 6, safe_text("Salário Líquido Mensal:"), 1, 0, "L")
-        pdf.set_font("Arial", "", 10)
+        pdf.set_font(FONTE, "", 10)
         pdf.cell(95, 6, f"R$ {salario_liquido_mensal:,.2f}", 1, 1, "R")
         
         pdf.ln(2)
         
         # Tabela Limite de Gastos Sugerido
-        pdf.set_font("Arial", "B", 11)
+        pdf.set_font(FONTE, "B", 11)
         pdf.set_fill_color(255, 230, 200) 
         pdf.cell(0, 6, safe_text("Limite TOTAL Sugerido para Gastos (Necessidades + Lazer)"), 1, 1, "C", 1)
         
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(60, 6, safe_text("Quinzena"), 1, 0, "L")
-        pdf.cell(65, 6, safe_text("Base de Cálculo"), 1, 0, "C")
-        pdf.cell(65, 6, safe_text("Limite Máximo de Gasto"), 1, 1, "R")
-        
-        pdf.set_font("Arial", "", 10)
-        
-        pdf.cell(60, 6, safe_text("1ª Quinzena"), 1, 0, "L")
-        pdf.cell(65, 6, safe_text("60% dos Limites Mensais"), 1, 0, "C")
-        pdf.cell(65, 6, f"R$ {limite_gasto_primeira_quize:,.2f}", 1, 1, "R")
+        pdf.set_font(FONTE, "B", 10)
+        _linha_modelo(pdf, MODELO_QUINZENAS, CABECALHO_QUINZENAS)
         
-        pdf.cell(60, 6, safe_text("2ª Quinzena"), 1, 0, "L")
-        pdf.cell(65, 6, safe_text("40% dos Limites Mensais"), 1, 0, "C")
-        pdf.cell(65, 6, f"R$ {limite_gasto_segunda_quize:,.2f}", 1, 1, "R")
+        pdf.set_font(FONTE, "", 10)
+        for (quinzena, base), limite_gasto in zip(LINHAS_QUINZENAS, (limite_gasto_primeira_quize, limite_gasto_segunda_quize)):
+            _linha_modelo(pdf, MODELO_QUINZENAS, (quinzena, base, f"R$ {limite_gasto:,.2f}"))
 
         pdf.ln(5)
 
         # DETALHE DA DIVISÃO POR CATEGORIA (50-30-20)
-        pdf.set_font("Arial", "B", 12)
+        pdf.set_font(FONTE, "B", 12)
         pdf.set_fill_color(255, 230, 200) 
         pdf.cell(0, 7, safe_text("Detalhamento da Divisão por Categoria (60% / 40%)"), 1, 1, "C", 1)
         
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(60, 6, safe_text("Categoria"), 1, 0, "L")
-        pdf.cell(40, 6, safe_text("1ª Parcela (60%)"), 1, 0, "R")
-        pdf.cell(40, 6, safe_text("2ª Parcela (40%)"), 1, 1, "R")
-        
-        pdf.set_font("Arial", "", 10)
-        
-        pdf.cell(60, 6, safe_text("Necessidades (50%)"), 1, 0, "L")
-        pdf.cell(40, 6, f"R$ {divisao_quinzenal['Fixas - Início (60%)']:,.2f}", 1, 0, "R")
-        pdf.cell(40, 6, f"R$ {divisao_quinzenal['Fixas - Meio (40%)']:,.2f}", 1, 1, "R")
+        pdf.set_font(FONTE, "B", 10)
+        _linha_modelo(pdf, MODELO_PARCELAS, CABECALHO_PARCELAS)
         
-        pdf.cell(60, 6, safe_text("Desejos/Lazer (30%)"), 1, 0, "L")
-        pdf.cell(40, 6, f"R$ {divisao_quinzenal['Lazer - Início (60%)']:,.2f}", 1, 0, "R")
-        pdf.cell(40, 6, f"R$ {divisao_quinzenal['Lazer - Meio (40%)']:,.2f}", 1, 1, "R")
+        pdf.set_font(FONTE, "", 10)
+        for categoria, chave_inicio, chave_meio in LINHAS_PARCELAS:
+            _linha_modelo(pdf, MODELO_PARCELAS, (
+                categoria, f"R$ {divisao_quinzenal[chave_inicio]:,.2f}", f"R$ {divisao_quinzenal[chave_meio]:,.2f}"
+            ))
         
         pdf.ln(7)
     # --- FIM DA DIVISÃO QUINZENAL NO PDF ---
@@ -181,18 +206,18 @@ def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name,
     
     # 20% Poupança
     pdf.set_fill_color(255, 255, 153)
-    pdf.set_font("Arial", "B", 12)
+    pdf.set_font(FONTE, "B", 12)
     meta_poupanca = limites.get('Poupança/Investimento (20%)', 0.0)
     pdf.cell(0, 7, safe_text(f"20% Poupança/Investimento (Meta: R$ {meta_poupanca:,.2f})"), 1, 1, "L", 1)
     total_poupanca = totais_reais['total_poupanca']
-    pdf.set_font("Arial", "", 10)
+    pdf.set_font(FONTE, "", 10)
     pdf.cell(60, 6, safe_text("Valor Destinado"), 1, 0, "L", 0)
     pdf.cell(30, 6, f"R$ {total_poupanca:,.2f}", 1, 1, "R", 0)
 
     if total_poupanca < meta_poupanca:
         pdf.set_text_color(255, 0, 0)
         falta = meta_poupanca - total_poupanca
-        pdf.set_font("Arial", "B", 10)
+        pdf.set_font(FONTE, "B", 10)
         pdf.cell(0, 6, safe_text(f"Atenção: Você está R$ {falta:,.2f} abaixo da meta de 20%!"), 1, 1, "C", 1)
     pdf.set_text_color(0, 0, 0)
     pdf.ln(5)
@@ -200,62 +225,138 @@ def criar_pdf_relatorio(orcamento_obj, limites, totais_reais, saldo, user_name,
     return _saida_pdf_segura(pdf) 
 
 
-def criar_pdf_relatorio_historico(df_resumo_historico) -> bytes:
-    """Gera o resumo da comparação histórica em PDF."""
-    pdf = FPDF()
+def _tabela_colunar(pdf: FPDF, cabecalho, larguras, alinhamentos, linhas, altura=6, cor_cabecalho=(200, 220, 255)):
+    """
+    Desenha uma tabela a partir de linhas já formatadas, sem um cell() por célula: o texto vai direto
+    com text() e a grade é traçada uma vez por bloco de linhas. O cabeçalho se repete em cada página.
+    Cada linha é (textos, cores, destaque): cores traz um RGB por coluna; linhas de destaque
+    (ex.: subtotais) saem em negrito com fundo cinza.
+    """
+    x0 = pdf.l_margin
+    bordas = [x0]
+    for largura in larguras:
+        bordas.append(bordas[-1] + largura)
+    margem = pdf.c_margin
+
+    def desenhar_cabecalho():
+        pdf.set_x(x0)
+        pdf.set_fill_color(*cor_cabecalho)
+        pdf.set_font(FONTE, "B", 10)
+        pdf.set_text_color(0, 0, 0)
+        for titulo, largura, alinhamento in zip(cabecalho, larguras, alinhamentos):
+            pdf.cell(largura, altura + 1, titulo, 1, 0, "C" if alinhamento == "L" else alinhamento, 1)
+        pdf.ln()
+        pdf.set_font(FONTE, "", 9)
+        return pdf.get_y()
+
+    def fechar_bloco(y_inicio, y_fim):
+        for x in bordas:
+            pdf.line(x, y_inicio, x, y_fim)
+
+    y_bloco = y = desenhar_cabecalho()
+    cor_atual, negrito = (0, 0, 0), False
+    pdf.set_fill_color(235, 235, 235)
+    for textos, cores, destaque in linhas:
+        if y + altura > pdf.page_break_trigger:  # text() não move o cursor, então a posição é controlada aqui
+            fechar_bloco(y_bloco, y)
+            pdf.add_page()
+            y_bloco = y = desenhar_cabecalho()
+            cor_atual, negrito = (0, 0, 0), False
+            pdf.set_fill_color(235, 235, 235)
+        if destaque != negrito:
+            negrito = destaque
+            pdf.set_font(FONTE, "B" if negrito else "", 9)
+        if destaque:
+            pdf.rect(x0, y, bordas[-1] - x0, altura, "F")
+
+        linha_base = y + 0.5 * altura + 0.3 * pdf.font_size
+        for i, texto in enumerate(textos):
+            if cores[i] != cor_atual:
+                cor_atual = cores[i]
+                pdf.set_text_color(*cor_atual)
+            if alinhamentos[i] == "R":
+                x = bordas[i + 1] - margem - pdf.get_string_width(texto)
+            elif alinhamentos[i] == "C":
+                x = (bordas[i] + bordas[i + 1] - pdf.get_string_width(texto)) / 2
+            else:
+                x = bordas[i] + margem
+            pdf.text(x, linha_base, texto)
+        y += altura
+        pdf.line(x0, y, bordas[-1], y)
+
+    fechar_bloco(y_bloco, y)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font(FONTE, "", 9)
+    pdf.set_y(y)
+
+
+def _cores_folga(valores):
+    """Vermelho para déficit, verde para folga e preto para zero (uma cor por valor)."""
+    return [(255, 0, 0) if v < 0 else (0, 128, 0) if v > 0 else (0, 0, 0) for v in valores]
+
+
+def _linhas_historico(df_resumo_historico, subtotais_anuais):
+    """Formata o resumo coluna a coluna (sem iterrows) e gera as linhas da tabela, com subtotais por ano se pedido."""
+    meses = [safe_text(mes) for mes in df_resumo_historico.index]
+    colunas = [df_resumo_historico[c].to_numpy(dtype=float).tolist() for c in COLUNAS_PDF_HISTORICO]
+    textos = [[f"R$ {v:,.2f}" for v in coluna] for coluna in colunas]
+    preto = [(0, 0, 0)] * len(meses)
+    cores = [preto, preto, preto, _cores_folga(colunas[2]), _cores_folga(colunas[3])]
+
+    anos = [Periodo.de_texto(mes) for mes in df_resumo_historico.index] if subtotais_anuais else None
+    inicio_ano = 0
+    for i, mes in enumerate(meses):
+        yield (mes, textos[0][i], textos[1][i], textos[2][i], textos[3][i]), (preto[i],) + tuple(c[i] for c in cores[1:]), False
+
+        if anos is not None:
+            ano = anos[i].ano if anos[i] else None
+            proximo = anos[i + 1].ano if i + 1 < len(anos) and anos[i + 1] else None
+            if ano is not None and ano != proximo:
+                somas = [sum(coluna[inicio_ano:i + 1]) for coluna in colunas]
+                yield (
+                    (safe_text(f"Total {ano}"),) + tuple(f"R$ {v:,.2f}" for v in somas),
+                    ((0, 0, 0), (0, 0, 0), (0, 0, 0)) + tuple(_cores_folga(somas[2:])),
+                    True,
+                )
+            if ano != proximo:
+                inicio_ano = i + 1
+
+
+@medido('pdf:historico', raiz=True)
+def criar_pdf_relatorio_historico(df_resumo_historico, destino=None, subtotais_anuais=False):
+    """
+    Gera o resumo da comparação histórica em PDF.
+    Com 'destino' (arquivo ou objeto com write()), o PDF é gravado nele e a função retorna None;
+    sem ele, retorna os bytes. 'subtotais_anuais' acrescenta uma linha de total ao fim de cada ano.
+    """
+    pdf = novo_pdf()
     pdf.add_page()
     
-    pdf.set_font("Arial", "B", 16)
+    pdf.set_font(FONTE, "B", 16)
     pdf.cell(0, 10, safe_text("Relatório de Comparação Histórica Mensal"), 0, 1, "C")
     pdf.ln(5)
     
-    # ... (O restante do código de histórico pode ser mantido, apenas corrigindo a acentuação se necessário) ...
-    pdf.set_font("Arial", "B", 12)
+    pdf.set_font(FONTE, "B", 12)
     pdf.cell(0, 10, safe_text("Resumo Comparativo de Gastos e Economia (50-30-20)"), 0, 1, "L")
     pdf.ln(2)
     
-    col_widths = [25, 35, 30, 30, 30]
-    
-    # Cabeçalho da Tabela
-    pdf.set_fill_color(200, 220, 255)
-    pdf.set_font("Arial", "B", 10)
-    pdf.cell(col_widths[0], 7, safe_text("Mês"), 1, 0, "C", 1)
-    pdf.cell(col_widths[1], 7, safe_text("Salário Líquido"), 1, 0, "R", 1)
-    pdf.cell(col_widths[2], 7, safe_text("Total Gasto"), 1, 0, "R", 1)
-    pdf.cell(col_widths[3], 7, safe_text("Folga Necessidades"), 1, 0, "R", 1)
-    pdf.cell(col_widths[4], 7, safe_text("Folga Lazer"), 1, 1, "R", 1)
-    
-    pdf.set_font("Arial", "", 9)
-    for index, row in df_resumo_historico.iterrows():
-        mes = safe_text(index) 
-        salario = f"R$ {row['Salário Líquido']:,.2f}"
-        gasto = f"R$ {row['Total Gasto']:,.2f}"
-        folga_fixas = f"R$ {row['Folga/Déficit Necessidades']:,.2f}"
-        folga_lazer = f"R$ {row['Folga/Déficit Lazer']:,.2f}"
-        
-        # Lógica de cores para Folga Necessidades
-        # ... (Mantém a lógica de cores) ...
-        if row['Folga/Déficit Necessidades'] < 0: pdf.set_text_color(255, 0, 0)
-        elif row['Folga/Déficit Necessidades'] > 0: pdf.set_text_color(0, 128, 0)
-        else: pdf.set_text_color(0, 0, 0)
-            
-        pdf.cell(col_widths[0], 6, mes, 1, 0, "L", 0)
-        pdf.cell(col_widths[1], 6, salario, 1, 0, "R", 0)
-        pdf.cell(col_widths[2], 6, gasto, 1, 0, "R", 0)
-        pdf.cell(col_widths[3], 6, folga_fixas, 1, 0, "R", 0)
-        
-        # Lógica de cores para Folga Lazer
-        if row['Folga/Déficit Lazer'] < 0: pdf.set_text_color(255, 0, 0)
-        elif row['Folga/Déficit Lazer'] > 0: pdf.set_text_color(0, 128, 0)
-        else: pdf.set_text_color(0, 0, 0)
-            
-        pdf.cell(col_widths[4], 6, folga_lazer, 1, 1, "R", 0)
-        
-        pdf.set_text_color(0, 0, 0) 
+    _tabela_colunar(
+        pdf,
+        [safe_text(titulo) for titulo in ("Mês", "Salário Líquido", "Total Gasto", "Folga Necessidades", "Folga Lazer")],
+        [25, 35, 30, 30, 30],
+        ["L", "R", "R", "R", "R"],
+        _linhas_historico(df_resumo_historico, subtotais_anuais),
+    )
             
     pdf.ln(10)
+
+    # Gráfico de Folga/Déficit em Necessidades
+    _adicionar_grafico(pdf, lambda: figura_folga_necessidades(df_resumo_historico))
     
-    pdf.set_font("Arial", "", 8)
+    pdf.set_font(FONTE, "", 8)
     pdf.multi_cell(0, 4, safe_text("Nota: Valores positivos em 'Folga' indicam que você gastou menos que o limite sugerido (economia). Valores negativos indicam déficit (ultrapassagem)."), 0, "L")
 
-    return _saida_pdf_segura(pdf)
\ No newline at end of file
+    if destino is not None:
+        pdf.output(destino)
+        return None
+    return _saida_pdf_segura(pdf)
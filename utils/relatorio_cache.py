@@ -0,0 +1,165 @@
+# utils/relatorio_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from app_utils.orcamento_class import SnapshotOrcamento
+
+# Com DINDIN_METRICAS_ARQUIVO (ex.: a pasta do textfile collector do node_exporter + 'dindin.prom'),
+# as métricas do cache são regravadas nesse arquivo a cada INTERVALO_METRICAS_SEGUNDOS para o Prometheus coletar
+ARQUIVO_METRICAS = os.environ.get('DINDIN_METRICAS_ARQUIVO', '')
+INTERVALO_METRICAS_SEGUNDOS = 15.0
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRelatorios:
+    """
+    Cache LRU de PDFs já gerados, compartilhado por todo o processo.
+    Limitado pela quantidade de relatórios, pelo total de bytes em memória e por um TTL.
+    Mantém contadores de acertos, falhas, remoções e expirações para monitoramento.
+    """
+    def __init__(self, max_itens=64, max_bytes=32 * 1024 * 1024, ttl_segundos=30 * 60):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self._itens = OrderedDict()  # chave -> (dados, expira_em)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self.expiracoes = 0
+
+    def obter(self, chave, gerar):
+        """Retorna o PDF da chave; se não estiver em cache (ou expirou), chama gerar() e armazena o resultado."""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                dados, expira_em = entrada
+                if expira_em > agora:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return dados
+                self._descartar(chave)
+                self.expiracoes += 1
+            self.falhas += 1
+
+        # A geração roda fora do lock para não bloquear as outras sessões
+        dados = gerar()
+
+        with self._lock:
+            if chave not in self._itens:
+                self._itens[chave] = (dados, time.monotonic() + self.ttl_segundos)
+                self._bytes += len(dados)
+                self._remover_excedentes()
+        return dados
+
+    def _descartar(self, chave):
+        dados, _ = self._itens.pop(chave)
+        self._bytes -= len(dados)
+
+    def _remover_excedentes(self):
+        """Remove os itens menos usados até respeitar os limites (sempre mantém o mais recente)."""
+        while len(self._itens) > 1 and (len(self._itens) > self.max_itens or self._bytes > self.max_bytes):
+            chave = next(iter(self._itens))
+            self._descartar(chave)
+            self.remocoes += 1
+
+    def estatisticas(self) -> dict:
+        """Retorna um retrato dos contadores e da ocupação do cache."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'bytes': self._bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'remocoes': self.remocoes,
+                'expiracoes': self.expiracoes,
+                'taxa_acerto': (self.acertos / total) if total else 0.0,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+
+cache_relatorios = CacheRelatorios()
+
+
+def exportar_metricas_prometheus(cache: CacheRelatorios = cache_relatorios) -> str:
+    """Formata as estatísticas do cache no formato texto do Prometheus (para coleta/scrape)."""
+    stats = cache.estatisticas()
+    linhas = []
+    for nome, tipo in (('acertos', 'counter'), ('falhas', 'counter'), ('remocoes', 'counter'),
+                       ('expiracoes', 'counter'), ('itens', 'gauge'), ('bytes', 'gauge')):
+        metrica = f"dindin_cache_relatorios_{nome}"
+        linhas.append(f"# TYPE {metrica} {tipo}")
+        linhas.append(f"{metrica} {stats[nome]}")
+    return "\n".join(linhas) + "\n"
+
+
+def gravar_metricas_prometheus(caminho, cache: CacheRelatorios = cache_relatorios):
+    """Grava as métricas no arquivo de uma vez (arquivo temporário + rename): o coletor nunca lê um arquivo pela metade."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as saida:
+        saida.write(exportar_metricas_prometheus(cache))
+    os.replace(temporario, caminho)
+
+
+def _loop_metricas(caminho, intervalo):
+    while True:
+        try:
+            gravar_metricas_prometheus(caminho)
+        except OSError:
+            logger.warning("Não foi possível gravar as métricas em %s", caminho, exc_info=True)
+        time.sleep(intervalo)
+
+
+_thread_metricas = None
+_lock_metricas = threading.Lock()
+
+
+def iniciar_exportacao_metricas(caminho=ARQUIVO_METRICAS, intervalo=INTERVALO_METRICAS_SEGUNDOS) -> bool:
+    """
+    Inicia, uma vez por processo, a thread que regrava o arquivo de métricas do Prometheus.
+    Sem caminho configurado não faz nada. Retorna True se a exportação está ativa.
+    """
+    global _thread_metricas
+    if not caminho:
+        return False
+    if _thread_metricas is None:
+        with _lock_metricas:
+            if _thread_metricas is None:
+                thread = threading.Thread(target=_loop_metricas, args=(caminho, intervalo), name="metricas-prometheus", daemon=True)
+                thread.start()
+                _thread_metricas = thread
+    return True
+
+
+def _hash_conteudo(conteudo) -> str:
+    texto = json.dumps(conteudo, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def impressao_orcamento(orcamento_obj, user_name, frequencia_pagamento) -> str:
+    """Gera a impressão digital (fingerprint) do conteúdo que define o relatório mensal."""
+    return SnapshotOrcamento.de_orcamento(orcamento_obj, frequencia_pagamento, user_name).impressao()
+
+
+def impressao_historico(df_resumo_historico: pd.DataFrame) -> str:
+    """Gera a impressão digital do DataFrame de resumo histórico (índice, colunas e valores)."""
+    valores = pd.util.hash_pandas_object(df_resumo_historico, index=True).to_numpy()
+    return _hash_conteudo({
+        'colunas': list(df_resumo_historico.columns),
+        'valores': hashlib.sha256(valores.tobytes()).hexdigest(),
+    })
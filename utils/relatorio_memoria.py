@@ -0,0 +1,101 @@
+# utils/relatorio_memoria.py
+"""
+Relatório de memória por sessão do histórico de orçamentos.
+
+Compara o formato antigo (dicionário de dicionários de floats) com o MesCompacto
+para um histórico sintético. Uso:
+
+    python -m utils.relatorio_memoria --meses 60 --itens 200
+"""
+import argparse
+import sys
+from collections.abc import Mapping
+
+from app_utils.mes_compacto import BlocoItens, MesCompacto
+
+
+def tamanho_profundo(obj, vistos=None) -> int:
+    """Soma sys.getsizeof do objeto e de tudo que ele referencia, contando cada objeto uma única vez."""
+    if vistos is None:
+        vistos = set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    tamanho = sys.getsizeof(obj)
+
+    if isinstance(obj, (MesCompacto, BlocoItens)):
+        # Objetos com __slots__: percorre os campos guardados, e não a visão de Mapping
+        # (que criaria floats temporários); no array tipado, sys.getsizeof já inclui os valores
+        for campo in type(obj).__slots__:
+            tamanho += tamanho_profundo(getattr(obj, campo), vistos)
+    elif isinstance(obj, (dict, Mapping)):
+        for chave, valor in obj.items():
+            tamanho += tamanho_profundo(chave, vistos) + tamanho_profundo(valor, vistos)
+    elif isinstance(obj, (list, tuple, set)):
+        for valor in obj:
+            tamanho += tamanho_profundo(valor, vistos)
+    return tamanho
+
+
+def _nomes(quantidade, prefixo):
+    # Strings novas a cada chamada, como acontece ao decodificar o JSON de cada mês
+    return [f"{prefixo} {i:03d}" for i in range(quantidade)]
+
+
+def historico_antigo(meses, itens_por_mes):
+    metade = itens_por_mes // 2
+    return {
+        f"Mes {m:03d}": {
+            'salario_liquido': 5000.0 + m,
+            'despesas_fixas': {nome: float(100 + i + m) for i, nome in enumerate(_nomes(metade, 'Fixa'))},
+            'gastos_lazer': {nome: float(50 + i + m) for i, nome in enumerate(_nomes(itens_por_mes - metade, 'Lazer'))},
+            'poupanca_investimentos': 1000.0,
+        }
+        for m in range(meses)
+    }
+
+
+def historico_compacto(historico):
+    return {mes: MesCompacto.de_dados(dados) for mes, dados in historico.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meses', type=int, default=60)
+    parser.add_argument('--itens', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    antigo = historico_antigo(args.meses, args.itens)
+    compacto = historico_compacto(historico_antigo(args.meses, args.itens))
+
+    bytes_antigo = tamanho_profundo(antigo)
+    bytes_compacto = tamanho_profundo(compacto)
+
+    # Custo de um salvamento sem alteração de itens
+    mes = next(iter(antigo))
+    dados = antigo[mes]
+    copia_antiga = {
+        'salario_liquido': dados['salario_liquido'],
+        'despesas_fixas': dados['despesas_fixas'].copy(),
+        'gastos_lazer': dados['gastos_lazer'].copy(),
+        'poupanca_investimentos': dados['poupanca_investimentos'],
+    }
+    # Chaves e valores já existem no histórico; conta só as estruturas novas
+    ja_existentes = {id(x) for c in (dados['despesas_fixas'], dados['gastos_lazer']) for par in c.items() for x in par}
+    salvamento_antigo = tamanho_profundo(copia_antiga, ja_existentes)
+
+    registro = compacto[mes]
+    fixas, lazer = registro.despesas_fixas.para_itens(), registro.gastos_lazer.para_itens()
+    novo = MesCompacto(registro.salario_liquido, fixas, lazer, registro.poupanca_investimentos)
+    salvamento_compacto = tamanho_profundo(novo, {id(registro.despesas_fixas), id(registro.gastos_lazer)})
+
+    print(f"Histórico: {args.meses} meses x {args.itens} itens/mês")
+    print(f"{'Formato':<30}{'Bytes/sessão':>16}{'Bytes/mês':>14}")
+    print(f"{'dict de dicts (antigo)':<30}{bytes_antigo:>16,}{bytes_antigo // args.meses:>14,}")
+    print(f"{'MesCompacto':<30}{bytes_compacto:>16,}{bytes_compacto // args.meses:>14,}")
+    print(f"Redução: {100 * (1 - bytes_compacto / bytes_antigo):.1f}%")
+    print(f"Bytes novos por salvamento sem alteração de itens: antigo {salvamento_antigo:,} | compacto {salvamento_compacto:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# utils/render_graficos.py
+import asyncio
+import atexit
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class PoolRenderizacao:
+    """
+    Renderiza figuras Plotly em PNG com o kaleido, para embutir nos PDFs.
+    Um único navegador do kaleido fica aberto (com 'abas' páginas trabalhando em paralelo) em uma
+    thread dedicada, em vez de iniciar o kaleido a cada imagem. As imagens prontas ficam em um
+    cache LRU pela impressão digital da figura.
+    Se o kaleido/Chrome não estiver disponível, renderizar_png() devolve None e o PDF sai sem gráficos.
+    """
+    def __init__(self, abas=2, timeout_segundos=30, max_imagens=128):
+        self.abas = abas
+        self.timeout_segundos = timeout_segundos
+        self.max_imagens = max_imagens
+        self.indisponivel = None  # motivo, se o kaleido não pôde ser iniciado
+        self._fila = queue.Queue()
+        self._pronto = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._imagens = OrderedDict()  # impressão da figura -> PNG
+        self.acertos = 0
+        self.renderizacoes = 0
+        self.falhas = 0
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=asyncio.run, args=(self._servidor(),), name='kaleido', daemon=True)
+                self._thread.start()
+                atexit.register(self.fechar)
+
+    async def _servidor(self):
+        try:
+            import kaleido
+            async with kaleido.Kaleido(n=self.abas) as navegador:
+                self._pronto.set()
+                pendentes = set()
+                while True:
+                    pedido = await asyncio.to_thread(self._fila.get)
+                    if pedido is None:
+                        break
+                    tarefa = asyncio.create_task(self._renderizar(navegador, *pedido))
+                    pendentes.add(tarefa)
+                    tarefa.add_done_callback(pendentes.discard)
+                if pendentes:
+                    await asyncio.gather(*pendentes, return_exceptions=True)
+        except Exception as e:
+            self.indisponivel = f"{type(e).__name__}: {e}"
+        finally:
+            self._pronto.set()
+            # Pedidos que ficaram na fila não serão atendidos
+            while True:
+                try:
+                    pedido = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if pedido is not None:
+                    pedido[2].set_exception(RuntimeError(self.indisponivel or "Renderizador encerrado."))
+
+    @staticmethod
+    async def _renderizar(navegador, figura, opcoes, futuro):
+        try:
+            futuro.set_result(await navegador.calc_fig(figura, opts=opcoes))
+        except Exception as e:
+            futuro.set_exception(e)
+
+    def renderizar_png(self, figura, largura=900, altura=450):
+        """PNG da figura (bytes), do cache ou renderizado no pool; None se não for possível renderizar."""
+        opcoes = {'format': 'png', 'width': largura, 'height': altura}
+        impressao = hashlib.sha256(f"{largura}x{altura}|{figura.to_json()}".encode('utf-8')).hexdigest()
+        with self._lock:
+            png = self._imagens.get(impressao)
+            if png is not None:
+                self._imagens.move_to_end(impressao)
+                self.acertos += 1
+                return png
+        if self.indisponivel:
+            return None
+
+        self._iniciar()
+        if not self._pronto.wait(self.timeout_segundos) or self.indisponivel:
+            return None
+        futuro = Future()
+        self._fila.put((figura, opcoes, futuro))
+        try:
+            png = futuro.result(timeout=self.timeout_segundos)
+        except Exception:
+            with self._lock:
+                self.falhas += 1
+            return None
+
+        with self._lock:
+            self.renderizacoes += 1
+            self._imagens[impressao] = png
+            while len(self._imagens) > self.max_imagens:
+                self._imagens.popitem(last=False)
+        return png
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                'imagens': len(self._imagens),
+                'acertos': self.acertos,
+                'renderizacoes': self.renderizacoes,
+                'falhas': self.falhas,
+                'indisponivel': self.indisponivel,
+            }
+
+    def fechar(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join(self.timeout_segundos)
+
+
+pool_renderizacao = PoolRenderizacao()